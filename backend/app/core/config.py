@@ -54,6 +54,30 @@ class Settings:
         "DATABASE_URL", 
         "sqlite:///./zaman_ai.db"  # Default to SQLite for development
     )
+    DATABASE_POOL_SIZE: int = int(os.getenv("DATABASE_POOL_SIZE", "5"))
+    DATABASE_MAX_OVERFLOW: int = int(os.getenv("DATABASE_MAX_OVERFLOW", "10"))
+    DATABASE_POOL_TIMEOUT: int = int(os.getenv("DATABASE_POOL_TIMEOUT", "30"))
+    DATABASE_POOL_RECYCLE: int = int(os.getenv("DATABASE_POOL_RECYCLE", "1800"))
+    DATABASE_ECHO: bool = os.getenv("DATABASE_ECHO", "False").lower() == "true"
+    # File-backed SQLite: WAL, tuned pragmas and a read-only pool next to one serialized writer
+    SQLITE = {
+        "read_write_split": os.getenv("SQLITE_READ_WRITE_SPLIT", "True").lower() == "true",
+        "read_pool_size": int(os.getenv("SQLITE_READ_POOL_SIZE", "4")),
+        "read_max_overflow": int(os.getenv("SQLITE_READ_MAX_OVERFLOW", "4")),
+        "pragmas": {
+            "journal_mode": "WAL",  # readers do not block the writer and vice versa
+            "synchronous": "NORMAL",  # durable at checkpoints; safe with WAL
+            "cache_size": -64000,  # negative = KiB, i.e. 64 MB page cache per connection
+            "mmap_size": 268435456,  # 256 MB memory-mapped reads
+            "busy_timeout": 5000,  # ms to wait for a lock instead of failing
+            "temp_store": "MEMORY",
+            "foreign_keys": "ON"
+        }
+    }
+    # alembic upgrade head on startup; disable when several workers start at once and migrate from the deploy step
+    DATABASE_MIGRATE_ON_STARTUP: bool = os.getenv("DATABASE_MIGRATE_ON_STARTUP", "True").lower() == "true"
+    # Seed the demo user, transactions and goals into an empty development database
+    DATABASE_SEED_DEMO: bool = os.getenv("DATABASE_SEED_DEMO", "True").lower() == "true"
     
     # Supabase Configuration (if using Supabase)
     SUPABASE_URL: str = os.getenv("SUPABASE_URL", "")
@@ -80,6 +104,19 @@ class Settings:
         "development_spending_rate": 0.125,  # 12.5%
     }
     
+    # Zakat Configuration
+    ZAKAT = {
+        "nisab_standard": os.getenv("ZAKAT_NISAB_STANDARD", "silver"),  # silver (lower threshold) or gold
+        "gold_nisab_grams": 85,
+        "silver_nisab_grams": 595,
+        "hawl_days": 354,  # lunar year
+        "prices_file": os.getenv(
+            "NISAB_PRICES_FILE",
+            os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "nisab_prices.json")
+        ),
+        "prices_refresh_seconds": int(os.getenv("NISAB_PRICES_REFRESH_SECONDS", "3600")),
+    }
+    
     # Bank Products Configuration
     BANK_PRODUCTS = {
         "min_deposit_amount": 50000,
@@ -87,6 +124,29 @@ class Settings:
         "min_investment_amount": 100000,
         "max_financing_term_years": 20,
         "max_auto_lease_term_years": 7,
+        "murabaha_profit_rate": 0.15,  # annual rate used to fix the Murabaha sale price
+        "ijara_rental_rate": 0.14,  # annual rent on the bank's outstanding share of the asset
+        "ijara_residual_value_share": 0.0,  # buyout paid at the end of Ijara (share of the amount)
+        "max_pricing_grid_cells": 3000,
+        "catalog_file": os.getenv(
+            "PRODUCT_CATALOG_FILE",
+            os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "products.json")
+        ),
+        "catalog_reload_seconds": int(os.getenv("PRODUCT_CATALOG_RELOAD_SECONDS", "30")),
+        # Indicative annual profit share by product type, used for calculations and comparisons
+        "expected_profit_rates": {"deposit": 0.10, "investment": 0.12},  # Wadiah accounts pay none
+        "comparison_cache_size": 1024,
+    }
+
+    # Product Retrieval (embeddings for chat product suggestions)
+    PRODUCT_RETRIEVAL = {
+        "embedding_backend": os.getenv("PRODUCT_EMBEDDING_BACKEND", "hashing"),  # hashing (offline) or api
+        "hashing_dimensions": 512,
+        "chroma_path": os.getenv("CHROMA_PATH", "./chroma_db"),
+        "collection_prefix": "bank_products",
+        "semantic_weight": 0.6,  # blended with the normalized rule score
+        "rule_weight": 0.4,
+        "top_k": 3,
     }
     
     # Analytics Configuration
@@ -96,10 +156,83 @@ class Settings:
         "expense_categories": ["housing", "food", "transport", "health", "entertainment", "other"],
         "goal_categories": ["housing", "transport", "education", "health", "hajj", "business", "other"]
     }
+
+    # Product View Tracking
+    PRODUCT_VIEWS = {
+        "bucket_seconds": 300,  # granularity of time-bucketed view counts
+        "retention_buckets": 2016,  # 7 days of 5-minute buckets
+        "ring_buffer_size": 10000,  # raw events kept in memory
+        "flush_batch_size": 500,  # raw events appended to events_file per write
+        "events_file": os.getenv("PRODUCT_VIEWS_FILE", ""),  # NDJSON log, disabled when empty
+        "windows": {"hour": 3600, "day": 86400, "week": 604800},  # trending windows, in seconds
+        "risk_profiles": ["conservative", "moderate", "aggressive"],  # viewer segments
+    }
+
+    # Streaming Anomaly Detection Configuration
+    ANOMALY_DETECTION = {
+        "ewma_alpha": float(os.getenv("ANOMALY_EWMA_ALPHA", "0.2")),  # weight of the newest transaction
+        "z_threshold": float(os.getenv("ANOMALY_Z_THRESHOLD", "3.0")),  # deviations from the running mean
+        "min_observations": int(os.getenv("ANOMALY_MIN_OBSERVATIONS", "5")),  # warm-up before flagging
+        "min_relative_increase": float(os.getenv("ANOMALY_MIN_RELATIVE_INCREASE", "0.5")),  # +50% over the mean
+        "max_anomalies_per_user": int(os.getenv("ANOMALY_MAX_PER_USER", "100")),
+    }
+    
+    # Monte Carlo Goal Simulation Configuration
+    MONTE_CARLO = {
+        "n_paths": int(os.getenv("MONTE_CARLO_PATHS", "5000")),
+        "profit_rate_mean": 0.10,  # expected annual profit share (e.g. 'Аманат' deposit)
+        "profit_rate_std": 0.03,  # annual volatility of the profit share
+        "income_shock_probability": 0.03,  # monthly chance of a contribution shortfall
+        "income_shock_severity": 0.5,  # share of the contribution lost in a shock month
+        "contribution_std": 0.1,  # relative month-to-month noise in contributions
+        "max_paths": 20000,
+        "max_goals": 20,  # goals simulated per request
+        "max_timeline_months": 600,  # simulation horizon cap (50 years)
+        "max_cells": 20_000_000,  # goals × paths × months; paths are reduced to fit
+    }
+    
+    # Nightly Financial Snapshot Job Configuration
+    FINANCIAL_SNAPSHOTS = {
+        "chunk_size": int(os.getenv("SNAPSHOT_CHUNK_SIZE", "500")),  # users per worker task
+        "max_workers": int(os.getenv("SNAPSHOT_MAX_WORKERS", str(os.cpu_count() or 2))),
+        "analysis_window_days": 30,  # transactions used for the monthly metrics
+    }
+
+    # Chat turns persisted to ai_conversations by a write-behind queue
+    CHAT_HISTORY = {
+        "batch_size": int(os.getenv("CHAT_HISTORY_BATCH_SIZE", "100")),  # rows per bulk insert
+        "flush_interval_seconds": float(os.getenv("CHAT_HISTORY_FLUSH_INTERVAL", "0.5")),  # max wait to fill a batch
+        "max_queue_size": 10000,  # senders wait (backpressure) when the queue is full
+        "write_attempts": 4,  # bulk insert attempts before a batch is dropped
+        "retry_backoff_seconds": 0.2,  # doubled after every failed attempt
+        "page_size": 50,
+        "max_page_size": 200,
+        "search_page_size": 20,
+        "search_max_terms": 8,  # words of a search query matched (OR, ranked)
+    }
+
+    # Retention job moving old chat turns to compressed month-partitioned files
+    CHAT_ARCHIVE = {
+        "retention_days": int(os.getenv("CHAT_ARCHIVE_RETENTION_DAYS", "180")),  # turns kept in ai_conversations
+        "batch_size": int(os.getenv("CHAT_ARCHIVE_BATCH_SIZE", "1000")),  # rows moved per transaction
+        "archive_dir": os.getenv(
+            "CHAT_ARCHIVE_DIR",
+            os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "chat_archive")
+        ),
+        "compress_level": 6,
+    }
     
     # Cache Configuration
     REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379")
     CACHE_TTL: int = int(os.getenv("CACHE_TTL", "300"))  # 5 minutes
+
+    # Read-through cache of user profiles (get_user / get_user_by_email / get_user_by_username)
+    USER_CACHE = {
+        "backend": os.getenv("USER_CACHE_BACKEND", "memory"),  # memory (per process) or redis (shared by workers)
+        "max_size": int(os.getenv("USER_CACHE_MAX_SIZE", "10000")),  # keys: id, email and username per user
+        "ttl_seconds": int(os.getenv("USER_CACHE_TTL", "60")),
+        "redis_prefix": "zaman:user:",
+    }
     
     # Logging Configuration
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
@@ -154,21 +287,44 @@ class Settings:
         else:
             return "unknown"
 
+    @property
+    def async_database_url(self) -> str:
+        """DATABASE_URL with an asyncio driver (asyncpg / aiosqlite)"""
+        url = self.DATABASE_URL
+        for sync_prefix, async_prefix in (
+            ("postgresql+psycopg2://", "postgresql+asyncpg://"),
+            ("postgresql://", "postgresql+asyncpg://"),
+            ("sqlite:///", "sqlite+aiosqlite:///"),
+        ):
+            if url.startswith(sync_prefix):
+                return async_prefix + url[len(sync_prefix):]
+        return url
+
+    @property
+    def sqlite_file_database(self) -> bool:
+        return self.database_type == "sqlite" and ":memory:" not in self.DATABASE_URL and self.DATABASE_URL != "sqlite://"
+
     def get_database_config(self) -> dict:
         """Get database configuration for different environments"""
         if self.database_type == "postgresql":
             return {
                 "url": self.DATABASE_URL,
-                "pool_size": 5,
-                "max_overflow": 10,
-                "echo": self.DEBUG
+                "pool_size": self.DATABASE_POOL_SIZE,
+                "max_overflow": self.DATABASE_MAX_OVERFLOW,
+                "pool_timeout": self.DATABASE_POOL_TIMEOUT,
+                "pool_recycle": self.DATABASE_POOL_RECYCLE,
+                "pool_pre_ping": True,
+                "echo": self.DATABASE_ECHO
             }
         else:  # SQLite
-            return {
+            config = {
                 "url": self.DATABASE_URL,
                 "connect_args": {"check_same_thread": False} if self.database_type == "sqlite" else {},
-                "echo": self.DEBUG
+                "echo": self.DATABASE_ECHO
             }
+            if self.sqlite_file_database:
+                config.update(pool_size=self.DATABASE_POOL_SIZE, max_overflow=self.DATABASE_MAX_OVERFLOW)
+            return config
 
     def get_ai_config(self) -> dict:
         """Get AI service configuration"""
@@ -0,0 +1,334 @@
+import re
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import and_, delete, exists, func, not_, or_, select, text, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..core.config import settings
+from ..models.financial import AIConversation, FinancialGoal, FinancialGoalCreate, FinancialSnapshot, Transaction
+from ..models.user import User
+from ..services.chat_archive import chat_archive
+from ..services.pagination import encode_cursor, decode_cursor
+
+TRANSACTION_FIELDS = ("id", "user_id", "amount", "category", "description", "transaction_type", "is_halal", "date")
+CONVERSATION_FIELDS = ("id", "user_id", "user_message", "ai_response", "context", "message_type", "created_at")
+GOAL_FIELDS = (
+    "id", "user_id", "goal_name", "target_amount", "current_amount", "timeline_months",
+    "category", "priority", "islamic_importance", "is_completed"
+)
+
+def transaction_to_dict(transaction: Transaction) -> Dict[str, Any]:
+    return {field: getattr(transaction, field) for field in TRANSACTION_FIELDS}
+
+def goal_to_dict(goal: FinancialGoal) -> Dict[str, Any]:
+    return {field: getattr(goal, field) for field in GOAL_FIELDS}
+
+def conversation_to_dict(conversation: AIConversation) -> Dict[str, Any]:
+    return {field: getattr(conversation, field) for field in CONVERSATION_FIELDS}
+
+def _transaction_filters(
+    user_id: int,
+    since: Optional[datetime] = None,
+    category: Optional[str] = None,
+    transaction_type: Optional[str] = None
+) -> list:
+    filters = [Transaction.user_id == user_id]
+    if since is not None:
+        filters.append(Transaction.date >= since)
+    if category is not None:
+        filters.append(Transaction.category == category)
+    if transaction_type is not None:
+        filters.append(Transaction.transaction_type == transaction_type)
+    return filters
+
+async def get_transactions(
+    db: AsyncSession,
+    user_id: int,
+    since: Optional[datetime] = None,
+    category: Optional[str] = None,
+    transaction_type: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """Транзакции пользователя в хронологическом порядке"""
+    result = await db.scalars(
+        select(Transaction)
+        .where(*_transaction_filters(user_id, since, category, transaction_type))
+        .order_by(Transaction.date, Transaction.id)
+    )
+    return [transaction_to_dict(transaction) for transaction in result]
+
+def _decode_keyset_cursor(cursor: str) -> Tuple[datetime, int]:
+    values = decode_cursor(cursor)
+    try:
+        return datetime.fromisoformat(values[0]), int(values[1])
+    except (IndexError, TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+async def _keyset_page(
+    db: AsyncSession,
+    query,
+    key_column,
+    id_column,
+    limit: int,
+    cursor: Optional[str],
+    to_dict: Callable[[Any], Dict[str, Any]]
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Keyset-страница (новые первыми) по ключу (key_column, id)"""
+    query = query.order_by(key_column.desc(), id_column.desc())
+    if cursor:
+        after_key, after_id = _decode_keyset_cursor(cursor)
+        query = query.where(tuple_(key_column, id_column) < tuple_(after_key, after_id))
+    rows = [to_dict(record) for record in await db.scalars(query.limit(limit + 1))]
+    if len(rows) <= limit:
+        return rows, None
+    page = rows[:limit]
+    return page, encode_cursor(page[-1][key_column.key].isoformat(), page[-1]["id"])
+
+async def get_transactions_page(
+    db: AsyncSession,
+    user_id: int,
+    limit: int,
+    cursor: Optional[str] = None,
+    category: Optional[str] = None,
+    transaction_type: Optional[str] = None
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Keyset-страница транзакций (новые первыми) по ключу (date, id)"""
+    query = select(Transaction).where(*_transaction_filters(user_id, category=category, transaction_type=transaction_type))
+    return await _keyset_page(db, query, Transaction.date, Transaction.id, limit, cursor, transaction_to_dict)
+
+async def create_transaction(db: AsyncSession, transaction: Dict[str, Any]) -> Dict[str, Any]:
+    record = Transaction(**{field: value for field, value in transaction.items() if field in TRANSACTION_FIELDS and field != "id"})
+    db.add(record)
+    await db.commit()
+    await db.refresh(record)
+    return transaction_to_dict(record)
+
+async def get_goals(db: AsyncSession, user_id: int, include_completed: bool = True) -> List[Dict[str, Any]]:
+    query = select(FinancialGoal).where(FinancialGoal.user_id == user_id)
+    if not include_completed:
+        query = query.where(FinancialGoal.is_completed.isnot(True))
+    result = await db.scalars(query.order_by(FinancialGoal.id))
+    return [goal_to_dict(goal) for goal in result]
+
+async def get_goal(db: AsyncSession, user_id: int, goal_id: int) -> Optional[Dict[str, Any]]:
+    goal = await db.scalar(select(FinancialGoal).where(FinancialGoal.id == goal_id, FinancialGoal.user_id == user_id))
+    return goal_to_dict(goal) if goal else None
+
+async def create_goal(db: AsyncSession, user_id: int, goal: FinancialGoalCreate) -> Dict[str, Any]:
+    record = FinancialGoal(user_id=user_id, current_amount=0.0, is_completed=False, **goal.dict())
+    db.add(record)
+    await db.commit()
+    await db.refresh(record)
+    return goal_to_dict(record)
+
+async def get_conversations_page(
+    db: AsyncSession,
+    user_id: int,
+    limit: int,
+    cursor: Optional[str] = None
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Keyset-страница диалогов с AI (новые первыми) по индексу (user_id, created_at, id)"""
+    query = select(AIConversation).where(AIConversation.user_id == user_id)
+    return await _keyset_page(db, query, AIConversation.created_at, AIConversation.id, limit, cursor, conversation_to_dict)
+
+async def get_conversation_history_page(
+    db: AsyncSession,
+    user_id: int,
+    limit: int,
+    cursor: Optional[str] = None
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Страница истории (новые первыми): сначала таблица, затем архив старых реплик
+
+    Ключ (created_at, id) общий для таблицы и архива, поэтому курсор
+    продолжает страницы через границу между ними.
+    """
+    conversations, next_cursor = await get_conversations_page(db, user_id, limit, cursor)
+    if next_cursor is not None:
+        return conversations, next_cursor
+
+    if conversations:
+        before = (conversations[-1]["created_at"], conversations[-1]["id"])
+    else:
+        before = _decode_keyset_cursor(cursor) if cursor else None
+    archived, has_more = await run_in_threadpool(chat_archive.read_page, user_id, limit - len(conversations), before)
+    conversations = conversations + archived
+    if not has_more or not conversations:
+        return conversations, None
+    return conversations, encode_cursor(conversations[-1]["created_at"].isoformat(), conversations[-1]["id"])
+
+async def count_conversations(db: AsyncSession, user_id: int) -> int:
+    """Число реплик пользователя в таблице и в архиве"""
+    archived = await run_in_threadpool(chat_archive.archived_count, user_id)
+    return await count_rows(db, AIConversation, user_id) + archived
+
+async def delete_conversations(db: AsyncSession, user_id: int) -> int:
+    """Очистка истории одним DELETE и удаление архива; возвращает число удаленных реплик"""
+    result = await db.execute(
+        delete(AIConversation).where(AIConversation.user_id == user_id).execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    archived = await run_in_threadpool(chat_archive.delete_user, user_id)
+    return result.rowcount + archived
+
+def search_terms(query: str) -> List[str]:
+    """Слова поискового запроса (буквы и цифры) без повторов, не длиннее лимита"""
+    terms = []
+    for term in re.findall(r"[^\W_]+", query.lower()):
+        if len(term) >= 2 and term not in terms:
+            terms.append(term)
+    return terms[:settings.CHAT_HISTORY["search_max_terms"]]
+
+def _search_snippet(content: Optional[str], terms: List[str], width: int = 80) -> Optional[str]:
+    """Фрагмент текста вокруг первого найденного слова"""
+    if not content:
+        return None
+    lowered = content.lower()
+    positions = [position for position in (lowered.find(term) for term in terms) if position >= 0]
+    if not positions:
+        return None
+    start = max(min(positions) - width // 2, 0)
+    end = min(start + width, len(content))
+    return ("…" if start > 0 else "") + content[start:end] + ("…" if end < len(content) else "")
+
+# Страница совпадений: rank по возрастанию (лучшие первыми), затем id
+SQLITE_SEARCH_PAGE = """
+    SELECT c.id, c.user_id, c.user_message, c.ai_response, c.message_type, c.created_at, page.rank
+    FROM (
+        SELECT id, rank FROM (
+            SELECT rowid AS id, bm25(ai_conversations_fts, 0.0, 1.0, 1.0) AS rank
+            FROM ai_conversations_fts
+            WHERE ai_conversations_fts MATCH :match
+        )
+        WHERE (rank, id) > (:after_rank, :after_id)
+        ORDER BY rank, id
+        LIMIT :limit
+    ) AS page
+    JOIN ai_conversations AS c ON c.id = page.id
+    ORDER BY page.rank, page.id
+"""
+
+POSTGRESQL_SEARCH_PAGE = """
+    SELECT c.id, c.user_id, c.user_message, c.ai_response, c.message_type, c.created_at, page.rank
+    FROM (
+        SELECT id, rank FROM (
+            SELECT id, -ts_rank_cd(search_vector, query) AS rank
+            FROM ai_conversations, to_tsquery('simple', :tsquery) AS query
+            WHERE search_vector @@ query {user_filter}
+        ) AS matches
+        WHERE (rank, id) > (:after_rank, :after_id)
+        ORDER BY rank, id
+        LIMIT :limit
+    ) AS page
+    JOIN ai_conversations AS c ON c.id = page.id
+    ORDER BY page.rank, page.id
+"""
+
+async def search_conversations(
+    db: AsyncSession,
+    user_id: Optional[int],
+    query: str,
+    limit: int,
+    cursor: Optional[str] = None
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Ранжированный полнотекстовый поиск по диалогам с AI (user_id=None — по всем пользователям)
+
+    Совпадения ищутся только по индексу (FTS5 на SQLite, GIN по tsvector на
+    PostgreSQL); страницы — keyset по ключу (rank, id).
+    """
+    after_rank, after_id = float("-inf"), 0
+    if cursor:
+        values = decode_cursor(cursor)
+        try:
+            after_rank, after_id = float(values[0]), int(values[1])
+        except (IndexError, TypeError, ValueError) as e:
+            raise ValueError(f"Invalid cursor: {cursor}") from e
+
+    terms = search_terms(query)
+    if not terms:
+        return [], None
+    params = {"after_rank": after_rank, "after_id": after_id, "limit": limit + 1}
+
+    if settings.database_type == "postgresql":
+        params["tsquery"] = " | ".join(f"{term}:*" for term in terms)
+        user_filter = ""
+        if user_id is not None:
+            user_filter = "AND user_id = :user_id"
+            params["user_id"] = user_id
+        statement = text(POSTGRESQL_SEARCH_PAGE.format(user_filter=user_filter))
+    else:
+        match = "{user_message ai_response} : (" + " OR ".join(f'"{term}"*' for term in terms) + ")"
+        if user_id is not None:
+            match = f"user_id : {int(user_id)} AND {match}"
+        params["match"] = match
+        statement = text(SQLITE_SEARCH_PAGE)
+
+    statement = statement.columns(created_at=AIConversation.created_at.type)
+    rows = (await db.execute(statement, params)).mappings().all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["rank"], rows[-1]["id"])
+
+    results = [
+        {
+            "conversation_id": row["id"],
+            "user_id": row["user_id"],
+            "user_message": row["user_message"],
+            "ai_response": row["ai_response"],
+            "message_type": row["message_type"],
+            "created_at": row["created_at"],
+            "score": -row["rank"],
+            "snippet": _search_snippet(row["ai_response"], terms) or _search_snippet(row["user_message"], terms)
+        }
+        for row in rows
+    ]
+    return results, next_cursor
+
+async def count_rows(db: AsyncSession, model, user_id: int) -> int:
+    return await db.scalar(select(func.count()).select_from(model).where(model.user_id == user_id))
+
+def snapshot_is_stale():
+    """Условие для запроса с User и FinancialSnapshot: снимка нет или профиль/транзакции менялись после расчета
+
+    Изменения транзакций определяются по времени записи updated_at (бизнес-дата
+    date задается клиентом и может быть в прошлом) и по числу транзакций (удаления).
+    """
+    written_transactions = exists().where(and_(
+        Transaction.user_id == User.id,
+        Transaction.updated_at > FinancialSnapshot.computed_at
+    ))
+    transaction_count = (
+        select(func.count())
+        .select_from(Transaction)
+        .where(Transaction.user_id == User.id)
+        .correlate(User)
+        .scalar_subquery()
+    )
+    return or_(
+        FinancialSnapshot.id.is_(None),
+        FinancialSnapshot.transaction_count.is_(None),
+        User.updated_at > FinancialSnapshot.computed_at,
+        User.last_financial_update > FinancialSnapshot.computed_at,
+        written_transactions,
+        transaction_count != FinancialSnapshot.transaction_count
+    )
+
+async def get_snapshot(db: AsyncSession, user_id: int) -> Optional[Dict[str, Any]]:
+    """Снимок пользователя из ночного пакетного расчета, если он актуален
+
+    None, если снимка нет или после расчета менялись профиль или транзакции:
+    вызывающий код тогда считает показатели по живым данным.
+    """
+    snapshot = await db.scalar(
+        select(FinancialSnapshot)
+        .join(User, User.id == FinancialSnapshot.user_id)
+        .where(FinancialSnapshot.user_id == user_id, not_(func.coalesce(snapshot_is_stale(), False)))
+    )
+    if snapshot is None:
+        return None
+    return {
+        "metrics": snapshot.metrics,
+        "budget_recommendations": snapshot.budget_recommendations,
+        "zakat": snapshot.zakat,
+        "computed_at": snapshot.computed_at
+    }
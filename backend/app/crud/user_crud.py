@@ -1,29 +1,100 @@
-from sqlalchemy.orm import Session
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from ..models.user import User, UserCreate
 from ..core.security import get_password_hash
+from ..services.user_cache import user_cache
 
-def create_user(db: Session, user: UserCreate):
-    hashed_password = get_password_hash(user.password)
+async def create_user(db: AsyncSession, user: UserCreate):
+    # bcrypt заметно нагружает CPU — считаем вне цикла событий
+    hashed_password = await run_in_threadpool(get_password_hash, user.password)
     db_user = User(
         email=user.email,
         username=user.username,
         hashed_password=hashed_password,
         full_name=user.full_name,
         age=user.age,
-        monthly_income=user.monthly_income,
+        monthly_income=user.monthly_income or 0.0,
+        monthly_expenses=user.monthly_expenses or (user.monthly_income * 0.7 if user.monthly_income else 0.0),
         risk_profile=user.risk_profile,
-        islamic_knowledge=user.islamic_knowledge
+        islamic_knowledge=user.islamic_knowledge,
+        currency=user.currency,
+        occupation=user.occupation,
+        family_size=user.family_size,
+        financial_priorities=user.financial_priorities or [],
+        financial_goals=[],
+        last_financial_update=datetime.now(timezone.utc)
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     return db_user
 
-def get_user_by_email(db: Session, email: str):
-    return db.query(User).filter(User.email == email).first()
+async def _get_user_cached(db: AsyncSession, field: str, value: Any, use_cache: bool):
+    """Профиль из кэша, иначе из БД с записью в кэш
+
+    С use_cache=False возвращается привязанный к сессии User (для изменений).
+    Поколение кэша берется до чтения: если update_user инвалидирует профиль,
+    пока строка читается, прочитанная старая версия в кэш не попадет.
+    """
+    generation = None
+    if use_cache:
+        cached = await user_cache.get(field, value)
+        if cached is not None:
+            return cached
+        generation = await user_cache.generation()
+    user = await db.scalar(select(User).where(getattr(User, field) == value))
+    if user is None or not use_cache:
+        return user
+    return await user_cache.put(user, generation)
+
+async def get_user_by_email(db: AsyncSession, email: str, use_cache: bool = True):
+    return await _get_user_cached(db, "email", email, use_cache)
+
+async def get_user_by_username(db: AsyncSession, username: str, use_cache: bool = True):
+    return await _get_user_cached(db, "username", username, use_cache)
+
+async def get_user_by_login(db: AsyncSession, login: str):
+    """Пользователь по имени или email (всегда из БД: нужен хеш пароля)"""
+    return await db.scalar(select(User).where(or_(User.username == login, User.email == login)))
+
+async def get_user(db: AsyncSession, user_id: int, use_cache: bool = True):
+    return await _get_user_cached(db, "id", user_id, use_cache)
+
+async def update_user(db: AsyncSession, user: User, fields: Dict[str, Any]):
+    previous_aliases = [("email", user.email), ("username", user.username)]
+    for field, value in fields.items():
+        setattr(user, field, value)
+    user.updated_at = datetime.now(timezone.utc)
+    if "monthly_income" in fields or "monthly_expenses" in fields:
+        user.last_financial_update = datetime.now(timezone.utc)
+    await db.commit()
+    await db.refresh(user)
+    await user_cache.invalidate(user.id, previous_aliases + [("email", user.email), ("username", user.username)])
+    return user
 
-def get_user_by_username(db: Session, username: str):
-    return db.query(User).filter(User.username == username).first()
+def user_profile(user: Optional[User]) -> Dict[str, Any]:
+    """Профиль пользователя для финансовых расчетов"""
+    if user is None:
+        return {}
+    return {
+        "user_id": user.id,
+        "username": user.full_name or user.username,
+        "age": user.age,
+        "monthly_income": user.monthly_income or 0.0,
+        "monthly_expenses": user.monthly_expenses or 0.0,
+        "risk_profile": user.risk_profile or "moderate",
+        "islamic_knowledge": user.islamic_knowledge or "beginner",
+        "currency": user.currency or "KZT",
+        "family_size": user.family_size or 1
+    }
 
-def get_user(db: Session, user_id: int):
-    return db.query(User).filter(User.id == user_id).first()
\ No newline at end of file
+async def get_user_or_404(db: AsyncSession, user_id: int, use_cache: bool = True):
+    user = await get_user(db, user_id, use_cache)
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user
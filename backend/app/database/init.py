@@ -1,3 +1,3 @@
-from .session import get_db, create_tables
+from .session import get_db, get_async_db, create_tables, create_tables_async
 
-__all__ = ["get_db", "create_tables"]
\ No newline at end of file
+__all__ = ["get_db", "get_async_db", "create_tables", "create_tables_async"]
@@ -0,0 +1,48 @@
+"""Применение миграций Alembic (backend/migrations) к DATABASE_URL"""
+import logging
+import os
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect
+
+from .session import engine
+
+logger = logging.getLogger(__name__)
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+BASELINE_REVISION = "0001"
+
+
+def alembic_config() -> Config:
+    config = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "migrations"))
+    config.attributes["connection"] = engine
+    config.attributes["configure_logger"] = False
+    return config
+
+
+def _legacy_revision() -> str:
+    """Ревизия для БД, созданной через create_all() без таблицы alembic_version"""
+    inspector = inspect(engine)
+    if "updated_at" in {column["name"] for column in inspector.get_columns("transactions")}:
+        return "0005"
+    conversation_indexes = {index["name"] for index in inspector.get_indexes("ai_conversations")}
+    if "ix_ai_conversations_created" in conversation_indexes:
+        return "0004"
+    if "ai_conversations_fts" in inspector.get_table_names():
+        return "0003"
+    if "ix_ai_conversations_user_created" in conversation_indexes:
+        return "0002"
+    return BASELINE_REVISION
+
+
+def upgrade_database() -> None:
+    """alembic upgrade head; существующая схема без истории миграций сначала помечается (stamp)"""
+    config = alembic_config()
+    tables = set(inspect(engine).get_table_names())
+    if "alembic_version" not in tables and "users" in tables:
+        revision = _legacy_revision()
+        logger.info(f"Existing schema without migration history, stamping {revision}")
+        command.stamp(config, revision)
+    command.upgrade(config, "head")
@@ -0,0 +1,79 @@
+"""Демо-данные для пустой базы разработки (пользователь testuser / testpass)"""
+import logging
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.security import get_password_hash
+from ..models.financial import FinancialGoal, Transaction
+from ..models.user import User
+
+logger = logging.getLogger(__name__)
+
+DEMO_USER = {
+    "username": "testuser",
+    "email": "test@example.com",
+    "full_name": "Test User",
+    "age": 30,
+    "monthly_income": 500000.0,
+    "monthly_expenses": 350000.0,
+    "risk_profile": "moderate",
+    "islamic_knowledge": "intermediate",
+    "currency": "KZT",
+    "occupation": "Software Developer",
+    "family_size": 3,
+    "financial_priorities": ["savings", "investment", "charity"],
+    "financial_goals": []
+}
+
+# (дней назад, сумма, категория, описание, тип)
+DEMO_TRANSACTIONS = [
+    (14, 500000, "salary", "Зарплата", "income"),
+    (10, 20000, "health", "Медицина", "expense"),
+    (7, 30000, "transport", "Транспорт", "expense"),
+    (5, 75000, "food", "Продукты", "expense"),
+    (3, 25000, "entertainment", "Ресторан", "expense"),
+    (1, 150000, "housing", "Аренда квартиры", "expense"),
+]
+
+DEMO_GOALS = [
+    {"goal_name": "Покупка квартиры", "target_amount": 15000000, "current_amount": 1000000, "timeline_months": 60, "category": "housing", "priority": "high"},
+    {"goal_name": "Хадж", "target_amount": 2000000, "current_amount": 300000, "timeline_months": 24, "category": "hajj", "priority": "medium"},
+    {"goal_name": "Образование детей", "target_amount": 5000000, "current_amount": 500000, "timeline_months": 48, "category": "education", "priority": "high"},
+]
+
+
+async def seed_demo_data(db: AsyncSession) -> bool:
+    """Создает демо-пользователя с транзакциями и целями, если пользователей еще нет"""
+    if await db.scalar(select(func.count()).select_from(User)):
+        return False
+
+    now = datetime.now()
+    user = User(
+        **DEMO_USER,
+        hashed_password=get_password_hash("testpass"),
+        last_financial_update=datetime.now(timezone.utc)
+    )
+    db.add(user)
+    await db.flush()
+
+    db.add_all([
+        Transaction(
+            user_id=user.id,
+            amount=amount,
+            category=category,
+            description=description,
+            transaction_type=transaction_type,
+            is_halal=True,
+            date=now - timedelta(days=days_ago)
+        )
+        for days_ago, amount, category, description, transaction_type in DEMO_TRANSACTIONS
+    ])
+    db.add_all([
+        FinancialGoal(user_id=user.id, islamic_importance="mubah", is_completed=False, **goal)
+        for goal in DEMO_GOALS
+    ])
+    await db.commit()
+    logger.info(f"Seeded demo user {user.username} (id={user.id})")
+    return True
@@ -1,17 +1,99 @@
-from sqlalchemy import create_engine
+from typing import AsyncIterator
+
+from sqlalchemy import create_engine, event, Delete, Insert, Update
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from ..core.config import settings
 
-# Создаем движок базы данных
-engine = create_engine(
-    settings.DATABASE_URL, 
-    connect_args={"check_same_thread": False}  # Только для SQLite
-)
+# Параметры подключения и пула (pool_size / max_overflow) из настроек окружения
+database_config = settings.get_database_config()
+engine_options = {key: value for key, value in database_config.items() if key != "url"}
+
+# Режим SQLite с WAL: чтение идет через пул read-only соединений, запись — через одно соединение
+sqlite_read_write_split = settings.sqlite_file_database and settings.SQLITE["read_write_split"]
+
+
+def apply_sqlite_pragmas(bind: Engine, read_only: bool = False) -> None:
+    """PRAGMA-настройки SQLite на каждом новом соединении
+
+    journal_mode хранится в самом файле БД, поэтому задается только пишущими соединениями.
+    """
+    pragmas = dict(settings.SQLITE["pragmas"])
+    if read_only:
+        pragmas.pop("journal_mode", None)
+        pragmas["query_only"] = "ON"
+
+    @event.listens_for(bind, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+# Синхронный движок: пакетные задачи и скрипты
+engine = create_engine(settings.DATABASE_URL, **engine_options)
+
+if sqlite_read_write_split:
+    # Единственный пишущий процесс SQLite: ожидание в очереди пула вместо SQLITE_BUSY
+    async_engine = create_async_engine(
+        settings.async_database_url,
+        **{**engine_options, "pool_size": 1, "max_overflow": 0},
+        poolclass=AsyncAdaptedQueuePool
+    )
+    async_read_engine = create_async_engine(
+        settings.async_database_url,
+        **{
+            **engine_options,
+            "pool_size": settings.SQLITE["read_pool_size"],
+            "max_overflow": settings.SQLITE["read_max_overflow"]
+        },
+        poolclass=AsyncAdaptedQueuePool
+    )
+else:
+    # Асинхронный движок для роутеров (asyncpg / aiosqlite); aiosqlite по умолчанию
+    # не держит пул для файловой БД, поэтому пул задается явно
+    async_engine = create_async_engine(
+        settings.async_database_url,
+        **engine_options,
+        **({"poolclass": AsyncAdaptedQueuePool} if "pool_size" in engine_options and settings.database_type == "sqlite" else {})
+    )
+    async_read_engine = async_engine
+
+if settings.sqlite_file_database:
+    apply_sqlite_pragmas(engine)
+    apply_sqlite_pragmas(async_engine.sync_engine)
+    if sqlite_read_write_split:
+        apply_sqlite_pragmas(async_read_engine.sync_engine, read_only=True)
+
 
-# Создаем фабрику сессий
+class ReadWriteSession(Session):
+    """Сессия, направляющая SELECT в пул чтения, а flush и DML — в пишущее соединение
+
+    Чтение после записи в рамках одной транзакции видит данные только после commit.
+    Пакетный ORM INSERT (execute(insert(Model), rows)) запрашивает соединение
+    по mapper без выражения — это тоже запись.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self._flushing or isinstance(clause, (Insert, Update, Delete)) or (clause is None and mapper is not None):
+            return async_engine.sync_engine
+        return async_read_engine.sync_engine
+
+
+# Создаем фабрики сессий
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,
+    **({"sync_session_class": ReadWriteSession} if sqlite_read_write_split else {})
+)
 
 # Базовый класс для моделей
 Base = declarative_base()
@@ -24,6 +106,41 @@ def get_db():
     finally:
         db.close()
 
+# Асинхронная сессия для зависимостей FastAPI
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def _register_models() -> None:
+    # Модели импортируют Base из этого модуля, поэтому импорт отложен
+    from ..models import user, financial  # noqa: F401
+
 # Функция для создания таблиц
 def create_tables():
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+    _register_models()
+    Base.metadata.create_all(bind=engine)
+
+async def create_tables_async():
+    _register_models()
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+async def warm_up_engines():
+    """Открыть по одному соединению каждого async-движка до приема запросов
+
+    Первое соединение пула инициализирует диалект под потоковой блокировкой
+    SQLAlchemy. Если, пока оно ждет драйвер, другой запрос того же event loop
+    открывает второе соединение, он ждет эту блокировку в том же потоке —
+    и цикл событий зависает. Последовательный прогрев снимает гонку.
+    """
+    async with async_engine.connect():
+        pass
+    if async_read_engine is not async_engine:
+        async with async_read_engine.connect():
+            pass
+
+async def dispose_engines():
+    await async_engine.dispose()
+    if async_read_engine is not async_engine:
+        await async_read_engine.dispose()
+    engine.dispose()
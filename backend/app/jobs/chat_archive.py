@@ -0,0 +1,82 @@
+"""Перенос старых реплик чата из ai_conversations в сжатый архив по месяцам
+
+Запуск: python -m app.jobs.chat_archive [--days N] [--batch-size N]
+
+Реплики старше N дней пачками (по индексу (created_at, id)) дописываются в
+файлы архива и только после записи на диск удаляются из таблицы, поэтому
+размер горячей таблицы ограничен периодом хранения. История чата читает
+архив прозрачно (services/chat_archive.py).
+"""
+import argparse
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional
+
+from sqlalchemy import delete, select
+
+from ..core.config import settings
+from ..database.session import SessionLocal
+from ..models.financial import AIConversation
+from ..services.chat_archive import ChatArchive, chat_archive
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_COLUMNS = (
+    AIConversation.id,
+    AIConversation.user_id,
+    AIConversation.user_message,
+    AIConversation.ai_response,
+    AIConversation.context,
+    AIConversation.message_type,
+    AIConversation.created_at
+)
+
+
+def run(
+    retention_days: Optional[int] = None,
+    batch_size: Optional[int] = None,
+    archive: Optional[ChatArchive] = None
+) -> Dict[str, Any]:
+    """Архивация реплик старше retention_days, пачка за пачкой в отдельных транзакциях"""
+    config = settings.CHAT_ARCHIVE
+    retention_days = config["retention_days"] if retention_days is None else retention_days
+    batch_size = batch_size or config["batch_size"]
+    archive = archive or chat_archive
+    # created_at проставляется локальным временем при постановке в очередь записи
+    cutoff = datetime.now() - timedelta(days=retention_days)
+
+    moved = archived = 0
+    with SessionLocal() as db:
+        while True:
+            rows = [
+                dict(row._mapping)
+                for row in db.execute(
+                    select(*ARCHIVE_COLUMNS)
+                    .where(AIConversation.created_at < cutoff)
+                    .order_by(AIConversation.created_at, AIConversation.id)
+                    .limit(batch_size)
+                )
+            ]
+            if not rows:
+                break
+            archived += archive.append(rows)
+            db.execute(
+                delete(AIConversation)
+                .where(AIConversation.id.in_([row["id"] for row in rows]))
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+            moved += len(rows)
+
+    logger.info(f"Chat archive: {moved} turns older than {retention_days} days moved ({archived} newly archived)")
+    return {"turns_moved": moved, "turns_archived": archived, "cutoff": cutoff, "archive_dir": archive.archive_dir}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move old chat turns to the compressed month-partitioned archive")
+    parser.add_argument("--days", type=int, default=None, help="Retention period of the ai_conversations table")
+    parser.add_argument("--batch-size", type=int, default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=settings.LOG_LEVEL, format=settings.LOG_FORMAT)
+    print(run(retention_days=args.days, batch_size=args.batch_size))
@@ -0,0 +1,173 @@
+"""Ночной пакетный расчет FinancialMetrics и BudgetRecommendation для всех пользователей
+
+Запуск: python -m app.jobs.financial_snapshots [--full] [--chunk-size N] [--workers N]
+
+По умолчанию пересчитываются только пользователи, у которых нет снимка или чей
+профиль/транзакции изменились после последнего расчета. Изменения транзакций
+определяются по времени записи updated_at (бизнес-дата date задается клиентом
+и может быть в прошлом) и по числу транзакций (удаления). Все отметки времени
+в UTC; схему создают миграции (app/database/migrate.py).
+"""
+import argparse
+import json
+import logging
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Any, Optional
+
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..crud.financial_crud import snapshot_is_stale
+from ..database.session import SessionLocal
+from ..models.financial import FinancialSnapshot, Transaction
+from ..models.user import User
+from ..services.financial_calculator import financial_calculator
+from ..services.zakat_service import zakat_service
+
+logger = logging.getLogger(__name__)
+
+PROFILE_FIELDS = ("monthly_income", "monthly_expenses", "age", "risk_profile", "family_size")
+
+
+def _as_naive_utc(value: datetime) -> datetime:
+    if value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _json_safe(value: Any) -> Any:
+    return json.loads(json.dumps(value, default=str))
+
+
+def _stale_user_ids(db: Session, full: bool) -> List[int]:
+    """Пользователи без снимка или с изменениями после последнего расчета"""
+    query = (
+        db.query(User.id)
+        .outerjoin(FinancialSnapshot, FinancialSnapshot.user_id == User.id)
+        .filter(User.is_active.isnot(False))
+    )
+    if not full:
+        query = query.filter(snapshot_is_stale())
+    return [row.id for row in query.order_by(User.id)]
+
+
+def _load_chunk(db: Session, user_ids: List[int]) -> Dict[str, List[Dict[str, Any]]]:
+    """Профили и транзакции пачки пользователей (только нужные колонки)"""
+    users = db.query(User.id, *[getattr(User, field) for field in PROFILE_FIELDS]).filter(User.id.in_(user_ids))
+    transactions = db.query(
+        Transaction.user_id,
+        Transaction.amount,
+        Transaction.category,
+        Transaction.transaction_type,
+        Transaction.date
+    ).filter(Transaction.user_id.in_(user_ids))
+
+    return {
+        "users": [{"user_id": row.id, **{field: getattr(row, field) for field in PROFILE_FIELDS}} for row in users],
+        "transactions": [dict(row._mapping) for row in transactions]
+    }
+
+
+def compute_chunk(payload: Dict[str, List[Dict[str, Any]]], as_of: datetime) -> List[Dict[str, Any]]:
+    """Расчет снимков для пачки пользователей (выполняется в процессе пула, без доступа к БД)"""
+    window_start = as_of - timedelta(days=settings.FINANCIAL_SNAPSHOTS["analysis_window_days"])
+
+    transactions_by_user: Dict[int, List[Dict[str, Any]]] = {}
+    for transaction in payload["transactions"]:
+        transactions_by_user.setdefault(transaction["user_id"], []).append(transaction)
+
+    zakat_by_user = zakat_service.compute_batch(payload["transactions"], as_of=as_of.date())
+
+    snapshots = []
+    for profile in payload["users"]:
+        user_id = profile["user_id"]
+        recent = [
+            t for t in transactions_by_user.get(user_id, [])
+            if t["date"] is None or _as_naive_utc(t["date"]) >= window_start
+        ]
+
+        if recent:
+            basic_analysis = financial_calculator.analyze_spending_pattern(recent)
+        else:
+            # Нет транзакций за период: используем данные профиля
+            income = profile["monthly_income"] or 0
+            expenses = profile["monthly_expenses"] or 0
+            basic_analysis = {
+                "total_income": income,
+                "total_expenses": expenses,
+                "savings_rate": (income - expenses) / income if income > 0 else 0,
+                "expenses_by_category": {}
+            }
+
+        zakat = zakat_by_user.get(user_id)
+        metrics = financial_calculator.calculate_financial_metrics(profile, basic_analysis, zakat)
+        budget_recommendations = financial_calculator.generate_budget_recommendations(
+            profile, basic_analysis["expenses_by_category"]
+        )
+
+        snapshots.append({
+            "user_id": user_id,
+            "transaction_count": len(transactions_by_user.get(user_id, [])),
+            "metrics": metrics.dict(),
+            "budget_recommendations": [recommendation.dict() for recommendation in budget_recommendations],
+            "zakat": _json_safe(zakat) if zakat else None
+        })
+    return snapshots
+
+
+def _write_snapshots(db: Session, snapshots: List[Dict[str, Any]], computed_at: datetime) -> None:
+    """Замена снимков пачки пользователей в одной транзакции"""
+    user_ids = [snapshot["user_id"] for snapshot in snapshots]
+    db.query(FinancialSnapshot).filter(FinancialSnapshot.user_id.in_(user_ids)).delete(synchronize_session=False)
+    db.bulk_insert_mappings(FinancialSnapshot, [{**snapshot, "computed_at": computed_at} for snapshot in snapshots])
+    db.commit()
+
+
+def run(full: bool = False, chunk_size: Optional[int] = None, max_workers: Optional[int] = None) -> Dict[str, Any]:
+    """Пересчет снимков с распределением пачек пользователей по пулу процессов"""
+    config = settings.FINANCIAL_SNAPSHOTS
+    chunk_size = chunk_size or config["chunk_size"]
+    max_workers = max_workers or config["max_workers"]
+    # Время начала: изменения, сделанные во время прогона, попадут в следующий
+    started_at = datetime.now(timezone.utc)
+    as_of = _as_naive_utc(started_at)
+
+    with SessionLocal() as db:
+        user_ids = _stale_user_ids(db, full)
+        chunks = iter([user_ids[i:i + chunk_size] for i in range(0, len(user_ids), chunk_size)])
+        written = 0
+
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            pending = set()
+
+            def submit_next() -> None:
+                chunk = next(chunks, None)
+                if chunk:
+                    pending.add(pool.submit(compute_chunk, _load_chunk(db, chunk), as_of))
+
+            # Не больше двух пачек на процесс в памяти одновременно
+            for _ in range(max_workers * 2):
+                submit_next()
+
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    snapshots = future.result()
+                    _write_snapshots(db, snapshots, started_at)
+                    written += len(snapshots)
+                    submit_next()
+
+    logger.info(f"Financial snapshots: {written} users recomputed ({'full' if full else 'incremental'} run)")
+    return {"users_recomputed": written, "full": full, "computed_at": started_at}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recompute FinancialMetrics snapshots for all users")
+    parser.add_argument("--full", action="store_true", help="Recompute every user, not only changed ones")
+    parser.add_argument("--chunk-size", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=settings.LOG_LEVEL, format=settings.LOG_FORMAT)
+    print(run(full=args.full, chunk_size=args.chunk_size, max_workers=args.workers))
@@ -1,14 +1,24 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, JSON, Boolean, Text
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.sql import func
-from pydantic import BaseModel
+from sqlalchemy import Column, Integer, String, Float, DateTime, JSON, Boolean, Text, Index, UniqueConstraint, DDL, event
+from sqlalchemy.sql import func, text
+from pydantic import BaseModel, Field
 from typing import Optional, List, Dict, Any
-from datetime import datetime
+from datetime import datetime, timezone
 
-Base = declarative_base()
+from ..database.session import Base
+
+def utc_now() -> datetime:
+    return datetime.now(timezone.utc)
 
 class FinancialGoal(Base):
     __tablename__ = "financial_goals"
+    __table_args__ = (
+        # Partial index: goal planning reads only the user's incomplete goals
+        Index(
+            "ix_financial_goals_user_active", "user_id", "id",
+            sqlite_where=text("is_completed IS NOT 1"),
+            postgresql_where=text("is_completed IS NOT TRUE")
+        ),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, index=True)
@@ -24,27 +34,109 @@ class FinancialGoal(Base):
 
 class Transaction(Base):
     __tablename__ = "transactions"
+    __table_args__ = (
+        # Filter by user, range/order by date, keyset tie-break on id
+        Index("ix_transactions_user_date", "user_id", "date", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, index=True)
+    user_id = Column(Integer)
     amount = Column(Float)
     category = Column(String)
     description = Column(String)
     transaction_type = Column(String)  # income, expense
     is_halal = Column(Boolean, default=True)
     date = Column(DateTime(timezone=True), server_default=func.now())
+    # When the row was last written (UTC); date is the client-set business date
+    updated_at = Column(DateTime(timezone=True), default=utc_now, onupdate=utc_now)
 
 class AIConversation(Base):
     __tablename__ = "ai_conversations"
+    __table_args__ = (
+        Index("ix_ai_conversations_user_created", "user_id", "created_at", "id"),
+        # Retention job: oldest turns across all users
+        Index("ix_ai_conversations_created", "created_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, index=True)
+    user_id = Column(Integer)
     user_message = Column(Text)
     ai_response = Column(Text)
     context = Column(JSON)  # Store user context for personalization
     message_type = Column(String)  # goal_planning, habit_advice, product_recommendation, stress_management
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+# SQLite full-text index over chat turns, kept in sync by triggers. File databases get it
+# from migration 0003; this covers create_all() (in-memory SQLite).
+CONVERSATION_SEARCH_SQLITE_DDL = [
+    """
+    CREATE VIRTUAL TABLE ai_conversations_fts USING fts5(
+        user_id, user_message, ai_response,
+        content='ai_conversations', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER ai_conversations_fts_insert AFTER INSERT ON ai_conversations BEGIN
+        INSERT INTO ai_conversations_fts(rowid, user_id, user_message, ai_response)
+        VALUES (new.id, new.user_id, new.user_message, new.ai_response);
+    END
+    """,
+    """
+    CREATE TRIGGER ai_conversations_fts_delete AFTER DELETE ON ai_conversations BEGIN
+        INSERT INTO ai_conversations_fts(ai_conversations_fts, rowid, user_id, user_message, ai_response)
+        VALUES ('delete', old.id, old.user_id, old.user_message, old.ai_response);
+    END
+    """,
+    """
+    CREATE TRIGGER ai_conversations_fts_update AFTER UPDATE OF user_id, user_message, ai_response ON ai_conversations BEGIN
+        INSERT INTO ai_conversations_fts(ai_conversations_fts, rowid, user_id, user_message, ai_response)
+        VALUES ('delete', old.id, old.user_id, old.user_message, old.ai_response);
+        INSERT INTO ai_conversations_fts(rowid, user_id, user_message, ai_response)
+        VALUES (new.id, new.user_id, new.user_message, new.ai_response);
+    END
+    """,
+]
+
+for statement in CONVERSATION_SEARCH_SQLITE_DDL:
+    event.listen(AIConversation.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+event.listen(
+    AIConversation.__table__, "before_drop",
+    DDL("DROP TABLE IF EXISTS ai_conversations_fts").execute_if(dialect="sqlite")
+)
+
+class FinancialSnapshot(Base):
+    """Precomputed FinancialMetrics / BudgetRecommendation set per user (written by the batch job)"""
+    __tablename__ = "financial_snapshots"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, unique=True, index=True)
+    metrics = Column(JSON)  # FinancialMetrics
+    budget_recommendations = Column(JSON)  # List[BudgetRecommendation]
+    zakat = Column(JSON)
+    transaction_count = Column(Integer)  # rows the snapshot was computed from; a smaller count means deletions
+    computed_at = Column(DateTime(timezone=True))
+
+class ProductApplicationRecord(Base):
+    """Product application submitted through /products/apply"""
+    __tablename__ = "product_applications"
+    __table_args__ = (
+        UniqueConstraint("user_id", "idempotency_key", name="uq_product_applications_idempotency"),
+        Index("ix_product_applications_user_applied", "user_id", "applied_at"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, nullable=False)
+    product_id = Column(Integer, nullable=False)
+    product_name = Column(String)
+    amount = Column(Integer)
+    timeline = Column(String)
+    additional_info = Column(Text)
+    status = Column(String, default="pending")  # pending, approved, rejected
+    idempotency_key = Column(String(255))
+    request_fingerprint = Column(String(64))  # sha256 of the submitted payload
+    applied_at = Column(DateTime(timezone=True), server_default=func.now())
+
 # Pydantic Models
 class FinancialGoalCreate(BaseModel):
     goal_name: str
@@ -54,6 +146,14 @@ class FinancialGoalCreate(BaseModel):
     priority: str = "medium"
     islamic_importance: Optional[str] = "mubah"
 
+class TransactionCreate(BaseModel):
+    user_id: int = 1
+    amount: float = Field(..., gt=0)
+    category: str = "other"
+    description: str = ""
+    transaction_type: str = Field("expense", pattern="^(income|expense)$")
+    date: Optional[datetime] = None  # defaults to now; may be backdated
+
 class FinancialGoalResponse(BaseModel):
     id: int
     user_id: int
@@ -66,10 +166,22 @@ class FinancialGoalResponse(BaseModel):
     islamic_importance: str
     monthly_saving: float
     progress_percentage: float
+    months_to_complete: Optional[int] = None
+    projected_completion_date: Optional[str] = None
+    shortfall: Optional[float] = None
     
     class Config:
         from_attributes = True
 
+class WhatIfScenario(BaseModel):
+    monthly_income: float
+    monthly_expenses: float
+    goals: Optional[List[Dict[str, Any]]] = None  # overrides the shared goals for this scenario
+
+class ScenarioBatchRequest(BaseModel):
+    scenarios: List[WhatIfScenario]
+    goals: Optional[List[Dict[str, Any]]] = None  # shared by all scenarios without their own goals
+
 class ChatMessage(BaseModel):
     message: str
     message_type: str = "text"
@@ -0,0 +1,24 @@
+from pydantic import BaseModel
+from typing import Optional, List, Union
+
+class BankProduct(BaseModel):
+    id: int
+    name: str
+    type: str  # "deposit", "financing", "investment", "savings", "card"
+    description: str
+    features: List[str]
+    islamic_compliant: bool
+    risk_level: str  # "low", "medium", "high"
+    min_amount: Optional[int] = None
+    max_amount: Optional[int] = None
+    timeline: Optional[str] = None
+    recommended_for: List[str]
+    sharia_principles: List[str]
+    eligibility: List[str]
+    profit_rate: Optional[str] = None
+    monthly_payment: Optional[Union[int, str]] = None  # amount, or a note such as "Рассчитывается индивидуально"
+
+class ProductCatalogFile(BaseModel):
+    """Versioned catalog data file (app/data/products.json)"""
+    version: str
+    products: List[BankProduct]
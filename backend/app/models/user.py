@@ -1,11 +1,10 @@
 from sqlalchemy import Column, Integer, String, Float, DateTime, JSON, Boolean, Text
-from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
 from pydantic import BaseModel, validator
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 
-Base = declarative_base()
+from ..database.session import Base
 
 class User(Base):
     __tablename__ = "users"
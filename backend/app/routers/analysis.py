@@ -1,77 +1,83 @@
-from fastapi import APIRouter, HTTPException
-from typing import Dict, Any, List
-from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import AsyncIterator, Dict, Any, List, Optional
+from datetime import datetime, timedelta
 
+from ..core.config import settings
+from ..crud import financial_crud, user_crud
+from ..database.session import AsyncSessionLocal, get_async_db
 from ..services.ai_service import islamic_ai_service
 from ..services.financial_calculator import financial_calculator
 from ..services.islamic_validator import islamic_validator
+from ..services.anomaly_detector import spending_anomaly_detector
+from ..services.pagination import iter_ndjson
+from ..services.goal_simulator import goal_simulator
+from ..services.zakat_service import zakat_service, nisab_price_feed
 from ..models.user import FinancialMetrics, BudgetRecommendation
+from ..models.financial import ScenarioBatchRequest, TransactionCreate, utc_now
 
 router = APIRouter(prefix="/analysis", tags=["analysis"])
 
-# Mock transactions data for testing
-MOCK_TRANSACTIONS = [
-    {"id": 1, "user_id": 1, "amount": 150000, "category": "housing", "description": "Аренда квартиры", "transaction_type": "expense", "is_halal": True, "date": "2024-01-15"},
-    {"id": 2, "user_id": 1, "amount": 75000, "category": "food", "description": "Продукты", "transaction_type": "expense", "is_halal": True, "date": "2024-01-10"},
-    {"id": 3, "user_id": 1, "amount": 30000, "category": "transport", "description": "Транспорт", "transaction_type": "expense", "is_halal": True, "date": "2024-01-08"},
-    {"id": 4, "user_id": 1, "amount": 25000, "category": "entertainment", "description": "Ресторан", "transaction_type": "expense", "is_halal": True, "date": "2024-01-12"},
-    {"id": 5, "user_id": 1, "amount": 20000, "category": "health", "description": "Медицина", "transaction_type": "expense", "is_halal": True, "date": "2024-01-05"},
-    {"id": 6, "user_id": 1, "amount": 500000, "category": "salary", "description": "Зарплата", "transaction_type": "income", "is_halal": True, "date": "2024-01-01"},
-]
+# Upper bound on what-if scenarios evaluated per request
+MAX_SCENARIOS = 2000
+
+# Rows fetched per keyset page while streaming an ndjson export
+EXPORT_PAGE_SIZE = 500
 
 @router.get("/spending")
-async def get_spending_analysis(time_range: str = "month", user_id: int = 1):
-    """Get spending analysis with time range support"""
+async def get_spending_analysis(
+    time_range: str = "month",
+    user_id: int = 1,
+    include_transactions: bool = False,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get spending analysis with time range support (summaries only unless transactions are requested)"""
+    user_profile = user_crud.user_profile(await user_crud.get_user_or_404(db, user_id))
     try:
         # Filter transactions based on time range
-        filtered_transactions = _filter_transactions_by_time_range(MOCK_TRANSACTIONS, time_range)
+        filtered_transactions = await financial_crud.get_transactions(db, user_id, since=_time_range_start(time_range))
+        await _warm_up_anomalies(db, user_id)
         
         # Basic financial analysis
         basic_analysis = financial_calculator.analyze_spending_pattern(filtered_transactions)
         
         # Islamic AI analysis
-        user_profile = {
-            "monthly_income": 500000,
-            "monthly_expenses": 300000,
-            "age": 30,
-            "risk_profile": "moderate",
-            "family_size": 3
-        }
-        
         islamic_analysis = islamic_ai_service.analyze_spending_habits(
             transactions=filtered_transactions,
             user_profile=user_profile
         )
         
         # Calculate financial metrics
-        financial_metrics = _calculate_financial_metrics(user_profile, basic_analysis)
+        financial_metrics = await _calculate_financial_metrics(db, user_profile, basic_analysis)
         
-        return {
+        response = {
             "time_range": time_range,
             "basic_analysis": basic_analysis,
             "islamic_analysis": islamic_analysis,
             "financial_metrics": financial_metrics,
-            "transactions": filtered_transactions,
-            "total_transactions": len(filtered_transactions)
+            "total_transactions": len(filtered_transactions),
+            "anomalies": spending_anomaly_detector.get_anomalies(user_id)
         }
+        if include_transactions:
+            response["transactions"] = filtered_transactions
+
+        return response
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error analyzing spending: {str(e)}")
 
 @router.get("/financial-metrics")
-async def get_financial_metrics(user_id: int = 1):
-    """Get comprehensive financial metrics"""
+async def get_financial_metrics(user_id: int = 1, db: AsyncSession = Depends(get_async_db)):
+    """Get comprehensive financial metrics (served from the nightly snapshot when available)"""
+    snapshot = await financial_crud.get_snapshot(db, user_id)
+    if snapshot:
+        return snapshot["metrics"]
+
+    user_profile = user_crud.user_profile(await user_crud.get_user_or_404(db, user_id))
     try:
-        user_profile = {
-            "monthly_income": 500000,
-            "monthly_expenses": 300000,
-            "age": 30,
-            "risk_profile": "moderate",
-            "family_size": 3
-        }
-        
-        basic_analysis = financial_calculator.analyze_spending_pattern(MOCK_TRANSACTIONS)
-        metrics = _calculate_financial_metrics(user_profile, basic_analysis)
+        basic_analysis = financial_calculator.analyze_spending_pattern(await _recent_transactions(db, user_id))
+        metrics = await _calculate_financial_metrics(db, user_profile, basic_analysis)
         
         return metrics
         
@@ -79,22 +85,20 @@ async def get_financial_metrics(user_id: int = 1):
         raise HTTPException(status_code=500, detail=f"Error calculating metrics: {str(e)}")
 
 @router.get("/budget-recommendations")
-async def get_budget_recommendations(user_id: int = 1):
-    """Get Islamic budget recommendations"""
-    try:
-        user_profile = {
-            "monthly_income": 500000,
-            "monthly_expenses": 300000,
-            "family_size": 3
-        }
-        
-        current_spending = {
-            "housing": 150000,
-            "food": 75000,
-            "transport": 30000,
-            "health": 20000,
-            "entertainment": 25000
+async def get_budget_recommendations(user_id: int = 1, db: AsyncSession = Depends(get_async_db)):
+    """Get Islamic budget recommendations (served from the nightly snapshot when available)"""
+    snapshot = await financial_crud.get_snapshot(db, user_id)
+    if snapshot:
+        return {
+            "recommendations": snapshot["budget_recommendations"],
+            "islamic_budget": snapshot["metrics"]["recommended_budget"],
+            "computed_at": snapshot["computed_at"]
         }
+
+    user_profile = user_crud.user_profile(await user_crud.get_user_or_404(db, user_id))
+    try:
+        basic_analysis = financial_calculator.analyze_spending_pattern(await _recent_transactions(db, user_id))
+        current_spending = basic_analysis["expenses_by_category"]
         
         recommendations = _generate_budget_recommendations(user_profile, current_spending)
         
@@ -107,13 +111,16 @@ async def get_budget_recommendations(user_id: int = 1):
         raise HTTPException(status_code=500, detail=f"Error generating recommendations: {str(e)}")
 
 @router.get("/comparative")
-async def get_comparative_analysis(user_id: int = 1):
+async def get_comparative_analysis(user_id: int = 1, db: AsyncSession = Depends(get_async_db)):
     """Get comparative analysis for all time ranges"""
     try:
         comparative_data = {}
+        # One query for the widest range; narrower ranges are filtered from it
+        year_transactions = await financial_crud.get_transactions(db, user_id, since=_time_range_start("year"))
         
         for time_range in ["week", "month", "year"]:
-            filtered_transactions = _filter_transactions_by_time_range(MOCK_TRANSACTIONS, time_range)
+            since = _time_range_start(time_range)
+            filtered_transactions = [t for t in year_transactions if t["date"] >= since]
             basic_analysis = financial_calculator.analyze_spending_pattern(filtered_transactions)
             
             comparative_data[time_range] = {
@@ -133,19 +140,11 @@ async def get_comparative_analysis(user_id: int = 1):
         raise HTTPException(status_code=500, detail=f"Error generating comparative analysis: {str(e)}")
 
 @router.get("/habits")
-async def get_habit_analysis():
+async def get_habit_analysis(user_id: int = 1, db: AsyncSession = Depends(get_async_db)):
+    user_profile = user_crud.user_profile(await user_crud.get_user_or_404(db, user_id))
     try:
-        user_profile = {
-            "monthly_income": 500000,
-            "monthly_expenses": 300000,
-            "age": 30,
-            "risk_profile": "moderate",
-            "islamic_knowledge": "intermediate",
-            "family_size": 3
-        }
-        
         analysis = islamic_ai_service.analyze_spending_habits(
-            transactions=MOCK_TRANSACTIONS,
+            transactions=await _recent_transactions(db, user_id),
             user_profile=user_profile
         )
         
@@ -168,22 +167,97 @@ async def validate_transaction(transaction: Dict[str, Any]):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error validating transaction: {str(e)}")
 
-@router.get("/islamic-products")
-async def get_islamic_products():
+@router.get("/transactions")
+async def list_transactions(
+    user_id: int = 1,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="Cursor from the previous page"),
+    category: Optional[str] = None,
+    transaction_type: Optional[str] = None,
+    format: str = Query("json", pattern="^(json|ndjson)$", description="json page or ndjson export stream"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """List transactions newest first with keyset (date, id) cursor pagination"""
     try:
-        user_goals = [
-            {
-                "goal_name": "Покупка квартиры",
-                "target_amount": 15000000,
-                "timeline_months": 60,
-                "category": "housing"
-            }
-        ]
-        
-        user_profile = {
-            "monthly_income": 500000,
-            "risk_profile": "moderate"
+        if format == "ndjson":
+            # First page on the request session so an invalid cursor is still a 400
+            page, next_cursor = await financial_crud.get_transactions_page(
+                db, user_id, EXPORT_PAGE_SIZE, cursor, category, transaction_type
+            )
+            return StreamingResponse(
+                _stream_transactions(page, next_cursor, user_id, category, transaction_type),
+                media_type="application/x-ndjson",
+                headers={"Content-Disposition": f'attachment; filename="transactions_{user_id}.ndjson"'}
+            )
+
+        page, next_cursor = await financial_crud.get_transactions_page(db, user_id, limit, cursor, category, transaction_type)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {
+        "user_id": user_id,
+        "transactions": page,
+        "next_cursor": next_cursor,
+        "has_more": next_cursor is not None
+    }
+
+@router.post("/transactions")
+async def add_transaction(transaction: TransactionCreate, db: AsyncSession = Depends(get_async_db)):
+    """Record a transaction and check it for spending anomalies"""
+    user_id = transaction.user_id
+    await user_crud.get_user_or_404(db, user_id)
+    try:
+        data = transaction.dict()
+        is_valid, message = islamic_validator.validate_transaction(data)
+        # Baseline from the history before the new row
+        await _warm_up_anomalies(db, user_id)
+
+        new_transaction = await financial_crud.create_transaction(db, {
+            **data,
+            "date": transaction.date or utc_now(),
+            "is_halal": is_valid
+        })
+
+        anomaly = spending_anomaly_detector.observe(new_transaction)
+
+        return {
+            "transaction": new_transaction,
+            "validation_message": message,
+            "is_anomaly": anomaly is not None,
+            "anomaly": anomaly
+        }
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error adding transaction: {str(e)}")
+
+@router.get("/anomalies")
+async def get_spending_anomalies(
+    user_id: int = 1,
+    limit: int = Query(20, ge=1, le=200),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get recently detected spending anomalies without re-reading history
+
+    Detector state lives in this worker's memory: each worker rebuilds the
+    baselines from the database on first use, and the list of detected
+    anomalies only holds inserts that went through this worker.
+    """
+    try:
+        await _warm_up_anomalies(db, user_id)
+        return {
+            "user_id": user_id,
+            "anomalies": spending_anomaly_detector.get_anomalies(user_id, limit),
+            "category_baselines": spending_anomaly_detector.get_category_stats(user_id)
         }
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error getting anomalies: {str(e)}")
+
+@router.get("/islamic-products")
+async def get_islamic_products(user_id: int = 1, db: AsyncSession = Depends(get_async_db)):
+    user_profile = user_crud.user_profile(await user_crud.get_user_or_404(db, user_id))
+    try:
+        user_goals = await financial_crud.get_goals(db, user_id, include_completed=False)
         
         products = islamic_ai_service.recommend_products(user_goals, user_profile)
         
@@ -196,177 +270,180 @@ async def get_islamic_products():
         raise HTTPException(status_code=500, detail=f"Error getting products: {str(e)}")
 
 @router.get("/life-goals")
-async def get_life_goals_analysis():
+async def get_life_goals_analysis(user_id: int = 1, db: AsyncSession = Depends(get_async_db)):
+    user_profile = user_crud.user_profile(await user_crud.get_user_or_404(db, user_id))
     try:
-        user_profile = {
-            "age": 30,
-            "monthly_income": 500000,
-            "monthly_expenses": 300000,
-            "risk_profile": "moderate",
-            "family_size": 3
-        }
-        
-        user_goals = [
-            {
-                "goal_name": "Покупка квартиры",
-                "target_amount": 15000000,
-                "current_amount": 1000000,
-                "timeline_months": 60,
-                "category": "housing",
-                "priority": "high"
-            },
-            {
-                "goal_name": "Хадж",
-                "target_amount": 2000000,
-                "current_amount": 300000, 
-                "timeline_months": 24,
-                "category": "hajj",
-                "priority": "medium"
-            },
-            {
-                "goal_name": "Образование детей",
-                "target_amount": 5000000,
-                "current_amount": 500000,
-                "timeline_months": 48,
-                "category": "education",
-                "priority": "high"
-            }
-        ]
+        user_goals = await financial_crud.get_goals(db, user_id, include_completed=False)
         
         # Generate financial plan
-        financial_plan = islamic_ai_service.create_financial_plan(user_profile, user_goals)
+        financial_plan = await islamic_ai_service.create_financial_plan(user_profile, user_goals)
         
-        # Calculate monthly savings for each goal
-        goals_with_savings = []
-        for goal in user_goals:
-            monthly_saving = financial_calculator.calculate_monthly_saving(
-                goal["target_amount"], goal["current_amount"], goal["timeline_months"]
-            )
-            progress = financial_calculator.calculate_goal_progress(
-                goal["current_amount"], goal["target_amount"]
-            )
-            
-            goals_with_savings.append({
-                **goal,
-                "monthly_saving": monthly_saving,
-                "progress_percentage": progress
-            })
+        # Project all goals in one vectorized pass
+        goals_with_savings = financial_calculator.project_goals(user_goals)
+        
+        available_for_savings = user_profile["monthly_income"] - user_profile["monthly_expenses"]
         
         return {
             "financial_plan": financial_plan,
             "goals": goals_with_savings,
             "total_monthly_savings": sum(g["monthly_saving"] for g in goals_with_savings),
-            "available_for_savings": user_profile["monthly_income"] - user_profile["monthly_expenses"]
+            "available_for_savings": available_for_savings,
+            "savings_allocation": financial_calculator.optimize_savings_plan(goals_with_savings, available_for_savings)
         }
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error analyzing life goals: {str(e)}")
 
+@router.get("/zakat")
+async def get_zakat(
+    user_id: int = 1,
+    liabilities: float = Query(0.0, ge=0, description="Debts deducted from zakatable wealth"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Zakat due with hawl (lunar year) tracking from transaction history"""
+    await user_crud.get_user_or_404(db, user_id)
+    try:
+        transactions = await financial_crud.get_transactions(db, user_id)
+        return zakat_service.calculate_for_user(user_id, transactions, liabilities=liabilities)
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error calculating zakat: {str(e)}")
+
+@router.get("/zakat/nisab")
+async def get_nisab():
+    """Current nisab thresholds from the cached gold/silver price feed"""
+    try:
+        prices = nisab_price_feed.get_prices()
+        return {
+            "prices": prices,
+            "gold_nisab": nisab_price_feed.nisab("gold"),
+            "silver_nisab": nisab_price_feed.nisab("silver"),
+            "nisab": nisab_price_feed.nisab()
+        }
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error loading nisab prices: {str(e)}")
+
+@router.post("/goal-probability")
+async def get_goal_probability(
+    scenario: Optional[Dict[str, Any]] = None,
+    user_id: int = 1,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Monte Carlo probability of reaching each goal by its deadline
+
+    Optional body: {"goals": [...], "available_for_savings": float, "simulation": {...overrides}, "seed": int}
+    "simulation" may override n_paths and the distribution parameters; path count,
+    goal count and horizon are capped by settings.MONTE_CARLO.
+    """
+    scenario = scenario or {}
+    user_goals = scenario.get("goals")
+    available_for_savings = scenario.get("available_for_savings")
+    if not user_goals or available_for_savings is None:
+        user_profile = user_crud.user_profile(await user_crud.get_user_or_404(db, user_id))
+        user_goals = user_goals or await financial_crud.get_goals(db, user_id, include_completed=False)
+        if available_for_savings is None:
+            available_for_savings = user_profile["monthly_income"] - user_profile["monthly_expenses"]
+
+    limits = settings.MONTE_CARLO
+    try:
+        if len(user_goals) > limits["max_goals"]:
+            raise ValueError(f"at most {limits['max_goals']} goals per simulation")
+        if any(int(goal["timeline_months"]) > limits["max_timeline_months"] for goal in user_goals):
+            raise ValueError(f"timeline_months must not exceed {limits['max_timeline_months']}")
+
+        # Contributions follow the optimal allocation of the available savings
+        goals_with_savings = financial_calculator.project_goals(user_goals)
+        plan = financial_calculator.optimize_savings_plan(goals_with_savings, available_for_savings)
+        contributions = [allocation["allocated"] for allocation in plan["goal_allocations"]]
+
+        results = goal_simulator.simulate(
+            user_goals,
+            contributions,
+            overrides=scenario.get("simulation"),
+            seed=scenario.get("seed")
+        )
+
+        return {
+            "user_id": user_id,
+            "available_for_savings": available_for_savings,
+            "goals": results
+        }
+
+    except (KeyError, TypeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid scenario: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error simulating goals: {str(e)}")
+
+@router.post("/scenarios")
+async def evaluate_scenarios(request: ScenarioBatchRequest, user_id: int = 1, db: AsyncSession = Depends(get_async_db)):
+    """Evaluate a grid of income/expense/goal what-if scenarios in one vectorized call"""
+    if not request.scenarios:
+        raise HTTPException(status_code=400, detail="At least one scenario is required")
+    if len(request.scenarios) > MAX_SCENARIOS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_SCENARIOS} scenarios per request")
+
+    shared_goals = request.goals
+    if shared_goals is None and any(scenario.goals is None for scenario in request.scenarios):
+        shared_goals = await financial_crud.get_goals(db, user_id, include_completed=False)
+
+    try:
+        results = financial_calculator.evaluate_scenarios(
+            [scenario.monthly_income for scenario in request.scenarios],
+            [scenario.monthly_expenses for scenario in request.scenarios],
+            [shared_goals if scenario.goals is None else scenario.goals for scenario in request.scenarios]
+        )
+
+        return {
+            "scenarios": results,
+            "total_scenarios": len(results)
+        }
+
+    except (KeyError, TypeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid scenario: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error evaluating scenarios: {str(e)}")
+
 # Helper functions
-def _filter_transactions_by_time_range(transactions: List[Dict], time_range: str) -> List[Dict]:
-    """Filter transactions based on time range"""
-    now = datetime.now()
-    
-    if time_range == "week":
-        cutoff_date = now - timedelta(days=7)
-    elif time_range == "month":
-        cutoff_date = now - timedelta(days=30)
-    elif time_range == "year":
-        cutoff_date = now - timedelta(days=365)
-    else:
-        return transactions  # Return all if invalid range
-    
-    # In real app, filter by actual dates
-    # For mock data, return proportional data
-    factor = {"week": 0.25, "month": 1, "year": 12}.get(time_range, 1)
-    
-    filtered_transactions = []
-    for transaction in transactions:
-        filtered_transaction = transaction.copy()
-        if transaction["transaction_type"] == "expense":
-            filtered_transaction["amount"] = transaction["amount"] * factor
-        filtered_transactions.append(filtered_transaction)
-    
-    return filtered_transactions
-
-def _calculate_financial_metrics(user_profile: Dict, basic_analysis: Dict) -> FinancialMetrics:
+def _time_range_start(time_range: str) -> Optional[datetime]:
+    """Start of the time range (None for all history)"""
+    days = {"week": 7, "month": 30, "year": 365}.get(time_range)
+    return datetime.now() - timedelta(days=days) if days else None
+
+async def _stream_transactions(
+    page: List[Dict[str, Any]],
+    cursor: Optional[str],
+    user_id: int,
+    category: Optional[str],
+    transaction_type: Optional[str]
+) -> AsyncIterator[bytes]:
+    """ndjson export one keyset page at a time, so only a page is held in memory"""
+    yield b"".join(iter_ndjson(page))
+    if cursor is None:
+        return
+    async with AsyncSessionLocal() as db:
+        while cursor is not None:
+            page, cursor = await financial_crud.get_transactions_page(
+                db, user_id, EXPORT_PAGE_SIZE, cursor, category, transaction_type
+            )
+            yield b"".join(iter_ndjson(page))
+
+async def _recent_transactions(db: AsyncSession, user_id: int) -> List[Dict[str, Any]]:
+    """Transactions in the same window the nightly snapshot job uses"""
+    since = datetime.now() - timedelta(days=settings.FINANCIAL_SNAPSHOTS["analysis_window_days"])
+    return await financial_crud.get_transactions(db, user_id, since=since)
+
+async def _warm_up_anomalies(db: AsyncSession, user_id: int) -> None:
+    """Feed the user's history to the anomaly detector on first use; afterwards it is fed on every insert"""
+    if not spending_anomaly_detector.is_warmed_up(user_id):
+        spending_anomaly_detector.warm_up(user_id, await financial_crud.get_transactions(db, user_id))
+
+async def _calculate_financial_metrics(db: AsyncSession, user_profile: Dict, basic_analysis: Dict) -> FinancialMetrics:
     """Calculate comprehensive financial metrics"""
-    monthly_income = user_profile["monthly_income"]
-    monthly_expenses = basic_analysis["total_expenses"]
-    monthly_savings = monthly_income - monthly_expenses
-    savings_rate = monthly_savings / monthly_income if monthly_income > 0 else 0
-    
-    # Calculate essential vs discretionary spending
-    essential_categories = ["housing", "food", "transport", "health"]
-    essential_spending = sum(
-        basic_analysis["expenses_by_category"].get(cat, 0) 
-        for cat in essential_categories
-    )
-    discretionary_spending = monthly_expenses - essential_spending
-    
-    # Generate Islamic budget recommendations
-    islamic_budget = financial_calculator.generate_islamic_budget(monthly_income)
-    
-    # Calculate financial health score (0-100)
-    financial_health_score = min(100, int(savings_rate * 200))  # 50% savings rate = 100 score
-    
-    # Generate recommendations
-    recommendations = _generate_financial_recommendations(user_profile, basic_analysis)
-    
-    return FinancialMetrics(
-        monthly_income=monthly_income,
-        monthly_expenses=monthly_expenses,
-        monthly_savings=monthly_savings,
-        savings_rate=savings_rate,
-        essential_spending=essential_spending,
-        discretionary_spending=discretionary_spending,
-        recommended_budget=islamic_budget,
-        islamic_finance_recommendations=recommendations,
-        financial_health_score=financial_health_score
-    )
+    user_id = user_profile["user_id"]
+    zakat = zakat_service.calculate_for_user(user_id, await financial_crud.get_transactions(db, user_id))
+    return financial_calculator.calculate_financial_metrics(user_profile, basic_analysis, zakat)
 
 def _generate_budget_recommendations(user_profile: Dict, current_spending: Dict) -> List[BudgetRecommendation]:
     """Generate budget recommendations based on Islamic principles"""
-    monthly_income = user_profile["monthly_income"]
-    islamic_budget = financial_calculator.generate_islamic_budget(monthly_income)
-    
-    recommendations = []
-    for category, recommended_amount in islamic_budget.items():
-        current_amount = current_spending.get(category, 0)
-        difference = current_amount - recommended_amount
-        
-        # Generate advice based on difference
-        if difference > 0:
-            advice = f"Сократите расходы на {abs(difference):,.0f} ₸"
-        elif difference < 0:
-            advice = f"Можете увеличить на {abs(difference):,.0f} ₸"
-        else:
-            advice = "Оптимальный уровень расходов"
-        
-        recommendations.append(BudgetRecommendation(
-            category=category,
-            recommended_percentage=(recommended_amount / monthly_income) * 100,
-            recommended_amount=recommended_amount,
-            current_amount=current_amount,
-            difference=difference,
-            advice=advice
-        ))
-    
-    return recommendations
-
-def _generate_financial_recommendations(user_profile: Dict, analysis: Dict) -> List[str]:
-    """Generate Islamic finance recommendations"""
-    recommendations = []
-    savings_rate = analysis["savings_rate"]
-    
-    if savings_rate < 0.1:
-        recommendations.append("Увеличьте норму сбережений до 20% от дохода")
-    elif savings_rate < 0.2:
-        recommendations.append("Хорошая норма сбережений, стремитесь к 20%")
-    else:
-        recommendations.append("Отличная норма сбережений! Рассмотрите инвестиции")
-    
-    recommendations.append(f"Выделяйте {user_profile['monthly_income'] * 0.025:,.0f} ₸ на закят")
-    recommendations.append("Рассмотрите исламские инвестиционные продукты")
-    
-    return recommendations
\ No newline at end of file
+    return financial_calculator.generate_budget_recommendations(user_profile, current_spending)
@@ -1,68 +1,64 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form
-from typing import Dict, Any, Optional
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, Any, List, Optional
 import json
 
+from ..core.config import settings
+from ..crud import financial_crud, user_crud
+from ..database.session import get_async_db
 from ..services.ai_service import islamic_ai_service
+from ..services.chat_history import chat_history_writer
 from ..models.user import UserFinancialUpdate
 
 router = APIRouter(prefix="/chat", tags=["chat"])
 
-# Mock user data for testing
-MOCK_USER_CONTEXT = {
-    "user_id": 1,
-    "username": "Асан",
-    "age": 28,
-    "monthly_income": 500000,
-    "monthly_expenses": 350000,
-    "risk_profile": "moderate",
-    "islamic_knowledge": "intermediate",
-    "currency": "KZT",
-    "family_size": 3,
-    "goals": [
-        {
-            "goal_name": "Покупка квартиры",
-            "target_amount": 15000000,
-            "current_amount": 1000000,
-            "timeline_months": 60,
-            "category": "housing",
-            "priority": "high"
-        },
-        {
-            "goal_name": "Хадж",
-            "target_amount": 2000000, 
-            "current_amount": 300000,
-            "timeline_months": 24,
-            "category": "hajj",
-            "priority": "medium"
-        }
-    ],
-    "recent_transactions": [
-        {"category": "housing", "amount": 150000, "description": "Аренда квартиры"},
-        {"category": "food", "amount": 75000, "description": "Продукты"},
-        {"category": "transport", "amount": 30000, "description": "Транспорт"},
+# Latest transactions included in the AI context
+RECENT_TRANSACTIONS_IN_CONTEXT = 10
+
+async def _load_user_context(db: AsyncSession, user_id: int, context: Optional[str] = None) -> Dict[str, Any]:
+    """Profile, active goals and recent transactions for the AI prompt, plus client-supplied overrides"""
+    user = await user_crud.get_user_or_404(db, user_id)
+    goals = await financial_crud.get_goals(db, user_id, include_completed=False)
+    recent_transactions, _ = await financial_crud.get_transactions_page(db, user_id, RECENT_TRANSACTIONS_IN_CONTEXT)
+
+    user_context = {
+        **user_crud.user_profile(user),
+        "goals": [{**goal, "name": goal["goal_name"]} for goal in goals],
+        "recent_transactions": [
+            {field: transaction[field] for field in ("category", "amount", "description", "transaction_type")}
+            for transaction in recent_transactions
+        ]
+    }
+    if context:
+        try:
+            user_context.update(json.loads(context))
+        except json.JSONDecodeError:
+            print("Failed to parse context JSON")
+    return user_context
+
+def _conversation_messages(conversation: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """One stored turn as the user message and the AI reply (ids stay unique and ordered)"""
+    timestamp = conversation["created_at"]
+    return [
+        {"id": conversation["id"] * 2 - 1, "content": conversation["user_message"], "is_user": True, "timestamp": timestamp},
+        {"id": conversation["id"] * 2, "content": conversation["ai_response"], "is_user": False, "timestamp": timestamp}
     ]
-}
 
 @router.post("/message")
 async def send_chat_message(
     message: str = Form(...),
     message_type: str = Form("text"),
-    context: Optional[str] = Form(None)
+    context: Optional[str] = Form(None),
+    user_id: int = Form(1),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Handle both text and voice messages
     """
+    user_context = await _load_user_context(db, user_id, context)
     try:
         print(f"Received message: {message}, type: {message_type}")  # Debug log
-        
-        # Parse context if provided
-        user_context = MOCK_USER_CONTEXT.copy()
-        if context:
-            try:
-                context_data = json.loads(context)
-                user_context.update(context_data)
-            except json.JSONDecodeError:
-                print("Failed to parse context JSON")
 
         # Get AI response with user context
         if message_type == "voice":
@@ -78,13 +74,21 @@ async def send_chat_message(
                 user_context=user_context
             )
         
-        return {
+        result = {
             "response": ai_response.get("response", "Извините, не удалось обработать запрос."),
             "recommendations": ai_response.get("recommendations", []),
             "suggested_products": ai_response.get("suggested_products", []),
             "transcribed_text": ai_response.get("transcribed_text"),
             "message_type": ai_response.get("message_type", "financial_advice")
         }
+        await chat_history_writer.record(
+            user_id,
+            result["transcribed_text"] or message,
+            result["response"],
+            context=jsonable_encoder(user_context),
+            message_type=result["message_type"]
+        )
+        return result
         
     except Exception as e:
         print(f"Error in send_chat_message: {str(e)}")  # Debug log
@@ -96,22 +100,16 @@ async def send_chat_message(
 @router.post("/message/voice")
 async def send_voice_message(
     audio: UploadFile = File(...),
-    context: Optional[str] = Form(None)
+    context: Optional[str] = Form(None),
+    user_id: int = Form(1),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Handle voice messages specifically
     """
+    user_context = await _load_user_context(db, user_id, context)
     try:
         print(f"Processing voice message: {audio.filename}")  # Debug log
-        
-        # Parse context if provided
-        user_context = MOCK_USER_CONTEXT.copy()
-        if context:
-            try:
-                context_data = json.loads(context)
-                user_context.update(context_data)
-            except json.JSONDecodeError:
-                print("Failed to parse context JSON")
 
         # Process voice message
         ai_response = await islamic_ai_service.get_voice_response(
@@ -119,13 +117,21 @@ async def send_voice_message(
             user_context=user_context
         )
         
-        return {
+        result = {
             "response": ai_response.get("response", "Извините, не удалось обработать голосовое сообщение."),
             "recommendations": ai_response.get("recommendations", []),
             "suggested_products": ai_response.get("suggested_products", []),
             "transcribed_text": ai_response.get("transcribed_text"),
             "message_type": ai_response.get("message_type", "voice_response")
         }
+        await chat_history_writer.record(
+            user_id,
+            result["transcribed_text"] or f"[voice] {audio.filename}",
+            result["response"],
+            context=jsonable_encoder(user_context),
+            message_type=result["message_type"]
+        )
+        return result
         
     except Exception as e:
         print(f"Error in send_voice_message: {str(e)}")  # Debug log
@@ -135,11 +141,12 @@ async def send_voice_message(
         )
 
 @router.post("/financial-plan")
-async def generate_financial_plan():
+async def generate_financial_plan(user_id: int = 1, db: AsyncSession = Depends(get_async_db)):
+    user_context = await _load_user_context(db, user_id)
     try:
         plan = await islamic_ai_service.create_financial_plan(
-            user_profile=MOCK_USER_CONTEXT,
-            goals=MOCK_USER_CONTEXT["goals"]
+            user_profile=user_context,
+            goals=user_context["goals"]
         )
         return plan
     except Exception as e:
@@ -150,11 +157,12 @@ async def generate_financial_plan():
         )
 
 @router.post("/spending-analysis")
-async def analyze_spending():
+async def analyze_spending(user_id: int = 1, db: AsyncSession = Depends(get_async_db)):
+    user_context = await _load_user_context(db, user_id)
     try:
         analysis = islamic_ai_service.analyze_spending_habits(
-            transactions=MOCK_USER_CONTEXT["recent_transactions"],
-            user_profile=MOCK_USER_CONTEXT
+            transactions=user_context["recent_transactions"],
+            user_profile=user_context
         )
         return analysis
     except Exception as e:
@@ -165,43 +173,66 @@ async def analyze_spending():
         )
 
 @router.get("/history")
-async def get_chat_history(user_id: int = 1):
-    """Get chat history for user"""
+async def get_chat_history(
+    user_id: int = 1,
+    limit: int = Query(settings.CHAT_HISTORY["page_size"], ge=1, le=settings.CHAT_HISTORY["max_page_size"]),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get chat history for user, newest turns first page by page (keyset cursor), archived turns included"""
+    await chat_history_writer.flush_user(user_id)
     try:
-        # Mock chat history
-        return {
-            "user_id": user_id,
-            "messages": [
-                {
-                    "id": 1,
-                    "content": "Ассаламу алейкум! Как я могу помочь с вашими финансами?",
-                    "is_user": False,
-                    "timestamp": "2024-01-15T10:00:00Z"
-                },
-                {
-                    "id": 2,
-                    "content": "Хочу поставить финансовую цель",
-                    "is_user": True,
-                    "timestamp": "2024-01-15T10:01:00Z"
-                }
-            ],
-            "total_messages": 2
-        }
-    except Exception as e:
-        print(f"Error getting chat history: {str(e)}")
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error getting chat history: {str(e)}"
-        )
+        conversations, next_cursor = await financial_crud.get_conversation_history_page(db, user_id, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Messages within the page are returned in chronological order
+    messages = [
+        message
+        for conversation in reversed(conversations)
+        for message in _conversation_messages(conversation)
+    ]
+    return {
+        "user_id": user_id,
+        "messages": messages,
+        "total_messages": await financial_crud.count_conversations(db, user_id) * 2,
+        "next_cursor": next_cursor,
+        "has_more": next_cursor is not None
+    }
+
+@router.get("/history/search")
+async def search_chat_history(
+    q: str = Query(..., min_length=1, max_length=500),
+    user_id: int = 1,
+    limit: int = Query(settings.CHAT_HISTORY["search_page_size"], ge=1, le=settings.CHAT_HISTORY["max_page_size"]),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Full-text search over the user's chat history, best matches first (keyset cursor)"""
+    await chat_history_writer.flush_user(user_id)
+    try:
+        results, next_cursor = await financial_crud.search_conversations(db, user_id, q, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {
+        "user_id": user_id,
+        "query": q,
+        "results": results,
+        "next_cursor": next_cursor,
+        "has_more": next_cursor is not None
+    }
 
 @router.delete("/history")
-async def clear_chat_history(user_id: int = 1):
+async def clear_chat_history(user_id: int = 1, db: AsyncSession = Depends(get_async_db)):
     """Clear chat history for user"""
+    await chat_history_writer.flush_user(user_id)
     try:
+        deleted = await financial_crud.delete_conversations(db, user_id)
         return {
             "success": True,
             "message": "История чата очищена",
-            "user_id": user_id
+            "user_id": user_id,
+            "deleted_messages": deleted * 2
         }
     except Exception as e:
         print(f"Error clearing chat history: {str(e)}")
@@ -235,7 +266,7 @@ async def chat_health_check():
         # Test AI service connectivity
         test_response = await islamic_ai_service.get_chat_response(
             user_message="Test",
-            user_context=MOCK_USER_CONTEXT
+            user_context={"username": "health-check", "goals": [], "recent_transactions": []}
         )
         
         return {
@@ -1,53 +1,35 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 
+from ..crud import financial_crud, user_crud
+from ..database.session import get_async_db
 from ..models.financial import FinancialGoalCreate, FinancialGoalResponse
 from ..services.financial_calculator import financial_calculator
 
 router = APIRouter(prefix="/goals", tags=["goals"])
 
-# Mock storage for goals
-mock_goals_storage = []
-
 @router.post("/", response_model=FinancialGoalResponse)
-async def create_goal(goal: FinancialGoalCreate):
+async def create_goal(goal: FinancialGoalCreate, user_id: int = 1, db: AsyncSession = Depends(get_async_db)):
+    await user_crud.get_user_or_404(db, user_id)
     try:
-        monthly_saving = financial_calculator.calculate_monthly_saving(
-            goal.target_amount, 0, goal.timeline_months
-        )
-        
-        progress = financial_calculator.calculate_goal_progress(0, goal.target_amount)
-        
-        goal_response = FinancialGoalResponse(
-            id=len(mock_goals_storage) + 1,
-            user_id=1,  # Mock user ID
-            goal_name=goal.goal_name,
-            target_amount=goal.target_amount,
-            current_amount=0,
-            timeline_months=goal.timeline_months,
-            category=goal.category,
-            priority=goal.priority,
-            islamic_importance=goal.islamic_importance,
-            monthly_saving=monthly_saving,
-            progress_percentage=progress
-        )
-        
-        mock_goals_storage.append(goal_response.dict())
-        return goal_response
-        
+        created = await financial_crud.create_goal(db, user_id, goal)
+        return financial_calculator.project_goals([created])[0]
+
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error creating goal: {str(e)}")
 
 @router.get("/", response_model=List[FinancialGoalResponse])
-async def get_goals():
-    return mock_goals_storage
+async def get_goals(user_id: int = 1, db: AsyncSession = Depends(get_async_db)):
+    # Recompute savings and progress for all goals in one vectorized pass
+    return financial_calculator.project_goals(await financial_crud.get_goals(db, user_id))
 
 @router.get("/{goal_id}", response_model=FinancialGoalResponse)
-async def get_goal(goal_id: int):
+async def get_goal(goal_id: int, user_id: int = 1, db: AsyncSession = Depends(get_async_db)):
+    goal = await financial_crud.get_goal(db, user_id, goal_id)
+    if not goal:
+        raise HTTPException(status_code=404, detail="Goal not found")
     try:
-        goal = next((g for g in mock_goals_storage if g["id"] == goal_id), None)
-        if not goal:
-            raise HTTPException(status_code=404, detail="Goal not found")
-        return goal
+        return financial_calculator.project_goals([goal])[0]
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error retrieving goal: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error retrieving goal: {str(e)}")
@@ -1,30 +1,24 @@
 # app/routers/products.py
 
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Header
+from fastapi.responses import Response
 from typing import List, Optional
 from pydantic import BaseModel
 from datetime import datetime
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.config import settings
+from ..database.session import get_async_db
+from ..models.product import BankProduct
+from ..services.amortization import amortization_engine
+from ..services.application_store import application_store, IdempotencyConflictError
+from ..services.catalog_store import catalog_store
+from ..services.product_comparison import product_comparator
+from ..services.product_views import product_view_tracker
 
 router = APIRouter(prefix="/api/v1/products", tags=["products"])
 
 # Pydantic Models
-class BankProduct(BaseModel):
-    id: int
-    name: str
-    type: str  # "deposit", "financing", "investment", "savings", "card"
-    description: str
-    features: List[str]
-    islamic_compliant: bool
-    risk_level: str  # "low", "medium", "high"
-    min_amount: Optional[int] = None
-    max_amount: Optional[int] = None
-    timeline: Optional[str] = None
-    recommended_for: List[str]
-    sharia_principles: List[str]
-    eligibility: List[str]
-    profit_rate: Optional[str] = None
-    monthly_payment: Optional[int] = None
-
 class ProductRecommendationRequest(BaseModel):
     user_goals: List[str]
     risk_profile: str
@@ -32,6 +26,10 @@ class ProductRecommendationRequest(BaseModel):
     investment_amount: Optional[int] = None
     timeline: Optional[str] = None
 
+class ProductRecommendationBatchRequest(BaseModel):
+    requests: List[ProductRecommendationRequest]
+    top_k: int = 3
+
 class ProductApplication(BaseModel):
     product_id: int
     user_id: int
@@ -41,264 +39,116 @@ class ProductApplication(BaseModel):
 
 class ProductComparisonRequest(BaseModel):
     product_ids: List[int]
+    amount: Optional[int] = None
+    timeline_months: Optional[int] = None
 
-# Mock database (replace with actual database in production)
-products_db = [
-    {
-        "id": 1,
-        "name": "Вклад 'Аманат'",
-        "type": "deposit",
-        "description": "Исламский беспроцентный вклад с участием в прибыли банка. Соответствует принципам Мудараба.",
-        "features": [
-            "Отсутствие рибы (процентов)",
-            "Участие в прибыли банка",
-            "Страхование в АСВ",
-            "Капитализация доходов",
-            "Досрочное снятие возможно"
-        ],
-        "islamic_compliant": True,
-        "risk_level": "low",
-        "min_amount": 50000,
-        "timeline": "3-36 месяцев",
-        "recommended_for": ["Сбережения", "Краткосрочные цели", "Создание финансовой подушки"],
-        "sharia_principles": ["Мудараба", "Отсутствие рибы"],
-        "eligibility": ["Физические лица", "Резиденты РК", "От 18 лет"],
-        "profit_rate": "До 12% годовых (участие в прибыли)"
-    },
-    {
-        "id": 2,
-        "name": "Мурабаха финансирование недвижимости",
-        "type": "financing",
-        "description": "Приобретение жилой недвижимости через механизм перепродажи с согласованной наценкой.",
-        "features": [
-            "Фиксированная стоимость",
-            "Прозрачные условия",
-            "Рассрочка до 20 лет",
-            "Первоначальный взвод от 15%",
-            "Страхование объекта"
-        ],
-        "islamic_compliant": True,
-        "risk_level": "medium",
-        "min_amount": 5000000,
-        "max_amount": 50000000,
-        "timeline": "до 20 лет",
-        "recommended_for": ["Покупка квартиры", "Приобретение дома", "Ипотека"],
-        "sharia_principles": ["Мурабаха", "Отсутствие процентов"],
-        "eligibility": ["Физические лица", "Постоянный доход", "Хорошая кредитная история"],
-        "monthly_payment": "Рассчитывается индивидуально"
-    },
-    {
-        "id": 3,
-        "name": "Иджара автомобильное финансирование",
-        "type": "financing",
-        "description": "Лизинг автомобиля с последующим выкупом по остаточной стоимости. Аренда с правом выкупа.",
-        "features": [
-            "Аренда с выкупом",
-            "Низкий первоначальный платеж",
-            "Страхование включено",
-            "Обслуживание у дилера",
-            "Досрочный выкуп"
-        ],
-        "islamic_compliant": True,
-        "risk_level": "medium",
-        "min_amount": 3000000,
-        "timeline": "1-7 лет",
-        "recommended_for": ["Покупка автомобиля", "Бизнес-транспорт", "Семейный автомобиль"],
-        "sharia_principles": ["Иджара", "Лизинг с выкупом"],
-        "eligibility": ["Физические и юридические лица", "Подтверждение дохода"],
-        "monthly_payment": "Рассчитывается индивидуально"
-    },
-    {
-        "id": 4,
-        "name": "Инвестиционный счет 'Садака'",
-        "type": "investment",
-        "description": "Социально ответственные инвестиции в халяльные секторы экономики с экспертным управлением.",
-        "features": [
-            "Диверсификация портфеля",
-            "Экспертное управление",
-            "Ежеквартальные отчеты",
-            "Социальная ответственность",
-            "Часть прибыли на благотворительность"
-        ],
-        "islamic_compliant": True,
-        "risk_level": "medium",
-        "min_amount": 100000,
-        "recommended_for": ["Долгосрочные инвестиции", "Пенсионные накопления", "Социальные проекты"],
-        "sharia_principles": ["Мудараба", "Социальная ответственность"],
-        "eligibility": ["Резиденты РК", "От 18 лет", "Инвестиционный профиль"],
-        "profit_rate": "Зависит от результатов инвестирования"
-    },
-    {
-        "id": 5,
-        "name": "Текущий счет 'Вадиа'",
-        "type": "savings",
-        "description": "Беспроцентный текущий счет для ежедневных операций с гарантией сохранности средств.",
-        "features": [
-            "Бесплатное обслуживание",
-            "Онлайн-банкинг",
-            "Мобильное приложение",
-            "Бесплатные переводы",
-            "Страхование средств"
-        ],
-        "islamic_compliant": True,
-        "risk_level": "low",
-        "min_amount": 0,
-        "recommended_for": ["Ежедневные операции", "Зарплатные проекты", "Управление личными финансами"],
-        "sharia_principles": ["Вадиа", "Без рибы"],
-        "eligibility": ["Физические лица", "Резиденты РК", "От 14 лет"]
-    },
-    {
-        "id": 6,
-        "name": "Карта 'Рахмат'",
-        "type": "card",
-        "description": "Дебетовая карта с кэшбэком и специальными предложениями от партнеров банка.",
-        "features": [
-            "Кэшбэк до 5%",
-            "Бесплатное обслуживание",
-            "Скидки у партнеров",
-            "Мобильные платежи",
-            "Страхование покупок"
-        ],
-        "islamic_compliant": True,
-        "risk_level": "low",
-        "recommended_for": ["Ежедневные покупки", "Онлайн-шоппинг", "Путешествия"],
-        "sharia_principles": ["Отсутствие процентов", "Партнерские программы"],
-        "eligibility": ["Владельцы текущих счетов", "От 18 лет"]
-    },
-    {
-        "id": 7,
-        "name": "Образовательное финансирование",
-        "type": "financing",
-        "description": "Финансирование образования в вузах РК и за рубежом по исламским принципам.",
-        "features": [
-            "Финансирование до 100% стоимости",
-            "Льготный период погашения",
-            "Гибкий график платежей",
-            "Страхование обучения",
-            "Поддержка трудоустройства"
-        ],
-        "islamic_compliant": True,
-        "risk_level": "medium",
-        "min_amount": 500000,
-        "timeline": "до 10 лет",
-        "recommended_for": ["Высшее образование", "Магистратура", "Профессиональные курсы"],
-        "sharia_principles": ["Мурабаха", "Социальная поддержка"],
-        "eligibility": ["Студенты", "Абитуриенты", "При зачислении в вуз"],
-        "monthly_payment": "Рассчитывается индивидуально"
-    },
-    {
-        "id": 8,
-        "name": "Медицинское финансирование",
-        "type": "financing",
-        "description": "Финансирование медицинских услуг, операций и лечения в клиниках Казахстана и за рубежом.",
-        "features": [
-            "Широкий список клиник",
-            "Экспресс-одобрение",
-            "Страхование лечения",
-            "Сопровождение",
-            "Гибкие условия"
-        ],
-        "islamic_compliant": True,
-        "risk_level": "medium",
-        "min_amount": 300000,
-        "timeline": "до 5 лет",
-        "recommended_for": ["Плановые операции", "Стоматология", "Реабилитация", "Чекапы"],
-        "sharia_principles": ["Мурабаха", "Социальная поддержка"],
-        "eligibility": ["Физические лица", "Медицинские показания"],
-        "monthly_payment": "Рассчитывается индивидуально"
-    }
-]
-
-applications_db = []
-product_views_db = []
+MAX_RECOMMENDATION_BATCH = 10000
 
 # Helper functions
 def get_product_by_id(product_id: int) -> Optional[dict]:
-    return next((product for product in products_db if product["id"] == product_id), None)
+    return catalog_store.catalog.get(product_id)
 
 def calculate_monthly_payment(product: dict, amount: int, timeline_months: int) -> int:
     """Calculate estimated monthly payment for financing products"""
     if product["type"] != "financing":
         return 0
     
-    # Simple calculation - in real scenario, this would use proper Islamic finance formulas
-    markup_rate = 0.15  # 15% markup for Murabaha
-    total_amount = amount * (1 + markup_rate)
-    return int(total_amount / timeline_months)
+    # Murabaha / Ijara pricing from the amortization engine
+    return int(round(amortization_engine.monthly_payment(product, amount, timeline_months)))
 
 def recommend_products(user_goals: List[str], risk_profile: str, monthly_income: Optional[int] = None) -> List[dict]:
     """Recommend products based on user goals and risk profile"""
-    recommended = []
-    
-    for product in products_db:
-        score = 0
-        
-        # Match goals
-        for goal in user_goals:
-            if any(goal.lower() in rec.lower() for rec in product["recommended_for"]):
-                score += 2
-        
-        # Match risk profile
-        risk_mapping = {
-            "conservative": ["low"],
-            "moderate": ["low", "medium"],
-            "aggressive": ["low", "medium", "high"]
-        }
-        if risk_profile in risk_mapping and product["risk_level"] in risk_mapping[risk_profile]:
-            score += 1
-        
-        # Consider income for financing products
-        if monthly_income and product["type"] == "financing":
-            if monthly_income > 300000:  # Good income for financing
-                score += 1
-        
-        if score > 0:
-            recommended.append({**product, "match_score": score})
-    
-    # Sort by match score
-    recommended.sort(key=lambda x: x["match_score"], reverse=True)
-    return [product for product in recommended if "match_score" in product]
+    return catalog_store.recommender.recommend(user_goals, risk_profile, monthly_income)
 
 # Routes
 @router.get("/", response_model=List[BankProduct])
 async def get_all_products(
     type: Optional[str] = Query(None, description="Filter by product type"),
     risk_level: Optional[str] = Query(None, description="Filter by risk level"),
-    search: Optional[str] = Query(None, description="Search in product name and description")
+    principle: Optional[str] = Query(None, description="Filter by Sharia principle"),
+    eligibility: Optional[str] = Query(None, description="Filter by eligibility requirement"),
+    search: Optional[str] = Query(None, description="Full-text search, results ranked by relevance")
 ):
-    """Get all bank products with optional filtering"""
-    filtered_products = products_db
-    
-    if type:
-        filtered_products = [p for p in filtered_products if p["type"] == type]
+    """Get all bank products with optional filtering
+
+    Responses are assembled from product JSON pre-encoded once per catalog version.
+    """
+    search = search.strip() if search else None  # whitespace-only search means no search
+    current = catalog_store.current
+    if not (risk_level or principle or eligibility or search):
+        if type is None:
+            return Response(content=current.all_bytes, media_type="application/json")
+        return Response(content=current.type_bytes.get(type, b"[]"), media_type="application/json")
     
-    if risk_level:
-        filtered_products = [p for p in filtered_products if p["risk_level"] == risk_level]
+    filtered_products = current.catalog.filter(
+        type=type,
+        risk_level=risk_level,
+        principle=principle,
+        eligibility=eligibility
+    )
     
     if search:
-        search_lower = search.lower()
-        filtered_products = [
-            p for p in filtered_products
-            if search_lower in p["name"].lower() or search_lower in p["description"].lower()
-        ]
+        filtered_products = current.catalog.search(search, candidates=filtered_products)
     
-    return filtered_products
+    return Response(
+        content=current.encode_products(product["id"] for product in filtered_products),
+        media_type="application/json"
+    )
+
+@router.get("/suggest")
+async def suggest_products(
+    q: str = Query(..., min_length=1, description="Partial query for type-ahead"),
+    limit: int = Query(5, ge=1, le=20)
+):
+    """Type-ahead suggestions: the last word of the query is matched as a prefix"""
+    return [
+        {"id": p["id"], "name": p["name"], "type": p["type"]}
+        for p in catalog_store.catalog.search(q, limit=limit, prefix=True)
+    ]
+
+@router.get("/types")
+async def get_product_types():
+    """Get all available product types"""
+    return {"product_types": catalog_store.catalog.types}
+
+@router.get("/categories")
+async def get_product_categories():
+    """Get product categories and their counts"""
+    return catalog_store.catalog.type_counts
+
+@router.get("/islamic/principles")
+async def get_islamic_principles():
+    """Get all Islamic finance principles used in products"""
+    return {"islamic_principles": catalog_store.catalog.principles}
+
+@router.get("/health")
+async def health_check(db: AsyncSession = Depends(get_async_db)):
+    """Health check endpoint"""
+    return {
+        "status": "healthy",
+        "total_products": len(catalog_store.catalog),
+        "total_applications": await application_store.count(db),
+        "timestamp": datetime.now()
+    }
 
 @router.get("/{product_id}", response_model=BankProduct)
-async def get_product(product_id: int):
+async def get_product(
+    product_id: int,
+    risk_profile: Optional[str] = Query(None, description="Viewer risk profile, used for segmented analytics")
+):
     """Get specific product by ID"""
-    product = get_product_by_id(product_id)
-    if not product:
+    product_bytes = catalog_store.current.product_bytes.get(product_id)
+    if product_bytes is None:
         raise HTTPException(status_code=404, detail="Product not found")
     
     # Track product view (for analytics)
-    product_views_db.append({
-        "product_id": product_id,
-        "viewed_at": datetime.now(),
-        "user_id": None  # In real app, this would be the authenticated user
-    })
+    product_view_tracker.record(
+        product_id,
+        user_id=None,  # In real app, this would be the authenticated user
+        risk_profile=risk_profile
+    )
     
-    return product
+    return Response(content=product_bytes, media_type="application/json")
 
 @router.post("/recommend", response_model=List[BankProduct])
 async def recommend_products_endpoint(request: ProductRecommendationRequest):
@@ -311,27 +161,59 @@ async def recommend_products_endpoint(request: ProductRecommendationRequest):
     
     return recommendations
 
+@router.post("/recommend/batch")
+async def recommend_products_batch(request: ProductRecommendationBatchRequest):
+    """Score many users' goal lists at once and return top-k products per user (campaigns)"""
+    if len(request.requests) > MAX_RECOMMENDATION_BATCH:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {MAX_RECOMMENDATION_BATCH} requests per batch"
+        )
+    if request.top_k < 1:
+        raise HTTPException(status_code=400, detail="top_k must be positive")
+    
+    results = catalog_store.recommender.recommend_batch(
+        [item.dict() for item in request.requests],
+        top_k=request.top_k
+    )
+    
+    return {
+        "results": [{"index": i, "recommendations": items} for i, items in enumerate(results)],
+        "top_k": request.top_k,
+        "total_requests": len(results)
+    }
+
 @router.post("/compare")
 async def compare_products(request: ProductComparisonRequest):
-    """Compare multiple products"""
-    compared_products = []
-    
-    for product_id in request.product_ids:
-        product = get_product_by_id(product_id)
-        if product:
-            compared_products.append(product)
+    """Compare multiple products as an aligned matrix, with computed terms when amount and timeline are given"""
+    try:
+        comparison = product_comparator.compare(
+            catalog_store.catalog,
+            request.product_ids,
+            amount=request.amount,
+            term_months=request.timeline_months
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    if not compared_products:
+    if not comparison:
         raise HTTPException(status_code=404, detail="No products found for comparison")
     
     return {
-        "compared_products": compared_products,
+        **comparison,
         "comparison_date": datetime.now()
     }
 
 @router.post("/apply")
-async def apply_for_product(application: ProductApplication):
-    """Submit application for a product"""
+async def apply_for_product(
+    application: ProductApplication,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Submit application for a product
+
+    Retries with the same Idempotency-Key return the original application instead of creating a duplicate.
+    """
     product = get_product_by_id(application.product_id)
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
@@ -350,54 +232,28 @@ async def apply_for_product(application: ProductApplication):
         )
     
     # Create application record
-    application_data = {
-        **application.dict(),
-        "application_id": len(applications_db) + 1,
-        "status": "pending",
-        "applied_at": datetime.now(),
-        "product_name": product["name"]
-    }
-    
-    applications_db.append(application_data)
+    try:
+        application_data, created = await application_store.submit(
+            db,
+            application.dict(),
+            product_name=product["name"],
+            idempotency_key=idempotency_key
+        )
+    except IdempotencyConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     
     return {
         "application_id": application_data["application_id"],
-        "status": "pending",
-        "message": "Application submitted successfully",
+        "status": application_data["status"],
+        "message": "Application submitted successfully" if created else "Application already submitted",
         "estimated_decision_time": "1-3 business days"
     }
 
-@router.get("/types")
-async def get_product_types():
-    """Get all available product types"""
-    types = list(set(product["type"] for product in products_db))
-    return {"product_types": types}
-
-@router.get("/categories")
-async def get_product_categories():
-    """Get product categories and their counts"""
-    categories = {}
-    for product in products_db:
-        if product["type"] not in categories:
-            categories[product["type"]] = 0
-        categories[product["type"]] += 1
-    
-    return categories
-
-@router.get("/islamic/principles")
-async def get_islamic_principles():
-    """Get all Islamic finance principles used in products"""
-    principles = set()
-    for product in products_db:
-        principles.update(product["sharia_principles"])
-    
-    return {"islamic_principles": list(principles)}
-
 @router.post("/{product_id}/calculate")
 async def calculate_product_terms(
     product_id: int,
-    amount: int = Query(..., description="Financing or investment amount"),
-    timeline_months: int = Query(None, description="Timeline in months")
+    amount: int = Query(..., gt=0, description="Financing or investment amount"),
+    timeline_months: int = Query(None, gt=0, description="Timeline in months")
 ):
     """Calculate terms for a product (monthly payments, returns, etc.)"""
     product = get_product_by_id(product_id)
@@ -412,25 +268,63 @@ async def calculate_product_terms(
     }
     
     if product["type"] == "financing" and timeline_months:
-        monthly_payment = calculate_monthly_payment(product, amount, timeline_months)
-        calculation["estimated_monthly_payment"] = monthly_payment
-        calculation["total_amount"] = monthly_payment * timeline_months
+        try:
+            terms = amortization_engine.pricing_grid(product, [amount], [timeline_months])
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        calculation["contract_type"] = terms["contract_type"]
+        calculation["estimated_monthly_payment"] = int(round(terms["monthly_payment"][0][0]))
+        calculation["total_amount"] = int(round(terms["total_cost"][0][0]))
+        calculation["total_markup"] = int(round(terms["total_markup"][0][0]))
     
     elif product["type"] == "deposit" and timeline_months:
         # Simplified profit calculation for Islamic deposits
-        estimated_profit = amount * 0.1 * (timeline_months / 12)  # 10% annual profit share
+        estimated_profit = amount * settings.BANK_PRODUCTS["expected_profit_rates"]["deposit"] * (timeline_months / 12)
         calculation["estimated_profit"] = int(estimated_profit)
         calculation["total_return"] = amount + int(estimated_profit)
     
     return calculation
 
+@router.get("/{product_id}/schedule")
+async def get_payment_schedule(
+    product_id: int,
+    amount: int = Query(..., gt=0, description="Financing amount"),
+    timeline_months: int = Query(..., gt=0, le=360, description="Term in months")
+):
+    """Full installment table (principal/markup or rental/purchase shares) for a financing product"""
+    product = get_product_by_id(product_id)
+    if not product:
+        raise HTTPException(status_code=404, detail="Product not found")
+    
+    try:
+        schedule = amortization_engine.schedule(product, amount, timeline_months)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return {"product_id": product_id, "product_name": product["name"], **schedule}
+
+@router.get("/{product_id}/pricing-grid")
+async def get_pricing_grid(
+    product_id: int,
+    amounts: List[int] = Query(..., description="Financing amounts"),
+    terms: List[int] = Query(..., description="Terms in months")
+):
+    """Monthly payment and total cost for every amount × term combination (for sliders)"""
+    product = get_product_by_id(product_id)
+    if not product:
+        raise HTTPException(status_code=404, detail="Product not found")
+    
+    try:
+        grid = amortization_engine.pricing_grid(product, amounts, terms)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return {"product_id": product_id, "product_name": product["name"], **grid}
+
 @router.get("/applications/{user_id}")
-async def get_user_applications(user_id: int):
+async def get_user_applications(user_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get product applications for a specific user"""
-    user_applications = [
-        app for app in applications_db 
-        if app["user_id"] == user_id
-    ]
+    user_applications = await application_store.list_for_user(db, user_id)
     
     return {
         "user_id": user_id,
@@ -440,29 +334,27 @@ async def get_user_applications(user_id: int):
 
 # Analytics endpoints (for admin purposes)
 @router.get("/analytics/popular")
-async def get_popular_products(limit: int = Query(5, ge=1, le=20)):
-    """Get most viewed products"""
-    from collections import Counter
-    view_counts = Counter(view["product_id"] for view in product_views_db)
-    popular_ids = [product_id for product_id, count in view_counts.most_common(limit)]
+async def get_popular_products(
+    limit: int = Query(5, ge=1, le=20),
+    window: str = Query("all", description="Time window: hour, day, week or all"),
+    risk_profile: Optional[str] = Query(None, description="Only views by users with this risk profile"),
+    type: Optional[str] = Query(None, description="Only products of this type")
+):
+    """Get most viewed products, optionally trending within a time window and segment"""
+    product_ids = catalog_store.catalog.ids_for("type", type) if type else None
+    try:
+        popular = product_view_tracker.popular(limit, window=window, risk_profile=risk_profile, product_ids=product_ids)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     popular_products = []
-    for product_id in popular_ids:
+    for product_id, view_count in popular:
         product = get_product_by_id(product_id)
         if product:
             popular_products.append({
                 **product,
-                "view_count": view_counts[product_id]
+                "view_count": view_count,
+                "window": window
             })
     
     return popular_products
-
-@router.get("/health")
-async def health_check():
-    """Health check endpoint"""
-    return {
-        "status": "healthy",
-        "total_products": len(products_db),
-        "total_applications": len(applications_db),
-        "timestamp": datetime.now()
-    }
\ No newline at end of file
@@ -2,7 +2,9 @@ import logging
 import json
 import requests
 from typing import Dict, List, Any, Optional
+from fastapi.concurrency import run_in_threadpool
 from ..core.config import settings
+from .product_retrieval import product_retriever
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -296,55 +298,17 @@ class IslamicAIService:
             ]
 
     async def _suggest_products(self, user_context: Dict[str, Any], user_message: str) -> List[Dict[str, Any]]:
-        """Умная рекомендация продуктов на основе контекста"""
+        """Умная рекомендация продуктов: поиск по эмбеддингам + правила, без вызова LLM"""
         try:
-            monthly_income = user_context.get('monthly_income', 0)
-            goals = user_context.get('goals', [])
-            user_message_lower = user_message.lower()
-            
-            # Используем AI для анализа и рекомендации продуктов
-            analysis_prompt = f"""
-            Проанализируй финансовый профиль пользователя и его запрос, чтобы рекомендовать подходящие исламские финансовые продукты.
-
-            ПРОФИЛЬ:
-            - Доход: {monthly_income:,} ₸/месяц
-            - Цели: {[goal.get('name', 'Цель') for goal in goals]}
-            - Запрос: {user_message}
-
-            ДОСТУПНЫЕ ПРОДУКТЫ ZAMAN BANK:
-            1. Вклад "Аманат" (Мудараба) - для сбережений
-            2. Мурабаха финансирование - для недвижимости, автомобилей
-            3. Мушарака бизнес - для предпринимательства
-            4. Иджара - лизинг с выкупом
-            5. Текущий счет "Вадиа" - для ежедневных операций
-            6. Инвестиционный счет "Садака" - для социальных инвестиций
-
-            Верни ТОЛЬКО JSON массив с 2-3 наиболее подходящими продуктами в формате:
-            [{{"name": "Название", "type": "Тип", "description": "Краткое описание", "why_suitable": "Почему подходит"}}]
-
-            Будь конкретным и ориентированным на потребности пользователя.
-            """
-            
-            messages = [
-                {"role": "system", "content": "Ты помощник для рекомендации финансовых продуктов. Возвращай только JSON."},
-                {"role": "user", "content": analysis_prompt}
-            ]
-            
-            products_response = await self.get_ai_response(messages)
-            
-            try:
-                suggested_products = json.loads(products_response)
-                if isinstance(suggested_products, list):
-                    return suggested_products[:3]
-            except:
-                pass
-                
-            # Fallback рекомендации
-            return self._get_fallback_products(user_context, user_message_lower)
-            
+            # Эмбеддинг запроса и поиск в векторном хранилище блокируют: выполняем в пуле потоков
+            suggested_products = await run_in_threadpool(product_retriever.suggest, user_message, user_context)
+            if suggested_products:
+                return suggested_products
         except Exception as e:
             logger.error(f"Error suggesting products: {e}")
-            return self._get_fallback_products(user_context, user_message.lower())
+        
+        # Fallback рекомендации
+        return self._get_fallback_products(user_context, user_message.lower())
 
     def _get_fallback_products(self, user_context: Dict[str, Any], user_message_lower: str) -> List[Dict[str, Any]]:
         """Резервные рекомендации продуктов"""
@@ -0,0 +1,180 @@
+from typing import Dict, List, Any, Optional, Sequence
+import numpy as np
+
+from ..core.config import settings
+
+
+class IslamicAmortizationEngine:
+    """Графики платежей для Мурабахи и Иджары
+
+    Мурабаха: цена продажи фиксируется при заключении договора (равные платежи),
+    наценка в каждом платеже признается пропорционально остатку долга.
+    Иджара: аренда начисляется на долю актива, еще принадлежащую банку, плюс
+    равный выкуп доли клиентом; в конце выплачивается остаточная стоимость.
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        config = {**settings.BANK_PRODUCTS, **(config or {})}
+        self.murabaha_profit_rate = config["murabaha_profit_rate"]
+        self.ijara_rental_rate = config["ijara_rental_rate"]
+        self.ijara_residual_value_share = config["ijara_residual_value_share"]
+        self.max_grid_cells = config["max_pricing_grid_cells"]
+
+    @staticmethod
+    def contract_type(product: Dict[str, Any]) -> Optional[str]:
+        """Тип договора финансирования продукта (murabaha / ijara) или None"""
+        if product.get("type") != "financing":
+            return None
+        principles = " ".join(product.get("sharia_principles", [])).lower()
+        return "ijara" if "иджара" in principles else "murabaha"
+
+    @staticmethod
+    def _murabaha_installment(amount: np.ndarray, term: np.ndarray, monthly_rate: float) -> np.ndarray:
+        if monthly_rate == 0:
+            return amount / term
+        return amount * monthly_rate / (1 - (1 + monthly_rate) ** -term)
+
+    def murabaha_schedule(self, amount: float, term_months: int, annual_profit_rate: Optional[float] = None) -> Dict[str, np.ndarray]:
+        """Векторный график Мурабахи: равные платежи, доли основного долга и наценки"""
+        rate = (self.murabaha_profit_rate if annual_profit_rate is None else annual_profit_rate) / 12
+        months = np.arange(1, term_months + 1)
+        installment = float(self._murabaha_installment(np.float64(amount), np.float64(term_months), rate))
+
+        if rate == 0:
+            balance_before = amount - installment * (months - 1)
+        else:
+            growth = (1 + rate) ** (months - 1)
+            balance_before = amount * growth - installment * (growth - 1) / rate
+
+        markup_share = balance_before * rate
+        principal_share = installment - markup_share
+        remaining_balance = np.maximum(balance_before - principal_share, 0)
+
+        return {
+            "month": months,
+            "payment": np.full(term_months, installment),
+            "principal_share": principal_share,
+            "markup_share": markup_share,
+            "remaining_balance": remaining_balance
+        }
+
+    def ijara_schedule(
+        self,
+        amount: float,
+        term_months: int,
+        annual_rental_rate: Optional[float] = None,
+        residual_value_share: Optional[float] = None
+    ) -> Dict[str, np.ndarray]:
+        """Векторный график Иджары: аренда на долю банка и выкуп доли клиентом"""
+        rate = (self.ijara_rental_rate if annual_rental_rate is None else annual_rental_rate) / 12
+        residual = amount * (self.ijara_residual_value_share if residual_value_share is None else residual_value_share)
+        months = np.arange(1, term_months + 1)
+
+        purchase = (amount - residual) / term_months
+        bank_share_before = amount - purchase * (months - 1)
+        rental_share = bank_share_before * rate
+        purchase_share = np.full(term_months, purchase)
+        purchase_share[-1] += residual  # выкуп по остаточной стоимости
+
+        return {
+            "month": months,
+            "payment": rental_share + purchase_share,
+            "rental_share": rental_share,
+            "purchase_share": purchase_share,
+            "remaining_balance": np.maximum(bank_share_before - purchase_share, 0)
+        }
+
+    def schedule(self, product: Dict[str, Any], amount: float, term_months: int) -> Dict[str, Any]:
+        """Полная таблица платежей и итоги для продукта финансирования"""
+        contract = self.contract_type(product)
+        if contract is None:
+            raise ValueError("Payment schedule is only available for financing products")
+        if term_months <= 0 or amount <= 0:
+            raise ValueError("Amount and term must be positive")
+
+        if contract == "ijara":
+            table = self.ijara_schedule(amount, term_months)
+        else:
+            table = self.murabaha_schedule(amount, term_months)
+
+        columns = {name: np.round(values, 2).tolist() for name, values in table.items() if name != "month"}
+        rows = [
+            {"month": int(month), **{name: values[i] for name, values in columns.items()}}
+            for i, month in enumerate(table["month"])
+        ]
+
+        total_cost = float(table["payment"].sum())
+        return {
+            "contract_type": contract,
+            "amount": amount,
+            "term_months": term_months,
+            "monthly_payment": round(float(table["payment"][0]), 2),
+            "total_cost": round(total_cost, 2),
+            "total_markup": round(total_cost - amount, 2),
+            "schedule": rows
+        }
+
+    def monthly_payment(self, product: Dict[str, Any], amount: float, term_months: int) -> float:
+        """Первый ежемесячный платеж (для Мурабахи все платежи равны)"""
+        grid = self.pricing_grid(product, [amount], [term_months])
+        return grid["monthly_payment"][0][0]
+
+    def pricing_grid(self, product: Dict[str, Any], amounts: Sequence[float], terms: Sequence[int]) -> Dict[str, Any]:
+        """Итоги по всем сочетаниям сумма × срок за один векторный расчет (закрытые формулы)"""
+        contract = self.contract_type(product)
+        if contract is None:
+            raise ValueError("Pricing grid is only available for financing products")
+        if len(amounts) * len(terms) > self.max_grid_cells:
+            raise ValueError(f"Pricing grid is limited to {self.max_grid_cells} cells")
+
+        amount = np.asarray(amounts, dtype=np.float64)[:, None]
+        term = np.asarray(terms, dtype=np.float64)[None, :]
+        if (amount <= 0).any() or (term <= 0).any():
+            raise ValueError("Amounts and terms must be positive")
+
+        if contract == "ijara":
+            rate = self.ijara_rental_rate / 12
+            residual = amount * self.ijara_residual_value_share
+            purchase = (amount - residual) / term
+            total_rental = rate * (term * amount - purchase * term * (term - 1) / 2)
+            first_payment = amount * rate + purchase
+            total_cost = total_rental + amount
+        else:
+            first_payment = self._murabaha_installment(amount, term, self.murabaha_profit_rate / 12)
+            total_cost = first_payment * term
+
+        first_payment, total_cost = np.broadcast_arrays(first_payment, total_cost)
+        return {
+            "contract_type": contract,
+            "amounts": list(amounts),
+            "terms": list(terms),
+            "monthly_payment": np.round(first_payment, 2).tolist(),
+            "total_cost": np.round(total_cost, 2).tolist(),
+            "total_markup": np.round(total_cost - amount, 2).tolist()
+        }
+
+    def contract_terms(self, contracts: Sequence[Optional[str]], amount: float, term_months: int) -> Dict[str, np.ndarray]:
+        """Первый платеж и полная стоимость для нескольких договоров (murabaha / ijara / None) одним расчетом
+
+        Для позиций без договора финансирования возвращается NaN.
+        """
+        if amount <= 0 or term_months <= 0:
+            raise ValueError("Amount and term must be positive")
+        contracts = np.asarray(contracts, dtype=object)
+        is_ijara = contracts == "ijara"
+        is_murabaha = contracts == "murabaha"
+
+        murabaha_payment = float(self._murabaha_installment(np.float64(amount), np.float64(term_months), self.murabaha_profit_rate / 12))
+
+        rate = self.ijara_rental_rate / 12
+        residual = amount * self.ijara_residual_value_share
+        purchase = (amount - residual) / term_months
+        ijara_payment = amount * rate + purchase
+        ijara_total = rate * (term_months * amount - purchase * term_months * (term_months - 1) / 2) + amount
+
+        first_payment = np.select([is_murabaha, is_ijara], [murabaha_payment, ijara_payment], default=np.nan)
+        total_cost = np.select([is_murabaha, is_ijara], [murabaha_payment * term_months, ijara_total], default=np.nan)
+        return {"monthly_payment": first_payment, "total_cost": total_cost}
+
+
+amortization_engine = IslamicAmortizationEngine()
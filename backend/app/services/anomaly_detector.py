@@ -0,0 +1,165 @@
+import math
+import threading
+from collections import deque
+from datetime import datetime, timezone
+from typing import Dict, List, Any, Optional, Deque, Iterable, Set
+
+from ..core.config import settings
+
+
+class CategoryStats:
+    """Экспоненциально взвешенные среднее и дисперсия расходов по категории"""
+    __slots__ = ("count", "mean", "variance", "last_amount", "last_seen")
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.variance = 0.0
+        self.last_amount = 0.0
+        self.last_seen = None
+
+    def update(self, amount: float, alpha: float, seen_at: Any = None) -> None:
+        """O(1) обновление EWMA-статистики новым значением"""
+        if self.count == 0:
+            self.mean = amount
+            self.variance = 0.0
+        else:
+            diff = amount - self.mean
+            increment = alpha * diff
+            self.mean += increment
+            self.variance = (1 - alpha) * (self.variance + diff * increment)
+        self.count += 1
+        self.last_amount = amount
+        self.last_seen = seen_at
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "std": self.std,
+            "last_amount": self.last_amount,
+            "last_seen": self.last_seen
+        }
+
+
+class SpendingAnomalyDetector:
+    """Онлайн-детектор аномальных расходов (состояние O(1) на пользователя и категорию)
+
+    Состояние хранится в памяти процесса и не сохраняется: каждый воркер
+    при первом обращении восстанавливает базовую статистику пользователя из
+    истории транзакций (warm_up), а список найденных аномалий содержит
+    только вставки, прошедшие через этот воркер. Все отметки времени в UTC,
+    как и дата новой транзакции по умолчанию (POST /analysis/transactions).
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        config = {**settings.ANOMALY_DETECTION, **(config or {})}
+        self.alpha = config["ewma_alpha"]
+        self.z_threshold = config["z_threshold"]
+        self.min_observations = config["min_observations"]
+        self.min_relative_increase = config["min_relative_increase"]
+        self.max_anomalies_per_user = config["max_anomalies_per_user"]
+
+        self._stats: Dict[int, Dict[str, CategoryStats]] = {}
+        self._anomalies: Dict[int, Deque[Dict[str, Any]]] = {}
+        self._warmed_up: Set[int] = set()
+        self._lock = threading.Lock()
+
+    def observe(self, transaction: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Учитывает новую транзакцию и возвращает аномалию, если она обнаружена"""
+        if transaction.get("transaction_type") != "expense":
+            return None
+
+        user_id = transaction.get("user_id")
+        category = transaction.get("category") or "other"
+        amount = float(transaction.get("amount", 0))
+        seen_at = transaction.get("date") or datetime.now(timezone.utc).isoformat()
+
+        with self._lock:
+            user_stats = self._stats.setdefault(user_id, {})
+            stats = user_stats.get(category)
+            if stats is None:
+                stats = user_stats[category] = CategoryStats()
+
+            anomaly = self._score(transaction, stats, amount)
+            stats.update(amount, self.alpha, seen_at)
+
+            if anomaly:
+                anomalies = self._anomalies.get(user_id)
+                if anomalies is None:
+                    anomalies = self._anomalies[user_id] = deque(maxlen=self.max_anomalies_per_user)
+                anomalies.append(anomaly)
+
+        return anomaly
+
+    def _score(self, transaction: Dict[str, Any], stats: CategoryStats, amount: float) -> Optional[Dict[str, Any]]:
+        """Сравнение суммы с текущей статистикой категории (до её обновления)"""
+        if stats.count < self.min_observations:
+            return None
+
+        if amount <= stats.mean * (1 + self.min_relative_increase):
+            return None
+
+        std = stats.std
+        z_score = (amount - stats.mean) / std if std > 0 else math.inf
+        if z_score < self.z_threshold:
+            return None
+
+        return {
+            "transaction_id": transaction.get("id"),
+            "user_id": transaction.get("user_id"),
+            "category": transaction.get("category") or "other",
+            "amount": amount,
+            "expected_amount": stats.mean,
+            "z_score": z_score if math.isfinite(z_score) else None,
+            "date": transaction.get("date"),
+            "detected_at": datetime.now(timezone.utc),
+            "message": f"Необычно высокий расход в категории '{transaction.get('category')}': "
+                       f"{amount:,.0f} ₸ при обычных {stats.mean:,.0f} ₸"
+        }
+
+    def is_warmed_up(self, user_id: int) -> bool:
+        return user_id in self._warmed_up
+
+    def warm_up(self, user_id: int, transactions: Iterable[Dict[str, Any]]) -> bool:
+        """Однократный прогон истории пользователя (в хронологическом порядке) при первом обращении"""
+        with self._lock:
+            if user_id in self._warmed_up:
+                return False
+            self._warmed_up.add(user_id)
+        for transaction in transactions:
+            self.observe(transaction)
+        return True
+
+    def get_anomalies(self, user_id: int, limit: int = 20) -> List[Dict[str, Any]]:
+        """Последние аномалии пользователя, от новых к старым"""
+        with self._lock:
+            anomalies = list(self._anomalies.get(user_id, ()))
+        return anomalies[::-1][:limit]
+
+    def get_category_stats(self, user_id: int) -> Dict[str, Dict[str, Any]]:
+        """Текущая статистика по категориям пользователя"""
+        with self._lock:
+            return {
+                category: stats.to_dict()
+                for category, stats in self._stats.get(user_id, {}).items()
+            }
+
+    def reset(self, user_id: Optional[int] = None) -> None:
+        """Сброс состояния (для пользователя или полностью)"""
+        with self._lock:
+            if user_id is None:
+                self._stats.clear()
+                self._anomalies.clear()
+                self._warmed_up.clear()
+                return
+            self._stats.pop(user_id, None)
+            self._anomalies.pop(user_id, None)
+            self._warmed_up.discard(user_id)
+
+
+spending_anomaly_detector = SpendingAnomalyDetector()
@@ -0,0 +1,107 @@
+import hashlib
+import json
+from typing import Dict, List, Any, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.financial import ProductApplicationRecord
+
+
+class IdempotencyConflictError(Exception):
+    """Ключ идемпотентности уже использован для другой заявки"""
+
+
+class ApplicationStore:
+    """Хранилище заявок на продукты в БД
+
+    Id выдает база (автоинкремент), выборка по пользователю идет по индексу
+    (user_id, applied_at), а повтор запроса с тем же Idempotency-Key
+    возвращает уже созданную заявку вместо дубликата.
+    """
+
+    FIELDS = ("product_id", "user_id", "amount", "timeline", "additional_info")
+
+    @classmethod
+    def fingerprint(cls, application: Dict[str, Any]) -> str:
+        payload = json.dumps({field: application.get(field) for field in cls.FIELDS}, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def to_dict(record: ProductApplicationRecord) -> Dict[str, Any]:
+        return {
+            "application_id": record.id,
+            "product_id": record.product_id,
+            "user_id": record.user_id,
+            "amount": record.amount,
+            "timeline": record.timeline,
+            "additional_info": record.additional_info,
+            "status": record.status,
+            "applied_at": record.applied_at,
+            "product_name": record.product_name
+        }
+
+    async def _find_by_key(self, db: AsyncSession, user_id: int, idempotency_key: str) -> Optional[ProductApplicationRecord]:
+        return await db.scalar(
+            select(ProductApplicationRecord).where(
+                ProductApplicationRecord.user_id == user_id,
+                ProductApplicationRecord.idempotency_key == idempotency_key
+            )
+        )
+
+    def _replay(self, record: ProductApplicationRecord, fingerprint: str) -> Tuple[Dict[str, Any], bool]:
+        if record.request_fingerprint != fingerprint:
+            raise IdempotencyConflictError("Idempotency-Key was already used with a different application")
+        return self.to_dict(record), False
+
+    async def submit(
+        self,
+        db: AsyncSession,
+        application: Dict[str, Any],
+        product_name: str,
+        idempotency_key: Optional[str] = None
+    ) -> Tuple[Dict[str, Any], bool]:
+        """Сохранить заявку; возвращает (заявка, создана ли новая)"""
+        fingerprint = self.fingerprint(application)
+
+        if idempotency_key:
+            existing = await self._find_by_key(db, application["user_id"], idempotency_key)
+            if existing is not None:
+                return self._replay(existing, fingerprint)
+
+        record = ProductApplicationRecord(
+            **{field: application.get(field) for field in self.FIELDS},
+            product_name=product_name,
+            status="pending",
+            idempotency_key=idempotency_key,
+            request_fingerprint=fingerprint
+        )
+        db.add(record)
+        try:
+            await db.commit()
+        except IntegrityError:
+            # Параллельный повтор с тем же ключом успел раньше
+            await db.rollback()
+            existing = await self._find_by_key(db, application["user_id"], idempotency_key)
+            if existing is None:
+                raise
+            return self._replay(existing, fingerprint)
+
+        await db.refresh(record)
+        return self.to_dict(record), True
+
+    async def list_for_user(self, db: AsyncSession, user_id: int) -> List[Dict[str, Any]]:
+        """Заявки пользователя по индексу (user_id, applied_at)"""
+        records = await db.scalars(
+            select(ProductApplicationRecord)
+            .where(ProductApplicationRecord.user_id == user_id)
+            .order_by(ProductApplicationRecord.applied_at, ProductApplicationRecord.id)
+        )
+        return [self.to_dict(record) for record in records]
+
+    async def count(self, db: AsyncSession) -> int:
+        return await db.scalar(select(func.count(ProductApplicationRecord.id)))
+
+
+application_store = ApplicationStore()
@@ -0,0 +1,114 @@
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, Any, Optional, Iterable
+
+from pydantic import ValidationError
+
+from ..core.config import settings
+from ..models.product import ProductCatalogFile
+from .product_catalog import ProductCatalog
+from .product_recommender import ProductRecommender
+
+logger = logging.getLogger(__name__)
+
+
+def encode_json(content: Any) -> bytes:
+    """Сериализация как у JSONResponse FastAPI"""
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+class LoadedCatalog:
+    """Проверенная версия каталога с индексами и заранее сериализованными ответами"""
+
+    def __init__(self, data: ProductCatalogFile, mtime: Optional[float] = None):
+        products = [product.dict() for product in data.products]
+        if len({product["id"] for product in products}) != len(products):
+            raise ValueError("Product ids in the catalog file must be unique")
+        self.version = data.version
+        self.mtime = mtime
+        self.catalog = ProductCatalog(products, version=data.version)
+        self.recommender = ProductRecommender(self.catalog)
+
+        self.product_bytes: Dict[int, bytes] = {product["id"]: encode_json(product) for product in products}
+        self.all_bytes = self.encode_products(product["id"] for product in products)
+        self.type_bytes: Dict[str, bytes] = {
+            product_type: self.encode_products(
+                product["id"] for product in self.catalog.filter(type=product_type)
+            )
+            for product_type in self.catalog.types
+        }
+
+    def encode_products(self, product_ids: Iterable[int]) -> bytes:
+        """JSON-массив продуктов, собранный из готовых фрагментов"""
+        return b"[" + b",".join(self.product_bytes[product_id] for product_id in product_ids) + b"]"
+
+
+class ProductCatalogStore:
+    """Каталог продуктов из версионированного файла данных с горячей перезагрузкой
+
+    Файл проверяется не чаще, чем раз в catalog_reload_seconds; при изменении
+    новая версия полностью собирается и проверяется в стороне, затем подменяется
+    одной операцией присваивания. Ошибочный файл не заменяет рабочую версию.
+    """
+
+    def __init__(self, catalog_file: Optional[str] = None, reload_seconds: Optional[int] = None):
+        self.catalog_file = catalog_file or settings.BANK_PRODUCTS["catalog_file"]
+        self.reload_seconds = (
+            reload_seconds if reload_seconds is not None else settings.BANK_PRODUCTS["catalog_reload_seconds"]
+        )
+        self._current: Optional[LoadedCatalog] = None
+        self._failed_mtime: Optional[float] = None  # не перечитывать один и тот же ошибочный файл
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def current(self) -> LoadedCatalog:
+        """Текущая версия каталога (при необходимости перечитывается из файла)"""
+        now = time.monotonic()
+        if self._current is not None and now - self._checked_at < self.reload_seconds:
+            return self._current
+
+        with self._lock:
+            if self._current is None or now - self._checked_at >= self.reload_seconds:
+                self._refresh()
+                self._checked_at = now
+        return self._current
+
+    @property
+    def catalog(self) -> ProductCatalog:
+        return self.current.catalog
+
+    @property
+    def recommender(self) -> ProductRecommender:
+        return self.current.recommender
+
+    def _refresh(self, force: bool = False) -> None:
+        mtime = None
+        try:
+            mtime = os.path.getmtime(self.catalog_file)
+            if not force and self._current is not None and mtime in (self._current.mtime, self._failed_mtime):
+                return
+            with open(self.catalog_file, "r", encoding="utf-8") as f:
+                data = ProductCatalogFile(**json.load(f))
+            loaded = LoadedCatalog(data, mtime)
+            if self._current is not None:
+                logger.info(f"Product catalog reloaded: version {self._current.version} -> {loaded.version}")
+            self._current = loaded
+        except (OSError, ValueError, KeyError, ValidationError) as e:
+            if self._current is None:
+                raise
+            self._failed_mtime = mtime
+            logger.error(f"Failed to reload product catalog, keeping version {self._current.version}: {e}")
+
+    def reload(self) -> LoadedCatalog:
+        """Принудительно перечитать файл каталога"""
+        with self._lock:
+            self._refresh(force=True)
+            self._checked_at = time.monotonic()
+        return self._current
+
+
+catalog_store = ProductCatalogStore()
@@ -0,0 +1,234 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Tuple, Iterable
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Ключ keyset-пагинации истории: (created_at, id)
+HistoryKey = Tuple[datetime, int]
+
+MONTH_PATTERN = re.compile(r"^\d{4}-\d{2}$")
+
+
+class ChatArchive:
+    """Холодное хранилище старых реплик чата в сжатых файлах по месяцам
+
+    Раскладка: <archive_dir>/<YYYY-MM>/user-<id>.ndjson.gz и
+    <archive_dir>/<YYYY-MM>/index.json ({user_id: число реплик}). Каждый запуск
+    задачи архивации дописывает в файл новый gzip-член. Снимок контекста
+    хранится в файле один раз на хеш (строка {"context_hash", "context"}),
+    реплики ссылаются на него по context_hash. Файлы одного пользователя
+    за месяц удаляются целиком при очистке истории.
+
+    Источник истины — файлы пользователей: индекс только ускоряет подсчет и
+    пересобирается по id из файла при каждой дозаписи, поэтому сбой между
+    записью файла и индекса исправляется повторным запуском задачи.
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        config = {**settings.CHAT_ARCHIVE, **(config or {})}
+        self.archive_dir = config["archive_dir"]
+        self.compress_level = config["compress_level"]
+
+        self._lock = threading.Lock()
+        self._indexes: Dict[str, Tuple[float, Dict[int, int]]] = {}  # месяц -> (mtime, счетчики)
+
+    @staticmethod
+    def month_of(created_at: datetime) -> str:
+        return created_at.strftime("%Y-%m")
+
+    @staticmethod
+    def context_hash(context: Any) -> str:
+        payload = json.dumps(context, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _user_file(self, month: str, user_id: int) -> str:
+        return os.path.join(self.archive_dir, month, f"user-{user_id}.ndjson.gz")
+
+    def _index_file(self, month: str) -> str:
+        return os.path.join(self.archive_dir, month, "index.json")
+
+    def months(self) -> List[str]:
+        """Месяцы в архиве, новые первыми"""
+        try:
+            names = os.listdir(self.archive_dir)
+        except FileNotFoundError:
+            return []
+        return sorted((name for name in names if MONTH_PATTERN.match(name)), reverse=True)
+
+    # Индексы месяцев
+
+    def _read_index(self, month: str) -> Dict[int, int]:
+        path = self._index_file(month)
+        try:
+            mtime = os.path.getmtime(path)
+        except FileNotFoundError:
+            return {}
+        with self._lock:
+            cached = self._indexes.get(month)
+            if cached and cached[0] == mtime:
+                return cached[1]
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                counts = {int(user_id): count for user_id, count in json.load(f).items()}
+        except (OSError, ValueError) as e:
+            logger.error(f"Failed to read chat archive index {path}: {e}")
+            return {}
+        with self._lock:
+            self._indexes[month] = (mtime, counts)
+        return counts
+
+    def _write_index(self, month: str, counts: Dict[int, int]) -> None:
+        path = self._index_file(month)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({str(user_id): count for user_id, count in sorted(counts.items()) if count}, f)
+        os.replace(temp_path, path)  # читатели видят старый или новый индекс целиком
+        with self._lock:
+            self._indexes.pop(month, None)
+
+    def archived_count(self, user_id: int) -> int:
+        return sum(self._read_index(month).get(user_id, 0) for month in self.months())
+
+    # Чтение
+
+    def _read_lines(self, path: str) -> Iterable[Dict[str, Any]]:
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    yield json.loads(line)
+        except FileNotFoundError:
+            return
+        except (EOFError, gzip.BadGzipFile, ValueError) as e:
+            # Незавершенная дозапись: используем уже прочитанные строки
+            logger.warning(f"Truncated chat archive file {path}: {e}")
+
+    def _read_user_month(self, month: str, user_id: int, include_context: bool) -> List[Dict[str, Any]]:
+        contexts: Dict[str, Any] = {}
+        turns: Dict[int, Dict[str, Any]] = {}
+        for record in self._read_lines(self._user_file(month, user_id)):
+            if "id" not in record:
+                contexts[record["context_hash"]] = record["context"]
+                continue
+            record["created_at"] = datetime.fromisoformat(record["created_at"])
+            turns[record["id"]] = record  # повтор после сбоя задачи учитывается один раз
+        for turn in turns.values():
+            context_hash = turn.pop("context_hash", None)
+            if include_context:
+                turn["context"] = contexts.get(context_hash)
+        return list(turns.values())
+
+    def read_page(
+        self,
+        user_id: int,
+        limit: int,
+        before: Optional[HistoryKey] = None,
+        include_context: bool = False
+    ) -> Tuple[List[Dict[str, Any]], bool]:
+        """Архивные реплики пользователя старше ключа before (новые первыми) и признак продолжения"""
+        page: List[Dict[str, Any]] = []
+        for month in self.months():
+            if before is not None and month > self.month_of(before[0]):
+                continue
+            if not os.path.exists(self._user_file(month, user_id)):
+                continue
+            turns = self._read_user_month(month, user_id, include_context)
+            if before is not None:
+                turns = [turn for turn in turns if (turn["created_at"], turn["id"]) < before]
+            turns.sort(key=lambda turn: (turn["created_at"], turn["id"]), reverse=True)
+            page.extend(turns)
+            if len(page) > limit:
+                break
+        return page[:limit], len(page) > limit
+
+    # Запись (задача архивации)
+
+    def append(self, rows: List[Dict[str, Any]]) -> int:
+        """Дописать реплики в файлы их месяцев; возвращает число новых реплик в архиве
+
+        Реплики, уже записанные прошлым (прерванным) запуском, пропускаются,
+        поэтому повтор после сбоя не создает дубликатов.
+        """
+        groups: Dict[Tuple[str, int], List[Dict[str, Any]]] = {}
+        for row in rows:
+            groups.setdefault((self.month_of(row["created_at"]), row["user_id"]), []).append(row)
+
+        counts_by_month: Dict[str, Dict[int, int]] = {}
+        added_total = 0
+        for (month, user_id), turns in groups.items():
+            os.makedirs(os.path.join(self.archive_dir, month), exist_ok=True)
+            path = self._user_file(month, user_id)
+
+            known_hashes, known_ids = set(), set()
+            for record in self._read_lines(path):
+                if "id" in record:
+                    known_ids.add(record["id"])
+                else:
+                    known_hashes.add(record["context_hash"])
+
+            lines = []
+            for turn in turns:
+                if turn["id"] in known_ids:
+                    continue
+                context_hash = None
+                if turn.get("context") is not None:
+                    context_hash = self.context_hash(turn["context"])
+                    if context_hash not in known_hashes:
+                        known_hashes.add(context_hash)
+                        lines.append({"context_hash": context_hash, "context": turn["context"]})
+                lines.append({
+                    "id": turn["id"],
+                    "user_id": user_id,
+                    "user_message": turn["user_message"],
+                    "ai_response": turn["ai_response"],
+                    "message_type": turn["message_type"],
+                    "created_at": turn["created_at"].isoformat(),
+                    "context_hash": context_hash
+                })
+                known_ids.add(turn["id"])
+
+            if lines:
+                payload = "".join(json.dumps(line, ensure_ascii=False, default=str) + "\n" for line in lines)
+                member = gzip.compress(payload.encode("utf-8"), compresslevel=self.compress_level)
+                with open(path, "ab") as f:
+                    f.write(member)
+                    f.flush()
+                    os.fsync(f.fileno())  # строки удаляются из БД только после записи на диск
+                added_total += sum(1 for line in lines if "id" in line)
+            # Счетчик — все id в файле, а не прирост: индекс, не записанный прерванным запуском, восстанавливается
+            counts_by_month.setdefault(month, {})[user_id] = len(known_ids)
+
+        for month, counts in counts_by_month.items():
+            self._write_index(month, {**self._read_index(month), **counts})
+        return added_total
+
+    def delete_user(self, user_id: int) -> int:
+        """Удалить архив пользователя за все месяцы; возвращает число удаленных реплик
+
+        Файлы ищутся на диске, а не по индексу, который мог не обновиться после сбоя.
+        """
+        deleted = 0
+        for month in self.months():
+            path = self._user_file(month, user_id)
+            if not os.path.exists(path):
+                continue
+            deleted += len({record["id"] for record in self._read_lines(path) if "id" in record})
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            counts = self._read_index(month)
+            if user_id in counts:
+                self._write_index(month, {uid: count for uid, count in counts.items() if uid != user_id})
+        return deleted
+
+
+chat_archive = ChatArchive()
@@ -0,0 +1,171 @@
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Dict, List, Any, Optional
+
+from sqlalchemy import insert
+
+from ..core.config import settings
+from ..database.session import AsyncSessionLocal
+from ..models.financial import AIConversation
+
+logger = logging.getLogger(__name__)
+
+
+class ChatHistoryWriter:
+    """Запись истории чата в ai_conversations по схеме write-behind
+
+    Обработчик запроса только кладет реплику в очередь; фоновая задача
+    собирает пачку (до batch_size записей или flush_interval_seconds) и
+    вставляет ее одним INSERT в одной транзакции; неудачная запись повторяется
+    с экспоненциальной задержкой. Время created_at
+    фиксируется при постановке в очередь, поэтому порядок истории не зависит
+    от задержки записи. Переполненная очередь задерживает отправителя
+    (backpressure), а чтение истории пользователя сначала дожидается записи
+    его реплик из очереди (flush_user).
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        config = {**settings.CHAT_HISTORY, **(config or {})}
+        self.batch_size = config["batch_size"]
+        self.flush_interval = config["flush_interval_seconds"]
+        self.max_queue_size = config["max_queue_size"]
+        self.write_attempts = config["write_attempts"]
+        self.retry_backoff = config["retry_backoff_seconds"]
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._flush_requested: Optional[asyncio.Event] = None
+        self._pending: Dict[int, int] = {}  # user_id -> реплик в очереди
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Запуск фоновой задачи (в событийном цикле приложения)"""
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._flush_requested = asyncio.Event()
+        self._pending.clear()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Запись оставшихся реплик и остановка фоновой задачи"""
+        if not self.running:
+            return
+        await self.flush()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def record(
+        self,
+        user_id: int,
+        user_message: str,
+        ai_response: str,
+        context: Optional[Dict[str, Any]] = None,
+        message_type: Optional[str] = None
+    ) -> None:
+        """Поставить реплику чата в очередь на запись"""
+        row = {
+            "user_id": user_id,
+            "user_message": user_message,
+            "ai_response": ai_response,
+            "context": context,
+            "message_type": message_type,
+            "created_at": datetime.now()
+        }
+        if not self.running:
+            # Скрипты и тесты без фоновой задачи пишут сразу
+            await self._write_batch([row])
+            return
+        self._pending[user_id] = self._pending.get(user_id, 0) + 1
+        await self._queue.put(row)
+
+    async def flush(self) -> None:
+        """Дождаться записи всего, что уже стоит в очереди"""
+        if not self.running:
+            return
+        self._flush_requested.set()
+        try:
+            await self._queue.join()
+        finally:
+            self._flush_requested.clear()
+
+    async def flush_user(self, user_id: int) -> None:
+        """Дождаться записи реплик пользователя перед чтением или очисткой его истории"""
+        if self._pending.get(user_id):
+            await self.flush()
+
+    async def _next_row(self, timeout: float) -> Optional[Dict[str, Any]]:
+        """Следующая реплика из очереди; None по таймауту или по запросу flush"""
+        get = asyncio.ensure_future(self._queue.get())
+        flush_requested = asyncio.ensure_future(self._flush_requested.wait())
+        try:
+            await asyncio.wait((get, flush_requested), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            flush_requested.cancel()
+            get.cancel()  # отмененное ожидание не забирает реплику из очереди
+        if get.done() and not get.cancelled():
+            return get.result()
+        return None
+
+    async def _collect_batch(self) -> List[Dict[str, Any]]:
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            timeout = deadline - time.monotonic()
+            if self._flush_requested.is_set() or timeout <= 0:
+                break
+            row = await self._next_row(timeout)
+            if row is None:
+                break
+            batch.append(row)
+        return batch
+
+    async def _write_with_retry(self, batch: List[Dict[str, Any]]) -> None:
+        for attempt in range(self.write_attempts):
+            try:
+                await self._write_batch(batch)
+                return
+            except Exception as e:
+                if attempt + 1 == self.write_attempts:
+                    logger.error(f"Failed to write {len(batch)} chat messages after {self.write_attempts} attempts: {e}")
+                    return
+                delay = self.retry_backoff * 2 ** attempt
+                logger.warning(f"Failed to write {len(batch)} chat messages, retrying in {delay:.1f}s: {e}")
+                await asyncio.sleep(delay)
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._collect_batch()
+            try:
+                await self._write_with_retry(batch)
+            finally:
+                for row in batch:
+                    remaining = self._pending.get(row["user_id"], 0) - 1
+                    if remaining > 0:
+                        self._pending[row["user_id"]] = remaining
+                    else:
+                        self._pending.pop(row["user_id"], None)
+                    self._queue.task_done()
+
+    @staticmethod
+    async def _write_batch(batch: List[Dict[str, Any]]) -> None:
+        async with AsyncSessionLocal() as db:
+            await db.execute(insert(AIConversation), batch)
+            await db.commit()
+
+
+chat_history_writer = ChatHistoryWriter()
@@ -1,8 +1,34 @@
-from typing import Dict, List, Any, Tuple
-from datetime import datetime, timedelta
+from typing import Dict, List, Any, Tuple, Optional, Sequence
+from datetime import datetime, timedelta, date
+import numpy as np
+from ..core.config import settings
 from ..models.user import FinancialMetrics, BudgetRecommendation
+from .savings_allocator import savings_allocator
+from .zakat_service import nisab_price_feed
 
 class IslamicFinancialCalculator:
+    # Доли дохода в исламском бюджете
+    ISLAMIC_BUDGET_SHARES = {
+        "essential_spending": 0.5,     # 50% - основные расходы
+        "savings": 0.2,                # 20% - сбережения
+        "investments": 0.15,           # 15% - инвестиции
+        "charity": 0.025,              # 2.5% - закят
+        "personal_development": 0.125  # 12.5% - саморазвитие
+    }
+
+    # (минимальная норма сбережений, уровень, балл) от лучшего к худшему
+    FINANCIAL_HEALTH_LEVELS = [
+        (0.2, "excellent", 90),
+        (0.15, "good", 75),
+        (0.1, "fair", 60),
+        (0, "needs_improvement", 40)
+    ]
+
+    # Погрешность деления: цель, финансируемая ровно по плану, не получает лишний месяц
+    MONTHS_EPSILON = 1e-9
+    # Дефицит меньше одной копейки/тиына считается нулевым
+    SHORTFALL_EPSILON = 0.01
+
     @staticmethod
     def calculate_monthly_saving(goal_amount: float, current_amount: float, timeline_months: int) -> float:
         """Рассчет ежемесячных сбережений для цели"""
@@ -19,6 +45,174 @@ class IslamicFinancialCalculator:
         progress = (current_amount / target_amount) * 100
         return min(progress, 100)  # Cap at 100%
 
+    @staticmethod
+    def calculate_goals_batch(
+        target_amounts: Sequence[float],
+        current_amounts: Sequence[float],
+        timeline_months: Sequence[int],
+        monthly_contributions: Optional[Sequence[float]] = None,
+        as_of: Optional[date] = None
+    ) -> Dict[str, np.ndarray]:
+        """Векторный расчет сбережений, прогресса, срока достижения и дефицита для массива целей
+
+        Без monthly_contributions предполагается, что откладывается ровно требуемая сумма.
+        """
+        target = np.asarray(target_amounts, dtype=np.float64)
+        current = np.asarray(current_amounts, dtype=np.float64)
+        months = np.asarray(timeline_months, dtype=np.float64)
+
+        remaining = target - current
+        has_timeline = months > 0
+        monthly_saving = np.where(has_timeline, remaining / np.where(has_timeline, months, 1), remaining)
+
+        has_target = target > 0
+        progress = np.where(
+            has_target,
+            np.minimum(current / np.where(has_target, target, 1) * 100, 100),
+            0
+        )
+
+        if monthly_contributions is None:
+            contribution = np.maximum(monthly_saving, 0)
+        else:
+            contribution = np.maximum(np.asarray(monthly_contributions, dtype=np.float64), 0)
+
+        outstanding = np.maximum(remaining, 0)
+        can_progress = contribution > 0
+        months_to_complete = np.where(
+            outstanding <= 0,
+            0,
+            np.where(
+                can_progress,
+                np.ceil(outstanding / np.where(can_progress, contribution, 1) - IslamicFinancialCalculator.MONTHS_EPSILON),
+                np.inf
+            )
+        )
+        shortfall = np.maximum(outstanding - contribution * np.maximum(months, 0), 0)
+        shortfall = np.where(shortfall < IslamicFinancialCalculator.SHORTFALL_EPSILON, 0.0, shortfall)
+
+        start_month = np.datetime64(as_of or date.today(), "M")
+        reachable = np.isfinite(months_to_complete)
+        completion_dates = np.where(
+            reachable,
+            start_month + np.where(reachable, months_to_complete, 0).astype(np.int64),
+            np.datetime64("NaT", "M")
+        )
+
+        return {
+            "monthly_saving": monthly_saving,
+            "progress_percentage": progress,
+            "months_to_complete": months_to_complete,
+            "projected_completion_date": completion_dates,
+            "shortfall": shortfall
+        }
+
+    @staticmethod
+    def project_goals(
+        goals: List[Dict[str, Any]],
+        monthly_contributions: Optional[Sequence[float]] = None,
+        as_of: Optional[date] = None
+    ) -> List[Dict[str, Any]]:
+        """Пакетный расчет прогноза для списка целей (словарей) за один векторный проход"""
+        if not goals:
+            return []
+
+        projections = IslamicFinancialCalculator.calculate_goals_batch(
+            [goal["target_amount"] for goal in goals],
+            [goal.get("current_amount", 0) or 0 for goal in goals],
+            [goal["timeline_months"] for goal in goals],
+            monthly_contributions=monthly_contributions,
+            as_of=as_of
+        )
+
+        monthly_saving = projections["monthly_saving"].tolist()
+        progress = projections["progress_percentage"].tolist()
+        months_to_complete = projections["months_to_complete"].tolist()
+        completion_dates = np.datetime_as_string(projections["projected_completion_date"], unit="D").tolist()
+        shortfall = projections["shortfall"].tolist()
+
+        return [
+            {
+                **goal,
+                "monthly_saving": monthly_saving[i],
+                "progress_percentage": progress[i],
+                "months_to_complete": int(months_to_complete[i]) if np.isfinite(months_to_complete[i]) else None,
+                "projected_completion_date": None if completion_dates[i] == "NaT" else completion_dates[i],
+                "shortfall": shortfall[i]
+            }
+            for i, goal in enumerate(goals)
+        ]
+
+    @staticmethod
+    def evaluate_scenarios(
+        monthly_incomes: Sequence[float],
+        monthly_expenses: Sequence[float],
+        goal_sets: Sequence[List[Dict[str, Any]]],
+        as_of: Optional[date] = None
+    ) -> List[Dict[str, Any]]:
+        """Пакетная оценка what-if сценариев: бюджет, финансовое здоровье, распределение и сроки целей"""
+        incomes = np.asarray(monthly_incomes, dtype=np.float64)
+        expenses = np.asarray(monthly_expenses, dtype=np.float64)
+        savings = incomes - expenses
+
+        budgets = IslamicFinancialCalculator.generate_islamic_budget_batch(incomes)
+        health, scores = IslamicFinancialCalculator.calculate_financial_health_batch(incomes, expenses, savings)
+
+        # Все цели всех сценариев в одном плоском массиве
+        flat_goals = [goal for goals in goal_sets for goal in goals]
+        offsets = np.concatenate(([0], np.cumsum([len(goals) for goals in goal_sets])))
+        required = IslamicFinancialCalculator.calculate_goals_batch(
+            [goal["target_amount"] for goal in flat_goals],
+            [goal.get("current_amount", 0) or 0 for goal in flat_goals],
+            [goal["timeline_months"] for goal in flat_goals]
+        )["monthly_saving"]
+
+        plans = savings_allocator.allocate_batch([
+            (
+                [{**goal, "monthly_saving": required[offsets[i] + j]} for j, goal in enumerate(goals)],
+                savings[i]
+            )
+            for i, goals in enumerate(goal_sets)
+        ])
+        contributions = [item["allocated"] for plan in plans for item in plan["goal_allocations"]]
+
+        timelines = IslamicFinancialCalculator.calculate_goals_batch(
+            [goal["target_amount"] for goal in flat_goals],
+            [goal.get("current_amount", 0) or 0 for goal in flat_goals],
+            [goal["timeline_months"] for goal in flat_goals],
+            monthly_contributions=contributions,
+            as_of=as_of
+        )
+        months_to_complete = timelines["months_to_complete"]
+        completion_dates = np.datetime_as_string(timelines["projected_completion_date"], unit="D")
+        shortfall = timelines["shortfall"]
+
+        results = []
+        for i, goals in enumerate(goal_sets):
+            goal_results = []
+            for j, goal in enumerate(goals):
+                k = offsets[i] + j
+                goal_results.append({
+                    "goal_name": goal.get("goal_name"),
+                    "monthly_saving": float(required[k]),
+                    "allocated": contributions[k],
+                    "months_to_complete": int(months_to_complete[k]) if np.isfinite(months_to_complete[k]) else None,
+                    "projected_completion_date": None if completion_dates[k] == "NaT" else str(completion_dates[k]),
+                    "shortfall": float(shortfall[k])
+                })
+
+            results.append({
+                "monthly_income": float(incomes[i]),
+                "monthly_expenses": float(expenses[i]),
+                "monthly_savings": float(savings[i]),
+                "islamic_budget": {category: float(values[i]) for category, values in budgets.items()},
+                "financial_health": str(health[i]),
+                "financial_health_score": int(scores[i]),
+                "goals_feasible": plans[i]["feasible"],
+                "goals": goal_results
+            })
+        return results
+
     @staticmethod
     def analyze_spending_pattern(transactions: List[Dict]) -> Dict[str, Any]:
         """Анализ паттернов расходов"""
@@ -44,48 +238,154 @@ class IslamicFinancialCalculator:
         }
 
     @staticmethod
-    def calculate_zakat(assets: Dict[str, float]) -> float:
+    def calculate_zakat(assets: Dict[str, float], liabilities: float = 0.0) -> float:
         """Рассчет закята (2.5% от чистых активов)"""
-        total_assets = sum(assets.values())
-        nisab = 85000  # Нисаб в тенге (примерно 85г золота)
+        net_assets = sum(assets.values()) - liabilities
+        nisab = nisab_price_feed.nisab()  # Нисаб по актуальной цене золота/серебра
         
-        if total_assets < nisab:
+        if net_assets < nisab:
             return 0
         
-        return total_assets * 0.025  # 2.5%
+        return net_assets * settings.ISLAMIC_FINANCE["zakat_percentage"]  # 2.5%
 
     @staticmethod
     def generate_islamic_budget(monthly_income: float) -> Dict[str, float]:
         """Генерация бюджета согласно исламским принципам"""
         return {
-            "essential_spending": monthly_income * 0.5,      # 50% - основные расходы
-            "savings": monthly_income * 0.2,                # 20% - сбережения
-            "investments": monthly_income * 0.15,           # 15% - инвестиции
-            "charity": monthly_income * 0.025,              # 2.5% - закят
-            "personal_development": monthly_income * 0.125  # 12.5% - саморазвитие
+            category: monthly_income * share
+            for category, share in IslamicFinancialCalculator.ISLAMIC_BUDGET_SHARES.items()
         }
 
+    @staticmethod
+    def generate_islamic_budget_batch(monthly_incomes: Sequence[float]) -> Dict[str, np.ndarray]:
+        """Векторная генерация исламского бюджета для массива доходов"""
+        incomes = np.asarray(monthly_incomes, dtype=np.float64)
+        return {
+            category: incomes * share
+            for category, share in IslamicFinancialCalculator.ISLAMIC_BUDGET_SHARES.items()
+        }
+
+    @staticmethod
+    def calculate_financial_metrics(
+        user_profile: Dict[str, Any],
+        basic_analysis: Dict[str, Any],
+        zakat: Optional[Dict[str, Any]] = None
+    ) -> FinancialMetrics:
+        """Рассчет комплексных финансовых метрик"""
+        monthly_income = user_profile.get("monthly_income") or 0
+        monthly_expenses = basic_analysis["total_expenses"]
+        monthly_savings = monthly_income - monthly_expenses
+        savings_rate = monthly_savings / monthly_income if monthly_income > 0 else 0
+        
+        # Основные и дискреционные расходы
+        essential_categories = ["housing", "food", "transport", "health"]
+        essential_spending = sum(
+            basic_analysis["expenses_by_category"].get(cat, 0) 
+            for cat in essential_categories
+        )
+        discretionary_spending = monthly_expenses - essential_spending
+        
+        # Исламский бюджет
+        islamic_budget = IslamicFinancialCalculator.generate_islamic_budget(monthly_income)
+        
+        # Оценка финансового здоровья (0-100): 50% сбережений = 100 баллов
+        financial_health_score = max(0, min(100, int(savings_rate * 200)))
+        
+        recommendations = IslamicFinancialCalculator.generate_financial_recommendations(basic_analysis, zakat)
+        
+        return FinancialMetrics(
+            monthly_income=monthly_income,
+            monthly_expenses=monthly_expenses,
+            monthly_savings=monthly_savings,
+            savings_rate=savings_rate,
+            essential_spending=essential_spending,
+            discretionary_spending=discretionary_spending,
+            recommended_budget=islamic_budget,
+            islamic_finance_recommendations=recommendations,
+            financial_health_score=financial_health_score
+        )
+
+    @staticmethod
+    def generate_budget_recommendations(user_profile: Dict[str, Any], current_spending: Dict[str, float]) -> List[BudgetRecommendation]:
+        """Рекомендации по бюджету согласно исламским принципам"""
+        monthly_income = user_profile.get("monthly_income") or 0
+        islamic_budget = IslamicFinancialCalculator.generate_islamic_budget(monthly_income)
+        
+        recommendations = []
+        for category, recommended_amount in islamic_budget.items():
+            current_amount = current_spending.get(category, 0)
+            difference = current_amount - recommended_amount
+            
+            if difference > 0:
+                advice = f"Сократите расходы на {abs(difference):,.0f} ₸"
+            elif difference < 0:
+                advice = f"Можете увеличить на {abs(difference):,.0f} ₸"
+            else:
+                advice = "Оптимальный уровень расходов"
+            
+            recommendations.append(BudgetRecommendation(
+                category=category,
+                recommended_percentage=(recommended_amount / monthly_income) * 100 if monthly_income > 0 else 0,
+                recommended_amount=recommended_amount,
+                current_amount=current_amount,
+                difference=difference,
+                advice=advice
+            ))
+        
+        return recommendations
+
+    @staticmethod
+    def generate_financial_recommendations(analysis: Dict[str, Any], zakat: Optional[Dict[str, Any]] = None) -> List[str]:
+        """Исламские финансовые рекомендации"""
+        recommendations = []
+        savings_rate = analysis["savings_rate"]
+        
+        if savings_rate < 0.1:
+            recommendations.append("Увеличьте норму сбережений до 20% от дохода")
+        elif savings_rate < 0.2:
+            recommendations.append("Хорошая норма сбережений, стремитесь к 20%")
+        else:
+            recommendations.append("Отличная норма сбережений! Рассмотрите инвестиции")
+        
+        if zakat is None:
+            recommendations.append("Выделяйте 2.5% от сбережений на закят")
+        elif zakat["zakat_due"] > 0:
+            recommendations.append(f"Хауль завершен: выделите {zakat['zakat_due']:,.0f} ₸ на закят")
+        elif zakat["above_nisab"] and zakat["hawl_due_date"]:
+            recommendations.append(f"Закят станет обязательным {zakat['hawl_due_date']:%d.%m.%Y}, если накопления останутся выше нисаба")
+        else:
+            recommendations.append(f"Накопления ниже нисаба ({zakat['nisab']:,.0f} ₸) — закят пока не обязателен, рассмотрите садаку")
+        recommendations.append("Рассмотрите исламские инвестиционные продукты")
+        
+        return recommendations
+
     @staticmethod
     def calculate_financial_health(monthly_income: float, monthly_expenses: float, savings: float) -> Tuple[str, int]:
         """Оценка финансового здоровья"""
         savings_rate = savings / monthly_income if monthly_income > 0 else 0
         
-        if savings_rate >= 0.2:
-            health = "excellent"
-            score = 90
-        elif savings_rate >= 0.15:
-            health = "good"
-            score = 75
-        elif savings_rate >= 0.1:
-            health = "fair"
-            score = 60
-        elif savings_rate >= 0:
-            health = "needs_improvement"
-            score = 40
-        else:
-            health = "critical"
-            score = 20
+        for min_rate, health, score in IslamicFinancialCalculator.FINANCIAL_HEALTH_LEVELS:
+            if savings_rate >= min_rate:
+                return health, score
             
+        return "critical", 20
+
+    @staticmethod
+    def calculate_financial_health_batch(
+        monthly_incomes: Sequence[float],
+        monthly_expenses: Sequence[float],
+        savings: Sequence[float]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Векторная оценка финансового здоровья: (уровни, баллы)"""
+        incomes = np.asarray(monthly_incomes, dtype=np.float64)
+        savings = np.asarray(savings, dtype=np.float64)
+        has_income = incomes > 0
+        savings_rate = np.where(has_income, savings / np.where(has_income, incomes, 1), 0)
+
+        levels = IslamicFinancialCalculator.FINANCIAL_HEALTH_LEVELS
+        conditions = [savings_rate >= min_rate for min_rate, _, _ in levels]
+        health = np.select(conditions, [label for _, label, _ in levels], default="critical")
+        score = np.select(conditions, [level_score for _, _, level_score in levels], default=20)
         return health, score
 
     @staticmethod
@@ -153,35 +453,6 @@ class IslamicFinancialCalculator:
     @staticmethod
     def optimize_savings_plan(goals: List[Dict], available_savings: float) -> Dict[str, Any]:
         """Оптимизация плана сбережений для нескольких целей"""
-        total_required = sum(goal['monthly_saving'] for goal in goals)
-        
-        if available_savings >= total_required:
-            # Can afford all goals
-            return {
-                'feasible': True,
-                'allocations': {goal['goal_name']: goal['monthly_saving'] for goal in goals},
-                'remaining_savings': available_savings - total_required
-            }
-        else:
-            # Need to prioritize
-            prioritized_goals = sorted(goals, key=lambda x: x.get('priority', 'medium'), reverse=True)
-            allocations = {}
-            remaining_budget = available_savings
-            
-            for goal in prioritized_goals:
-                if remaining_budget >= goal['monthly_saving']:
-                    allocations[goal['goal_name']] = goal['monthly_saving']
-                    remaining_budget -= goal['monthly_saving']
-                else:
-                    allocations[goal['goal_name']] = remaining_budget
-                    remaining_budget = 0
-                    break
-            
-            return {
-                'feasible': False,
-                'allocations': allocations,
-                'remaining_savings': remaining_budget,
-                'advice': 'Рассмотрите увеличение сбережений или корректировку целей'
-            }
+        return savings_allocator.allocate(goals, available_savings)
 
 financial_calculator = IslamicFinancialCalculator()
\ No newline at end of file
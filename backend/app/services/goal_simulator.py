@@ -0,0 +1,137 @@
+from typing import Dict, List, Any, Optional, Sequence
+import numpy as np
+
+from ..core.config import settings
+
+
+class GoalMonteCarloSimulator:
+    """Монте-Карло симуляция достижения целей при переменной доходности (Мудараба) и шоках дохода"""
+
+    # Параметры распределений, которые клиент может переопределить в запросе
+    OVERRIDABLE = (
+        "n_paths", "profit_rate_mean", "profit_rate_std",
+        "income_shock_probability", "income_shock_severity", "contribution_std"
+    )
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        self.config = {**settings.MONTE_CARLO, **(config or {})}
+
+    def _params(self, overrides: Optional[Dict[str, Any]], n_goals: int, horizon: int) -> Dict[str, Any]:
+        """Параметры симуляции; лимиты (max_paths, max_cells) берутся только из конфигурации"""
+        overrides = overrides or {}
+        unknown = set(overrides) - set(self.OVERRIDABLE)
+        if unknown:
+            raise ValueError(f"Unsupported simulation parameters: {', '.join(sorted(unknown))}")
+        params = {**self.config, **{key: float(value) for key, value in overrides.items()}}
+
+        # Объем массивов (цели × пути × месяцы) ограничен max_cells
+        max_paths = min(self.config["max_paths"], self.config["max_cells"] // max(n_goals * horizon, 1))
+        params["n_paths"] = int(min(max(params["n_paths"], 1), max(max_paths, 1)))
+        return params
+
+    def simulate_goals(
+        self,
+        target_amounts: Sequence[float],
+        current_amounts: Sequence[float],
+        monthly_contributions: Sequence[float],
+        timeline_months: Sequence[int],
+        overrides: Optional[Dict[str, Any]] = None,
+        seed: Optional[int] = None
+    ) -> Dict[str, np.ndarray]:
+        """Векторная симуляция всех целей пользователя за один проход
+
+        Доходность и шоки дохода общие для всех целей одного пути, так как
+        взносы идут из одного бюджета. Возвращает массивы по целям.
+        """
+        rng = np.random.default_rng(seed)
+
+        target = np.asarray(target_amounts, dtype=np.float64)
+        current = np.asarray(current_amounts, dtype=np.float64)
+        contribution = np.maximum(np.asarray(monthly_contributions, dtype=np.float64), 0)
+        months = np.clip(np.asarray(timeline_months, dtype=np.int64), 1, self.config["max_timeline_months"])
+
+        horizon = int(months.max()) if months.size else 1
+        params = self._params(overrides, months.size, horizon)
+        n_paths = params["n_paths"]
+
+        # Ежемесячная доходность по каждому пути: (paths, months)
+        monthly_rate = rng.normal(
+            params["profit_rate_mean"] / 12,
+            params["profit_rate_std"] / np.sqrt(12),
+            size=(n_paths, horizon)
+        )
+        growth = np.cumprod(1 + np.maximum(monthly_rate, -0.99), axis=1)
+
+        # Множитель взноса: шум и редкие шоки дохода
+        contribution_factor = np.maximum(rng.normal(1, params["contribution_std"], size=(n_paths, horizon)), 0)
+        shocks = rng.random((n_paths, horizon)) < params["income_shock_probability"]
+        contribution_factor[shocks] *= 1 - params["income_shock_severity"]
+
+        # B_t = G_t * (B_0 + Σ_{s<=t} c_s / G_s): (goals, paths, months)
+        discounted_factor = np.cumsum(contribution_factor / growth, axis=1)
+        balances = growth[None, :, :] * (
+            current[:, None, None] + contribution[:, None, None] * discounted_factor[None, :, :]
+        )
+
+        within_deadline = np.arange(horizon)[None, None, :] < months[:, None, None]
+        reached = (balances >= target[:, None, None]) & within_deadline
+        reached_any = reached.any(axis=2)
+        first_hit_month = np.where(reached_any, reached.argmax(axis=2) + 1, -1)
+
+        final_balances = np.take_along_axis(
+            balances, np.broadcast_to((months - 1)[:, None, None], (months.size, n_paths, 1)), axis=2
+        )[:, :, 0]
+
+        return {
+            "probability": reached_any.mean(axis=1),
+            "final_balance_p10": np.percentile(final_balances, 10, axis=1),
+            "final_balance_p50": np.percentile(final_balances, 50, axis=1),
+            "final_balance_p90": np.percentile(final_balances, 90, axis=1),
+            "expected_shortfall": np.maximum(target[:, None] - final_balances, 0).mean(axis=1),
+            "median_months_to_goal": np.array([
+                float(np.median(hits[hits > 0])) if (hits > 0).any() else np.nan
+                for hits in first_hit_month
+            ])
+        }
+
+    def simulate(
+        self,
+        goals: List[Dict[str, Any]],
+        monthly_contributions: Sequence[float],
+        overrides: Optional[Dict[str, Any]] = None,
+        seed: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Вероятность достижения каждой цели к сроку для списка целей (словарей)"""
+        if not goals:
+            return []
+
+        results = self.simulate_goals(
+            [goal["target_amount"] for goal in goals],
+            [goal.get("current_amount", 0) or 0 for goal in goals],
+            monthly_contributions,
+            [goal["timeline_months"] for goal in goals],
+            overrides=overrides,
+            seed=seed
+        )
+
+        return [
+            {
+                "goal_name": goal.get("goal_name"),
+                "target_amount": goal["target_amount"],
+                "monthly_contribution": float(monthly_contributions[i]),
+                "timeline_months": goal["timeline_months"],
+                "probability": float(results["probability"][i]),
+                "final_balance_percentiles": {
+                    "p10": float(results["final_balance_p10"][i]),
+                    "p50": float(results["final_balance_p50"][i]),
+                    "p90": float(results["final_balance_p90"][i])
+                },
+                "expected_shortfall": float(results["expected_shortfall"][i]),
+                "median_months_to_goal": None if np.isnan(results["median_months_to_goal"][i])
+                else float(results["median_months_to_goal"][i])
+            }
+            for i, goal in enumerate(goals)
+        ]
+
+
+goal_simulator = GoalMonteCarloSimulator()
@@ -0,0 +1,32 @@
+import base64
+import json
+from typing import Any, Dict, Iterable, Iterator, List
+
+from fastapi.encoders import jsonable_encoder
+
+
+def encode_cursor(*values: Any) -> str:
+    """Кодирование ключа последней записи страницы в непрозрачный курсор"""
+    raw = json.dumps(list(values), default=str, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> List[Any]:
+    """Декодирование курсора; ValueError при некорректном значении"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8"))
+    except (ValueError, UnicodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    if not isinstance(values, list):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return values
+
+
+def iter_ndjson(rows: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    """Построчная сериализация записей в NDJSON для потоковой выгрузки
+
+    Значения кодируются так же, как в JSON-ответах роутеров (даты в ISO 8601).
+    """
+    for row in rows:
+        yield (json.dumps(jsonable_encoder(row), ensure_ascii=False) + "\n").encode("utf-8")
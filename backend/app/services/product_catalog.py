@@ -0,0 +1,90 @@
+from typing import Dict, List, Any, Optional, Iterable, Set
+
+from .product_search import ProductSearchIndex
+
+
+class ProductCatalog:
+    """Индексированный каталог продуктов, строится один раз при загрузке
+
+    Хранит словарь по id, инвертированные индексы по типу, уровню риска,
+    принципам шариата и условиям доступности, а также готовые фасеты.
+    """
+
+    INDEXED_FIELDS = {
+        "type": "type",
+        "risk_level": "risk_level",
+        "principle": "sharia_principles",
+        "eligibility": "eligibility"
+    }
+
+    def __init__(self, products: Iterable[Dict[str, Any]], version: Optional[str] = None):
+        self.products: List[Dict[str, Any]] = list(products)
+        self.version = version
+        self.by_id: Dict[int, Dict[str, Any]] = {product["id"]: product for product in self.products}
+        self._position: Dict[int, int] = {product["id"]: i for i, product in enumerate(self.products)}
+
+        self._indexes: Dict[str, Dict[str, Set[int]]] = {name: {} for name in self.INDEXED_FIELDS}
+        for product in self.products:
+            for name, field in self.INDEXED_FIELDS.items():
+                values = product.get(field)
+                if values is None:
+                    continue
+                for value in values if isinstance(values, list) else [values]:
+                    self._indexes[name].setdefault(value, set()).add(product["id"])
+
+        # Фасеты
+        self.types: List[str] = list(self._indexes["type"])
+        self.type_counts: Dict[str, int] = {value: len(ids) for value, ids in self._indexes["type"].items()}
+        self.risk_levels: List[str] = list(self._indexes["risk_level"])
+        self.principles: List[str] = list(self._indexes["principle"])
+        self.eligibility: List[str] = list(self._indexes["eligibility"])
+
+        # Полнотекстовый индекс строится вместе с каталогом (один раз на версию)
+        self.search_index = ProductSearchIndex(self.products)
+
+    def __len__(self) -> int:
+        return len(self.products)
+
+    def get(self, product_id: int) -> Optional[Dict[str, Any]]:
+        """Продукт по id за O(1)"""
+        return self.by_id.get(product_id)
+
+    def ids_for(self, index: str, value: str) -> Set[int]:
+        """Id продуктов с данным значением индексированного поля"""
+        return self._indexes[index].get(value, set())
+
+    def filter(self, **criteria: Optional[str]) -> List[Dict[str, Any]]:
+        """Фильтрация пересечением инвертированных индексов (type, risk_level, principle, eligibility)"""
+        posting_lists = [
+            self.ids_for(index, value)
+            for index, value in criteria.items()
+            if value is not None
+        ]
+        if not posting_lists:
+            return self.products
+
+        posting_lists.sort(key=len)
+        matched = set(posting_lists[0])
+        for ids in posting_lists[1:]:
+            matched &= ids
+            if not matched:
+                return []
+
+        return self.in_catalog_order(matched)
+
+    def search(
+        self,
+        query: str,
+        limit: Optional[int] = None,
+        prefix: bool = True,
+        candidates: Optional[Iterable[Dict[str, Any]]] = None
+    ) -> List[Dict[str, Any]]:
+        """Продукты по убыванию релевантности BM25, опционально в пределах уже отфильтрованных"""
+        candidate_ids = None if candidates is None else {product["id"] for product in candidates}
+        ranked = self.search_index.search(query, limit=limit, prefix=prefix, candidate_ids=candidate_ids)
+        return [self.by_id[product_id] for product_id, _ in ranked]
+
+    def in_catalog_order(self, product_ids: Iterable[int]) -> List[Dict[str, Any]]:
+        """Продукты по id в исходном порядке каталога"""
+        positions = sorted(self._position[product_id] for product_id in product_ids if product_id in self._position)
+        return [self.products[position] for position in positions]
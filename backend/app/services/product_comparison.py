@@ -0,0 +1,121 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Sequence, Tuple
+import numpy as np
+
+from ..core.config import settings
+from .amortization import amortization_engine
+from .product_catalog import ProductCatalog
+
+ATTRIBUTE_FIELDS = (
+    "type", "risk_level", "min_amount", "max_amount", "timeline",
+    "profit_rate", "monthly_payment", "sharia_principles", "eligibility"
+)
+
+
+class ProductComparator:
+    """Сравнительная матрица продуктов с расчетными условиями
+
+    Строки матрицы выровнены по сравниваемым продуктам; платежи, полная
+    стоимость и ожидаемая доля прибыли считаются для всех продуктов одним
+    векторным расчетом. Результаты кэшируются (LRU) по набору продуктов,
+    сумме и сроку для одной загрузки каталога: при смене объекта каталога
+    (горячая перезагрузка, даже с той же строкой version) кэш сбрасывается.
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        config = {**settings.BANK_PRODUCTS, **(config or {})}
+        self.expected_profit_rates: Dict[str, float] = config["expected_profit_rates"]
+        self.cache_size = config["comparison_cache_size"]
+        self._cache: "OrderedDict[Tuple, Dict[str, Any]]" = OrderedDict()
+        self._cache_catalog: Optional[ProductCatalog] = None  # загрузка каталога, к которой относится кэш
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _rounded(values: np.ndarray) -> List[Optional[float]]:
+        """Округление с заменой NaN (неприменимо) на None"""
+        return [None if np.isnan(value) else round(float(value), 2) for value in values]
+
+    def _computed_terms(self, products: List[Dict[str, Any]], amount: float, term_months: int) -> Dict[str, List[Any]]:
+        contracts = [amortization_engine.contract_type(product) for product in products]
+        financing = amortization_engine.contract_terms(contracts, amount, term_months)
+
+        profit_rate = np.array(
+            [self.expected_profit_rates.get(product["type"], np.nan) for product in products], dtype=np.float64
+        )
+        expected_profit = amount * profit_rate * term_months / 12
+
+        min_amount = np.array([product.get("min_amount") or 0 for product in products], dtype=np.float64)
+        max_amount = np.array([product.get("max_amount") or np.inf for product in products], dtype=np.float64)
+
+        return {
+            "contract_type": contracts,
+            "monthly_payment": self._rounded(financing["monthly_payment"]),
+            "total_cost": self._rounded(financing["total_cost"]),
+            "total_markup": self._rounded(financing["total_cost"] - amount),
+            "expected_profit_rate": [None if np.isnan(rate) else float(rate) for rate in profit_rate],
+            "expected_profit": self._rounded(expected_profit),
+            "total_return": self._rounded(amount + expected_profit),
+            "within_amount_limits": ((amount >= min_amount) & (amount <= max_amount)).tolist()
+        }
+
+    def _build(
+        self,
+        catalog: ProductCatalog,
+        product_ids: Tuple[int, ...],
+        amount: Optional[float],
+        term_months: Optional[int]
+    ) -> Optional[Dict[str, Any]]:
+        products = [catalog.get(product_id) for product_id in product_ids]
+        products = [product for product in products if product is not None]
+        if not products:
+            return None
+
+        all_features = list(dict.fromkeys(feature for product in products for feature in product["features"]))
+        feature_sets = [set(product["features"]) for product in products]
+
+        comparison = {
+            "product_ids": [product["id"] for product in products],
+            "product_names": [product["name"] for product in products],
+            "attributes": {field: [product.get(field) for product in products] for field in ATTRIBUTE_FIELDS},
+            "features": {feature: [feature in features for features in feature_sets] for feature in all_features},
+            "amount": amount,
+            "timeline_months": term_months,
+            "catalog_version": catalog.version,
+            "compared_products": products
+        }
+        if amount and term_months:
+            comparison["terms"] = self._computed_terms(products, amount, term_months)
+        return comparison
+
+    def compare(
+        self,
+        catalog: ProductCatalog,
+        product_ids: Sequence[int],
+        amount: Optional[float] = None,
+        term_months: Optional[int] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Сравнение продуктов (None, если ни один не найден)"""
+        if amount is not None and amount <= 0 or term_months is not None and term_months <= 0:
+            raise ValueError("Amount and timeline must be positive")
+
+        key = (tuple(dict.fromkeys(product_ids)), amount, term_months)
+        with self._lock:
+            if catalog is not self._cache_catalog:
+                self._cache.clear()
+                self._cache_catalog = catalog
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+        comparison = self._build(catalog, key[0], amount, term_months)
+        with self._lock:
+            # Каталог мог смениться, пока шел расчет: результат по старому не кэшируется
+            if catalog is self._cache_catalog:
+                self._cache[key] = comparison
+                if len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return comparison
+
+
+product_comparator = ProductComparator()
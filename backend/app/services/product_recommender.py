@@ -0,0 +1,119 @@
+from functools import lru_cache
+from typing import Dict, List, Any, Optional, Sequence
+import numpy as np
+
+from .product_catalog import ProductCatalog
+
+
+class ProductRecommender:
+    """Векторный скоринг продуктов по целям, риск-профилю и доходу
+
+    Для каждой уникальной цели один раз строится строка очков по всем продуктам
+    (кэш), риск-профили заранее развернуты в маски, поэтому оценка пользователя
+    сводится к сумме нескольких строк, а выбор лучших — к argpartition.
+    """
+
+    GOAL_MATCH_SCORE = 2
+    RISK_MATCH_SCORE = 1
+    FINANCING_INCOME_SCORE = 1
+    FINANCING_INCOME_THRESHOLD = 300000
+
+    RISK_MAPPING = {
+        "conservative": ["low"],
+        "moderate": ["low", "medium"],
+        "aggressive": ["low", "medium", "high"]
+    }
+
+    GOAL_CACHE_SIZE = 4096
+
+    def __init__(self, catalog: ProductCatalog):
+        self.catalog = catalog
+        self.products = catalog.products
+        self._recommended_for = [
+            [rec.lower() for rec in product["recommended_for"]] for product in self.products
+        ]
+
+        risk_levels = np.array([product["risk_level"] for product in self.products])
+        self.risk_masks: Dict[str, np.ndarray] = {
+            profile: np.isin(risk_levels, levels).astype(np.int64) * self.RISK_MATCH_SCORE
+            for profile, levels in self.RISK_MAPPING.items()
+        }
+        self._no_risk_match = np.zeros(len(self.products), dtype=np.int64)
+        self.financing_mask = np.array(
+            [product["type"] == "financing" for product in self.products], dtype=np.int64
+        ) * self.FINANCING_INCOME_SCORE
+
+        self._goal_row = lru_cache(maxsize=self.GOAL_CACHE_SIZE)(self._build_goal_row)
+
+    def _build_goal_row(self, goal: str) -> np.ndarray:
+        """Очки цели по всем продуктам (подстрока в любом из recommended_for)"""
+        row = np.array(
+            [any(goal in rec for rec in recs) for recs in self._recommended_for], dtype=np.int64
+        ) * self.GOAL_MATCH_SCORE
+        row.flags.writeable = False
+        return row
+
+    def score(self, user_goals: Sequence[str], risk_profile: str, monthly_income: Optional[int] = None) -> np.ndarray:
+        """Вектор очков по всем продуктам каталога"""
+        scores = self.risk_masks.get(risk_profile, self._no_risk_match).copy()
+        for goal in user_goals:
+            scores += self._goal_row(goal.lower())
+        if monthly_income and monthly_income > self.FINANCING_INCOME_THRESHOLD:
+            scores += self.financing_mask
+        return scores
+
+    def score_batch(self, requests: Sequence[Dict[str, Any]]) -> np.ndarray:
+        """Матрица очков пользователи × продукты"""
+        scores = np.empty((len(requests), len(self.products)), dtype=np.int64)
+        for i, request in enumerate(requests):
+            scores[i] = self.score(request["user_goals"], request["risk_profile"], request.get("monthly_income"))
+        return scores
+
+    @staticmethod
+    def top_indices(scores: np.ndarray, k: Optional[int]) -> np.ndarray:
+        """Индексы лучших продуктов по строкам; при равенстве — порядок каталога
+
+        argpartition неустойчив: при равных очках на границе top-k он выбрал бы
+        произвольный продукт. Поэтому отбор идет по уникальному ключу
+        «очко, затем более ранняя позиция в каталоге».
+        """
+        n_products = scores.shape[-1]
+        k = n_products if k is None else min(k, n_products)
+        keys = scores * n_products + np.arange(n_products - 1, -1, -1)
+        if k < n_products:
+            candidates = np.argpartition(-keys, k - 1, axis=-1)[..., :k]
+        else:
+            candidates = np.broadcast_to(np.arange(n_products), scores.shape)
+        order = np.argsort(-np.take_along_axis(keys, candidates, axis=-1), axis=-1)
+        return np.take_along_axis(candidates, order, axis=-1)
+
+    def recommend(
+        self,
+        user_goals: Sequence[str],
+        risk_profile: str,
+        monthly_income: Optional[int] = None,
+        top_k: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Продукты с положительным очком по убыванию match_score"""
+        scores = self.score(user_goals, risk_profile, monthly_income)
+        return [
+            {**self.products[j], "match_score": int(scores[j])}
+            for j in self.top_indices(scores, top_k)
+            if scores[j] > 0
+        ]
+
+    def recommend_batch(self, requests: Sequence[Dict[str, Any]], top_k: int) -> List[List[Dict[str, Any]]]:
+        """Top-k для многих пользователей за один проход (для кампаний)"""
+        if not requests:
+            return []
+        scores = self.score_batch(requests)
+        top = self.top_indices(scores, top_k)
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        return [
+            [
+                {"product_id": self.products[j]["id"], "name": self.products[j]["name"], "match_score": int(score)}
+                for j, score in zip(row, row_scores)
+                if score > 0
+            ]
+            for row, row_scores in zip(top.tolist(), top_scores.tolist())
+        ]
@@ -0,0 +1,221 @@
+import hashlib
+import json
+import logging
+import threading
+from typing import Dict, List, Any, Optional, Sequence, Tuple
+import numpy as np
+import requests
+
+from ..core.config import settings
+from .catalog_store import catalog_store
+from .product_search import normalize, stem
+
+try:
+    import chromadb
+except ImportError:  # chromadb не установлен: поиск соседей на numpy
+    chromadb = None
+
+logger = logging.getLogger(__name__)
+
+
+class HashingEmbedder:
+    """Детерминированные эмбеддинги без сети: хэширование стемов и их триграмм
+
+    Устойчивы между процессами (blake2b вместо встроенного hash), поэтому
+    векторы, сохраненные в chromadb, совпадают с векторами запросов.
+    """
+
+    name = "hashing"
+
+    STEM_WEIGHT = 1.0
+    TRIGRAM_WEIGHT = 0.2  # триграммы сглаживают опечатки и неотсеченные окончания
+    MIN_TOKEN_LENGTH = 3  # предлоги и союзы не несут смысла
+
+    def __init__(self, dimensions: int):
+        self.dimensions = dimensions
+
+    def _features(self, text: str) -> Dict[str, float]:
+        features: Dict[str, float] = {}
+        for token in normalize(text):
+            if len(token) < self.MIN_TOKEN_LENGTH:
+                continue
+            term = stem(token)
+            features[term] = features.get(term, 0.0) + self.STEM_WEIGHT
+            padded = f"#{term}#"
+            for i in range(len(padded) - 2):
+                trigram = "~" + padded[i:i + 3]
+                features[trigram] = features.get(trigram, 0.0) + self.TRIGRAM_WEIGHT
+        return features
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature, weight in self._features(text).items():
+                digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+                value = int.from_bytes(digest, "little")
+                sign = 1.0 if value & 1 else -1.0
+                # Сублинейный вес: повторы слова в описании не доминируют
+                vectors[row, (value >> 1) % self.dimensions] += sign * np.log1p(weight)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+
+class ApiEmbedder:
+    """Эмбеддинги через OpenAI-совместимый API (модель AI_MODELS['embedding'])"""
+
+    name = "api"
+
+    def __init__(self, base_url: str, api_key: str, model: str):
+        self.base_url = base_url
+        self.api_key = api_key
+        self.model = model
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        response = requests.post(
+            f"{self.base_url}/v1/embeddings",
+            headers={"Authorization": f"Bearer {self.api_key}"},
+            json={"model": self.model, "input": list(texts)},
+            timeout=settings.AI_TIMEOUT
+        )
+        response.raise_for_status()
+        data = sorted(response.json()["data"], key=lambda item: item["index"])
+        vectors = np.asarray([item["embedding"] for item in data], dtype=np.float32)
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+class HybridProductRetriever:
+    """Гибридный подбор продуктов: ближайшие соседи по эмбеддингам + правила
+
+    Эмбеддинги продуктов считаются один раз на версию каталога и хранятся в
+    локальной коллекции chromadb (или в матрице numpy, если chromadb нет).
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        self.config = {**settings.PRODUCT_RETRIEVAL, **(config or {})}
+        self._lock = threading.Lock()
+        self._index: Optional[Tuple[Any, Any, np.ndarray, Any]] = None
+
+    @staticmethod
+    def _catalog_version(catalog) -> str:
+        if catalog.version:
+            return str(catalog.version)
+        payload = json.dumps(catalog.products, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:12]
+
+    @staticmethod
+    def product_text(product: Dict[str, Any]) -> str:
+        """Текст продукта для эмбеддинга"""
+        return " ".join([
+            product["name"],
+            product["description"],
+            " ".join(product.get("features", [])),
+            " ".join(product.get("recommended_for", [])),
+            " ".join(product.get("sharia_principles", []))
+        ])
+
+    def _make_embedder(self, texts: List[str]):
+        """Эмбеддер и векторы каталога; при недоступности API — локальный fallback"""
+        if self.config["embedding_backend"] == "api":
+            from .ai_service import islamic_ai_service
+            embedder = ApiEmbedder(
+                islamic_ai_service.base_url, islamic_ai_service.api_key, settings.AI_MODELS["embedding"]
+            )
+            try:
+                return embedder, embedder.embed(texts)
+            except Exception as e:
+                logger.warning(f"Embedding API unavailable, using local hashing embeddings: {e}")
+        embedder = HashingEmbedder(self.config["hashing_dimensions"])
+        return embedder, embedder.embed(texts)
+
+    def _open_collection(self, name: str, ids: List[str], vectors: np.ndarray, texts: List[str]):
+        """Коллекция chromadb для версии каталога; заполняется только если еще не заполнена"""
+        client = chromadb.PersistentClient(path=self.config["chroma_path"])
+        collection = client.get_or_create_collection(name=name, metadata={"hnsw:space": "cosine"})
+        if collection.count() != len(ids):
+            collection.upsert(ids=ids, embeddings=vectors.tolist(), documents=texts)
+        return collection
+
+    def _ensure_index(self, product_catalog) -> Tuple[Any, Any, np.ndarray, Any]:
+        """Индекс под версию каталога (строится лениво, один раз): (каталог, эмбеддер, матрица, коллекция)"""
+        index = self._index
+        if index is not None and index[0] is product_catalog:
+            return index
+        with self._lock:
+            if self._index is not None and self._index[0] is product_catalog:
+                return self._index
+
+            texts = [self.product_text(product) for product in product_catalog.products]
+            embedder, vectors = self._make_embedder(texts)
+            collection = None
+            if chromadb is not None:
+                name = f"{self.config['collection_prefix']}_{embedder.name}_{self._catalog_version(product_catalog)}"
+                ids = [str(product["id"]) for product in product_catalog.products]
+                try:
+                    collection = self._open_collection(name, ids, vectors, texts)
+                except Exception as e:
+                    logger.warning(f"chromadb unavailable, using in-memory vectors: {e}")
+
+            self._index = (product_catalog, embedder, vectors, collection)
+        return self._index
+
+    @staticmethod
+    def _semantic_scores(index: Tuple[Any, Any, np.ndarray, Any], query: str) -> np.ndarray:
+        """Косинусная близость запроса к каждому продукту каталога"""
+        catalog, embedder, matrix, collection = index
+        query_vector = embedder.embed([query])[0]
+        if collection is None:
+            return np.clip(matrix @ query_vector, 0, None)
+
+        result = collection.query(
+            query_embeddings=[query_vector.tolist()],
+            n_results=len(catalog.products),
+            include=["distances"]
+        )
+        position = {product["id"]: i for i, product in enumerate(catalog.products)}
+        scores = np.zeros(len(catalog.products))
+        for product_id, distance in zip(result["ids"][0], result["distances"][0]):
+            scores[position[int(product_id)]] = max(1.0 - distance, 0.0)
+        return scores
+
+    def suggest(self, user_message: str, user_context: Dict[str, Any], top_k: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Продукты для чата: смесь семантической близости и рулового скоринга"""
+        current = catalog_store.current  # каталог и скоринг одной версии
+        catalog, product_recommender = current.catalog, current.recommender
+        index = self._ensure_index(catalog)
+        goals = [goal.get("name", "") for goal in user_context.get("goals", []) if isinstance(goal, dict)]
+        query = " ".join([user_message, *goals])
+
+        try:
+            semantic = self._semantic_scores(index, query)
+        except Exception as e:
+            logger.warning(f"Semantic product search failed, using rule score only: {e}")
+            semantic = np.zeros(len(catalog.products))
+
+        # Обе составляющие приводятся к [0, 1] относительно лучшего продукта
+        if semantic.max() > 0:
+            semantic = semantic / semantic.max()
+
+        rule = product_recommender.score(
+            goals, user_context.get("risk_profile", "moderate"), user_context.get("monthly_income")
+        ).astype(np.float64)
+        if rule.max() > 0:
+            rule /= rule.max()
+
+        scores = self.config["semantic_weight"] * semantic + self.config["rule_weight"] * rule
+        top = product_recommender.top_indices(scores, top_k or self.config["top_k"])
+
+        return [
+            {
+                "id": catalog.products[j]["id"],
+                "name": catalog.products[j]["name"],
+                "type": catalog.products[j]["type"],
+                "description": catalog.products[j]["description"],
+                "why_suitable": "Подходит для: " + ", ".join(catalog.products[j]["recommended_for"][:3]).lower(),
+                "score": round(float(scores[j]), 4)
+            }
+            for j in top
+            if scores[j] > 0
+        ]
+
+
+product_retriever = HybridProductRetriever()
@@ -0,0 +1,132 @@
+import math
+import re
+from bisect import bisect_left
+from functools import lru_cache
+from typing import Dict, List, Any, Optional, Iterable, Set, Tuple
+
+TOKEN_PATTERN = re.compile(r"[0-9a-zа-я]+")
+
+# Окончания русских слов, от длинных к коротким (облегченный стеммер)
+RUSSIAN_ENDINGS = sorted([
+    "иями", "ями", "ами", "иях", "ях", "ах", "ией", "ием", "иям", "ям", "ам",
+    "ого", "его", "ому", "ему", "ыми", "ими", "ых", "их", "ая", "яя", "ое", "ее",
+    "ой", "ей", "ий", "ый", "ым", "им", "ом", "ем", "ую", "юю", "ия", "ие", "ии", "ию",
+    "ья", "ье", "ьи", "ью", "ов", "ев", "ать", "ять", "ить", "еть", "ешь", "ет", "ют", "ут",
+    "ы", "и", "а", "я", "о", "е", "у", "ю", "ь", "й"
+], key=len, reverse=True)
+
+MIN_STEM_LENGTH = 3
+STEM_CACHE_SIZE = 65536
+
+
+def normalize(text: str) -> List[str]:
+    """Нижний регистр, ё→е и разбиение на токены"""
+    return TOKEN_PATTERN.findall(text.lower().replace("ё", "е"))
+
+
+@lru_cache(maxsize=STEM_CACHE_SIZE)
+def stem(token: str) -> str:
+    """Облегченный стемминг: отсечение самого длинного подходящего окончания
+
+    Результат кэшируется: словарь каталога мал, а токены повторяются.
+    """
+    for ending in RUSSIAN_ENDINGS:
+        if token.endswith(ending) and len(token) - len(ending) >= MIN_STEM_LENGTH:
+            return token[:-len(ending)]
+    return token
+
+
+class ProductSearchIndex:
+    """Инвертированный индекс с ранжированием BM25 по полям продукта
+
+    Строится один раз на версию каталога; запрос обходит только списки
+    вхождений своих термов.
+    """
+
+    FIELD_WEIGHTS = {
+        "name": 3.0,
+        "recommended_for": 2.0,
+        "features": 1.5,
+        "description": 1.0
+    }
+    K1 = 1.2
+    B = 0.75
+    MAX_PREFIX_EXPANSIONS = 20
+
+    def __init__(self, products: Iterable[Dict[str, Any]]):
+        self.product_ids: List[int] = []
+        self.postings: Dict[str, Dict[int, float]] = {}
+        doc_lengths: List[float] = []
+
+        for doc, product in enumerate(products):
+            self.product_ids.append(product["id"])
+            length = 0.0
+            for field, weight in self.FIELD_WEIGHTS.items():
+                value = product.get(field) or ""
+                text = " ".join(value) if isinstance(value, list) else value
+                for token in normalize(text):
+                    term_postings = self.postings.setdefault(stem(token), {})
+                    term_postings[doc] = term_postings.get(doc, 0.0) + weight
+                    length += weight
+            doc_lengths.append(length)
+
+        n_docs = len(self.product_ids)
+        average_length = (sum(doc_lengths) / n_docs) if n_docs else 1.0
+        self._length_norm = [
+            self.K1 * (1 - self.B + self.B * length / average_length) for length in doc_lengths
+        ]
+        self.idf = {
+            term: math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in self.postings.items()
+        }
+        self.vocabulary = sorted(self.postings)
+
+    def _expand_prefix(self, token: str) -> List[str]:
+        """Термы словаря, начинающиеся с префикса (для подсказок при вводе)"""
+        start = bisect_left(self.vocabulary, token)
+        expansions = []
+        for term in self.vocabulary[start:start + self.MAX_PREFIX_EXPANSIONS]:
+            if not term.startswith(token):
+                break
+            expansions.append(term)
+        return expansions
+
+    def _query_terms(self, query: str, prefix: bool) -> List[Set[str]]:
+        tokens = normalize(query)
+        terms = [{stem(token)} for token in tokens]
+        if prefix and tokens:
+            # Последний токен может быть недописан
+            terms[-1] |= set(self._expand_prefix(tokens[-1]))
+        return terms
+
+    def search(
+        self,
+        query: str,
+        limit: Optional[int] = None,
+        prefix: bool = True,
+        candidate_ids: Optional[Set[int]] = None
+    ) -> List[Tuple[int, float]]:
+        """Ранжированный поиск: [(product_id, score)] по убыванию релевантности"""
+        scores: Dict[int, float] = {}
+        for alternatives in self._query_terms(query, prefix):
+            # Для каждого слова запроса учитывается лучший из вариантов (стем или дополнение префикса)
+            best: Dict[int, float] = {}
+            for term in alternatives:
+                docs = self.postings.get(term)
+                if not docs:
+                    continue
+                idf = self.idf[term]
+                for doc, tf in docs.items():
+                    score = idf * tf * (self.K1 + 1) / (tf + self._length_norm[doc])
+                    if score > best.get(doc, 0.0):
+                        best[doc] = score
+            for doc, score in best.items():
+                scores[doc] = scores.get(doc, 0.0) + score
+
+        ranked = [
+            (self.product_ids[doc], score)
+            for doc, score in scores.items()
+            if candidate_ids is None or self.product_ids[doc] in candidate_ids
+        ]
+        ranked.sort(key=lambda item: item[1], reverse=True)
+        return ranked[:limit] if limit else ranked
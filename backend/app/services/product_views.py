@@ -0,0 +1,211 @@
+import heapq
+import json
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Tuple, Iterable
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Ключ счетчика: (product_id, риск-профиль просматривающего или None)
+ViewKey = Tuple[int, Optional[str]]
+
+
+class ProductViewTracker:
+    """Учет просмотров продуктов с ограниченной памятью
+
+    Каждый просмотр за O(1) увеличивает общий счетчик продукта, счетчик
+    текущего временного бакета и скользящие суммы окон (час, день, неделя).
+    Бакеты вращаются: при выходе бакета из окна его счетчики вычитаются из
+    суммы окна. Память ограничена: бакетов не больше периода хранения, ключей
+    не больше (продукты × риск-профили). Сырые события хранятся в кольцевом
+    буфере и пачками дописываются в NDJSON-файл (если он задан) отдельным
+    потоком записи, чтобы запрос не ждал диска.
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        config = {**settings.PRODUCT_VIEWS, **(config or {})}
+        self.bucket_seconds = config["bucket_seconds"]
+        self.retention_buckets = config["retention_buckets"]
+        self.flush_batch_size = config["flush_batch_size"]
+        self.events_file = config["events_file"]
+        self.risk_profiles = set(config["risk_profiles"])
+        self.windows: Dict[str, int] = {
+            name: min(max(seconds // self.bucket_seconds, 1), self.retention_buckets)
+            for name, seconds in config["windows"].items()
+        }
+
+        self._lock = threading.Lock()
+        self._writer: Optional[ThreadPoolExecutor] = None
+        self._last_write: Optional[Future] = None
+        self._totals: Dict[ViewKey, int] = {}
+        self._bucket_order: deque = deque()  # номера бакетов по возрастанию
+        self._buckets: Dict[int, Dict[ViewKey, int]] = {}
+        self._window_totals: Dict[str, Dict[ViewKey, int]] = {name: {} for name in self.windows}
+        self._window_start: Dict[str, int] = {name: 0 for name in self.windows}
+        self._events: deque = deque(maxlen=config["ring_buffer_size"])
+        self._pending: List[Dict[str, Any]] = []
+
+    @staticmethod
+    def _increment(counts: Dict[ViewKey, int], key: ViewKey, value: int = 1) -> None:
+        remaining = counts.get(key, 0) + value
+        if remaining:
+            counts[key] = remaining
+        else:
+            counts.pop(key, None)
+
+    def _advance(self, current: int) -> None:
+        """Вычитание вышедших из окон бакетов и вытеснение бакетов за пределами хранения
+
+        Окно может совпадать с периодом хранения, поэтому бакет вычитается из
+        сумм окон до того, как он вытеснен.
+        """
+        if not self._bucket_order or self._bucket_order[-1] < current:
+            self._bucket_order.append(current)
+            self._buckets[current] = {}
+
+        for name, size in self.windows.items():
+            start = current - size + 1
+            old_start = self._window_start[name]
+            if start <= old_start:
+                continue
+            totals = self._window_totals[name]
+            if start - old_start >= size:
+                # Окно целиком сдвинулось (долгий простой): в нем нет старых бакетов
+                totals.clear()
+            else:
+                for index in range(old_start, start):
+                    for key, count in self._buckets.get(index, {}).items():
+                        self._increment(totals, key, -count)
+            self._window_start[name] = start
+
+        while self._bucket_order[0] <= current - self.retention_buckets:
+            del self._buckets[self._bucket_order.popleft()]
+
+    def record(
+        self,
+        product_id: int,
+        user_id: Optional[int] = None,
+        risk_profile: Optional[str] = None,
+        timestamp: Optional[float] = None
+    ) -> None:
+        """Учесть просмотр продукта"""
+        now = time.time()
+        timestamp = now if timestamp is None else timestamp
+        if risk_profile not in self.risk_profiles:
+            risk_profile = None  # неизвестные значения не раздувают множество ключей
+        key = (product_id, risk_profile)
+        event = {"product_id": product_id, "user_id": user_id, "risk_profile": risk_profile, "viewed_at": timestamp}
+
+        with self._lock:
+            self._advance(int(max(now, timestamp) // self.bucket_seconds))
+            self._increment(self._totals, key)
+
+            bucket = int(timestamp // self.bucket_seconds)
+            counts = self._buckets.get(bucket)
+            if counts is None and bucket > self._bucket_order[0]:
+                # Событие с опозданием в бакет, где еще не было просмотров
+                counts = self._buckets[bucket] = {}
+                self._bucket_order = deque(sorted([*self._bucket_order, bucket]))
+            if counts is not None:
+                self._increment(counts, key)
+                for name in self.windows:
+                    if bucket >= self._window_start[name]:
+                        self._increment(self._window_totals[name], key)
+
+            self._events.append(event)
+            if self.events_file:
+                self._pending.append(event)
+                if len(self._pending) >= self.flush_batch_size:
+                    self._submit_pending()
+
+    def _submit_pending(self) -> None:
+        """Передать накопленную пачку потоку записи (вызывается под self._lock)
+
+        Один поток записи выполняет пачки в порядке передачи, а передача идет под
+        той же блокировкой, что и добавление событий, поэтому порядок строк в
+        файле совпадает с порядком событий.
+        """
+        if self._writer is None:
+            self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="product-views-writer")
+        batch, self._pending = self._pending, []
+        self._last_write = self._writer.submit(self._write_batch, batch)
+
+    def _write_batch(self, batch: List[Dict[str, Any]]) -> None:
+        lines = "".join(json.dumps(event) + "\n" for event in batch)
+        try:
+            with open(self.events_file, "a", encoding="utf-8") as f:
+                f.write(lines)
+        except OSError as e:
+            logger.error(f"Failed to write product view events: {e}")
+
+    def flush(self) -> None:
+        """Дописать накопленные события в файл и дождаться записи (например, при остановке сервера)"""
+        with self._lock:
+            if self._pending:
+                self._submit_pending()
+            last_write = self._last_write
+        if last_write is not None:
+            last_write.result()
+
+    def view_count(self, product_id: int) -> int:
+        with self._lock:
+            return sum(count for (pid, _), count in self._totals.items() if pid == product_id)
+
+    def popular(
+        self,
+        limit: int,
+        window: str = "all",
+        risk_profile: Optional[str] = None,
+        product_ids: Optional[Iterable[int]] = None
+    ) -> List[Tuple[int, int]]:
+        """Самые просматриваемые продукты за окно и в сегменте: [(product_id, count)]"""
+        if window != "all" and window not in self.windows:
+            raise ValueError(f"Unknown window: {window}")
+        allowed = None if product_ids is None else set(product_ids)
+
+        with self._lock:
+            if window == "all":
+                source = self._totals
+            else:
+                self._advance(int(time.time() // self.bucket_seconds))
+                source = self._window_totals[window]
+
+            counts: Dict[int, int] = {}
+            for (pid, profile), count in source.items():
+                if risk_profile is not None and profile != risk_profile:
+                    continue
+                if allowed is not None and pid not in allowed:
+                    continue
+                counts[pid] = counts.get(pid, 0) + count
+
+        return heapq.nlargest(limit, counts.items(), key=lambda item: item[1])
+
+    def time_buckets(self, product_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Агрегаты по временным бакетам (за период хранения)"""
+        with self._lock:
+            buckets = [(index, dict(self._buckets[index])) for index in self._bucket_order]
+        return [
+            {
+                "bucket_start": datetime.fromtimestamp(index * self.bucket_seconds),
+                "views": sum(
+                    count for (pid, _), count in counts.items()
+                    if product_id is None or pid == product_id
+                )
+            }
+            for index, counts in buckets
+        ]
+
+    def recent_events(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """Последние сырые события из кольцевого буфера"""
+        with self._lock:
+            events = list(self._events)[-limit:]
+        return [{**event, "viewed_at": datetime.fromtimestamp(event["viewed_at"])} for event in events]
+
+
+product_view_tracker = ProductViewTracker()
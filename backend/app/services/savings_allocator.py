@@ -0,0 +1,163 @@
+from typing import Dict, List, Any, Sequence, Tuple
+import numpy as np
+
+
+class SavingsAllocator:
+    """Распределение ежемесячных сбережений между целями
+
+    Цели обслуживаются по уровням исламской важности (фард раньше мубах): сначала
+    минимальные взносы, затем остаток требуемых сумм. Внутри уровня бюджет делится
+    взвешенным water-filling: вес = вес приоритета / срок в месяцах, так что более
+    важные и более срочные цели получают большую долю, но не больше требуемого.
+    """
+
+    PRIORITY_WEIGHTS = {"high": 3.0, "medium": 2.0, "low": 1.0}
+
+    ISLAMIC_IMPORTANCE_RANK = {"fard": 0, "sunnah": 1, "mustahabb": 2, "mubah": 3}
+
+    @staticmethod
+    def _row_totals(values: np.ndarray) -> np.ndarray:
+        """Суммы по строкам последовательным сложением: пустые ячейки не меняют результат"""
+        if values.shape[1] == 0:
+            return np.zeros(values.shape[0])
+        return np.cumsum(values, axis=1)[:, -1]
+
+    @classmethod
+    def _water_fill(cls, demand: np.ndarray, weight: np.ndarray, budget: np.ndarray) -> np.ndarray:
+        """Взвешенный water-filling по строкам: x_i = min(d_i, λ·w_i), где Σx_i = budget строки
+
+        Ячейки с нулевым весом не участвуют в распределении. Сортировка нужна
+        только строкам, где бюджета меньше потребности.
+        """
+        funded = np.where((budget > 0)[:, None], demand, 0.0)
+        short = (budget > 0) & (cls._row_totals(demand) > budget)
+        if not short.any():
+            return funded
+
+        demand, weight, budget = demand[short], weight[short], budget[short]
+        rows = np.arange(demand.shape[0])[:, None]
+        active = weight > 0
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratio = np.where(active, demand / np.where(active, weight, 1.0), np.inf)
+            order = np.argsort(ratio, axis=1, kind="stable")
+            sorted_demand = demand[rows, order]
+            sorted_weight = weight[rows, order]
+
+            # Уровень λ при условии, что первые k целей (с наименьшим d/w) полностью профинансированы
+            saturated_demand = np.concatenate(
+                (np.zeros((demand.shape[0], 1)), np.cumsum(sorted_demand, axis=1)[:, :-1]), axis=1
+            )
+            remaining_weight = np.cumsum(sorted_weight[:, ::-1], axis=1)[:, ::-1]
+            levels = (budget[:, None] - saturated_demand) / remaining_weight
+
+            k = np.argmax(levels < ratio[rows, order], axis=1)
+            level = levels[rows[:, 0], k]
+        funded[short] = np.minimum(demand, level[:, None] * weight)
+        return funded
+
+    def _goal_arrays(self, goals: List[Dict[str, Any]]) -> Tuple[np.ndarray, ...]:
+        """Требуемые суммы, минимальные взносы, веса и уровни важности целей"""
+        timeline = np.array([goal.get("timeline_months", 0) or 0 for goal in goals], dtype=np.float64)
+
+        demand = np.array([
+            goal["monthly_saving"] if goal.get("monthly_saving") is not None
+            else (goal["target_amount"] - (goal.get("current_amount", 0) or 0)) / (months if months > 0 else 1)
+            for goal, months in zip(goals, timeline)
+        ], dtype=np.float64)
+        demand = np.maximum(demand, 0)
+
+        minimum = np.array([goal.get("min_contribution", 0) or 0 for goal in goals], dtype=np.float64)
+        minimum = np.clip(minimum, 0, demand)
+
+        priority_weight = np.array([
+            self.PRIORITY_WEIGHTS.get(goal.get("priority") or "medium", self.PRIORITY_WEIGHTS["medium"])
+            for goal in goals
+        ], dtype=np.float64)
+        weight = priority_weight / np.maximum(timeline, 1)
+
+        tier = np.array([
+            self.ISLAMIC_IMPORTANCE_RANK.get(goal.get("islamic_importance") or "mubah", self.ISLAMIC_IMPORTANCE_RANK["mubah"])
+            for goal in goals
+        ], dtype=np.int64)
+
+        return demand, minimum, weight, tier
+
+    def allocate(self, goals: List[Dict[str, Any]], available_savings: float) -> Dict[str, Any]:
+        """Оптимальное распределение доступных сбережений между целями пользователя"""
+        return self.allocate_batch([(goals, available_savings)])[0]
+
+    def allocate_batch(self, problems: Sequence[Tuple[List[Dict[str, Any]], float]]) -> List[Dict[str, Any]]:
+        """Пакетное распределение для множества пользователей: [(цели, доступные сбережения), ...]
+
+        Цели всех задач раскладываются в матрицу задача × цель (пустые ячейки с
+        нулевым весом), и каждый шаг water-filling выполняется сразу для всех задач.
+        """
+        problems = list(problems)
+        sizes = [len(goals) for goals, _ in problems]
+        shape = (len(problems), max(sizes, default=0))
+
+        demand = np.zeros(shape)
+        minimum = np.zeros(shape)
+        weight = np.zeros(shape)
+        tier = np.full(shape, -1, dtype=np.int64)
+        flat_goals = [goal for goals, _ in problems for goal in goals]
+        if flat_goals:
+            rows = np.repeat(np.arange(len(problems)), sizes)
+            cols = np.concatenate([np.arange(size) for size in sizes])
+            demand[rows, cols], minimum[rows, cols], weight[rows, cols], tier[rows, cols] = self._goal_arrays(flat_goals)
+
+        allocation = np.zeros(shape)
+        budget = np.maximum(np.array([float(available) for _, available in problems], dtype=np.float64), 0.0)
+        tiers = np.unique(tier[tier >= 0])
+
+        for phase_demand in (minimum, demand - minimum):
+            for level in tiers:
+                mask = tier == level
+                tier_demand = np.where(mask, phase_demand, 0.0)
+                if not tier_demand.any() or not (budget > 0).any():
+                    continue
+                funded = self._water_fill(tier_demand, np.where(mask, weight, 0.0), budget)
+                allocation += funded
+                budget = np.maximum(budget - self._row_totals(funded), 0.0)
+
+        total_required = self._row_totals(demand)
+        feasible = np.all(allocation >= demand - 1e-6, axis=1)
+
+        plans = []
+        for p, (goals, available_savings) in enumerate(problems):
+            if not goals:
+                plans.append({
+                    "feasible": True,
+                    "allocations": {},
+                    "goal_allocations": [],
+                    "total_required": 0.0,
+                    "remaining_savings": max(available_savings, 0)
+                })
+                continue
+
+            goal_allocations = [
+                {
+                    "goal_name": goal.get("goal_name"),
+                    "required": float(demand[p, i]),
+                    "minimum": float(minimum[p, i]),
+                    "allocated": float(allocation[p, i]),
+                    "funded_ratio": float(allocation[p, i] / demand[p, i]) if demand[p, i] > 0 else 1.0,
+                    "islamic_importance": goal.get("islamic_importance") or "mubah",
+                    "priority": goal.get("priority") or "medium"
+                }
+                for i, goal in enumerate(goals)
+            ]
+
+            plan = {
+                "feasible": bool(feasible[p]),
+                "allocations": {item["goal_name"]: item["allocated"] for item in goal_allocations},
+                "goal_allocations": goal_allocations,
+                "total_required": float(total_required[p]),
+                "remaining_savings": float(budget[p])
+            }
+            if not feasible[p]:
+                plan["advice"] = "Рассмотрите увеличение сбережений или корректировку целей"
+            plans.append(plan)
+        return plans
+
+savings_allocator = SavingsAllocator()
@@ -0,0 +1,254 @@
+import copy
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Any, Optional, Tuple, Iterable
+
+from sqlalchemy import DateTime
+
+from ..core.config import settings
+from ..models.user import User
+
+try:
+    from redis import asyncio as redis_asyncio
+except ImportError:  # redis не установлен: только кэш в памяти процесса
+    redis_asyncio = None
+
+logger = logging.getLogger(__name__)
+
+# Ключ кэша: ("id", 1), ("email", "a@b.kz") или ("username", "aidana")
+CacheKey = Tuple[str, Any]
+
+ALIAS_FIELDS = ("email", "username")
+# Хеш пароля не кэшируется: вход (get_user_by_login) всегда читает БД
+EXCLUDED_FIELDS = {"hashed_password"}
+PROFILE_FIELDS = tuple(column.key for column in User.__table__.columns if column.key not in EXCLUDED_FIELDS)
+DATETIME_FIELDS = tuple(
+    column.key for column in User.__table__.columns
+    if isinstance(column.type, DateTime) and column.key in PROFILE_FIELDS
+)
+
+
+class CachedUser:
+    """Read-only снимок профиля пользователя из кэша
+
+    Поддерживает чтение атрибутов как у User (в том числе для response_model),
+    но не привязан к сессии: для изменения пользователь загружается из БД.
+    """
+
+    __slots__ = ("_fields",)
+
+    def __init__(self, fields: Dict[str, Any]):
+        object.__setattr__(self, "_fields", fields)
+
+    def __getattr__(self, name: str) -> Any:
+        try:
+            return self._fields[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("Cached user profile is read-only; load the user with use_cache=False to update it")
+
+
+class MemoryUserCacheBackend:
+    """LRU с TTL в памяти процесса
+
+    Профили хранятся и отдаются копиями: изменение полученного словаря
+    (например, списка целей) не портит запись в кэше.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: int):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._items: "OrderedDict[CacheKey, Tuple[float, Any]]" = OrderedDict()
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    async def get(self, key: CacheKey) -> Any:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            if item[0] <= time.monotonic():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return copy.deepcopy(item[1])
+
+    async def generation(self) -> int:
+        with self._lock:
+            return self._generation
+
+    async def set_many(self, items: Dict[CacheKey, Any], generation: int) -> bool:
+        """Записать, только если с чтения generation не было инвалидаций"""
+        expires_at = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            if generation != self._generation:
+                return False
+            for key, value in items.items():
+                self._items[key] = (expires_at, copy.deepcopy(value))
+                self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+            return True
+
+    async def delete(self, keys: Iterable[CacheKey]) -> None:
+        with self._lock:
+            self._generation += 1
+            for key in keys:
+                self._items.pop(key, None)
+
+    async def close(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+
+class RedisUserCacheBackend:
+    """Общий кэш в Redis: инвалидация сразу видна всем процессам"""
+
+    def __init__(self, url: str, prefix: str, ttl_seconds: int):
+        self.prefix = prefix
+        self.ttl_seconds = ttl_seconds
+        self._client = redis_asyncio.from_url(url)
+
+    def _key(self, key: CacheKey) -> str:
+        return f"{self.prefix}{key[0]}:{key[1]}"
+
+    @property
+    def _generation_key(self) -> str:
+        return f"{self.prefix}generation"
+
+    async def get(self, key: CacheKey) -> Any:
+        raw = await self._client.get(self._key(key))
+        return None if raw is None else json.loads(raw)
+
+    async def generation(self) -> int:
+        return int(await self._client.get(self._generation_key) or 0)
+
+    async def set_many(self, items: Dict[CacheKey, Any], generation: int) -> bool:
+        """Записать, только если с чтения generation не было инвалидаций
+
+        WATCH на счетчике поколений делает проверку и запись атомарными
+        для всех процессов: инвалидация между ними отменяет транзакцию.
+        """
+        async with self._client.pipeline(transaction=True) as pipe:
+            try:
+                await pipe.watch(self._generation_key)
+                if int(await pipe.get(self._generation_key) or 0) != generation:
+                    return False
+                pipe.multi()
+                for key, value in items.items():
+                    pipe.setex(self._key(key), self.ttl_seconds, json.dumps(value, default=str))
+                await pipe.execute()
+            except redis_asyncio.WatchError:
+                return False
+        return True
+
+    async def delete(self, keys: Iterable[CacheKey]) -> None:
+        names = [self._key(key) for key in keys]
+        async with self._client.pipeline(transaction=True) as pipe:
+            pipe.incr(self._generation_key)
+            if names:
+                pipe.delete(*names)
+            await pipe.execute()
+
+    async def close(self) -> None:
+        await self._client.close()
+
+
+class UserProfileCache:
+    """Read-through кэш профилей пользователей по id, email и username
+
+    Профиль хранится под ключом id, а ключи email/username ссылаются на id,
+    поэтому инвалидация по id сразу закрывает все три пути поиска. Ссылка,
+    оставшаяся от прежнего email/username, отбрасывается при чтении (значение
+    поля в профиле не совпадает). Ошибки общего бэкенда не ломают запросы:
+    они считаются промахом кэша.
+
+    Каждая инвалидация увеличивает счетчик поколений. Читатель запоминает
+    поколение до запроса к БД и передает его в put: если пользователя успели
+    изменить, пока строка читалась, устаревший профиль не попадет в кэш.
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        config = {**settings.USER_CACHE, **(config or {})}
+        self.ttl_seconds = config["ttl_seconds"]
+        self.backend_name = config["backend"]
+
+        if self.backend_name == "redis" and redis_asyncio is None:
+            logger.warning("USER_CACHE_BACKEND=redis but the redis package is not installed, using the in-process cache")
+            self.backend_name = "memory"
+        if self.backend_name == "redis":
+            self._backend = RedisUserCacheBackend(settings.REDIS_URL, config["redis_prefix"], self.ttl_seconds)
+        else:
+            self._backend = MemoryUserCacheBackend(config["max_size"], self.ttl_seconds)
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0
+
+    @staticmethod
+    def _restore(fields: Dict[str, Any]) -> Dict[str, Any]:
+        """Даты после JSON-сериализации общего бэкенда"""
+        for field in DATETIME_FIELDS:
+            if isinstance(fields.get(field), str):
+                fields[field] = datetime.fromisoformat(fields[field])
+        return fields
+
+    async def get(self, field: str, value: Any) -> Optional[CachedUser]:
+        if not self.enabled or value is None:
+            return None
+        try:
+            user_id = value if field == "id" else await self._backend.get((field, value))
+            fields = None if user_id is None else await self._backend.get(("id", user_id))
+        except Exception as e:
+            logger.error(f"User cache read failed: {e}")
+            return None
+        if fields is None or fields.get(field) != value:
+            return None
+        return CachedUser(self._restore(fields))
+
+    async def generation(self) -> Optional[int]:
+        """Поколение кэша; запрашивается до чтения пользователя из БД"""
+        if not self.enabled:
+            return None
+        try:
+            return await self._backend.generation()
+        except Exception as e:
+            logger.error(f"User cache read failed: {e}")
+            return None
+
+    async def put(self, user: User, generation: Optional[int]) -> CachedUser:
+        """Запомнить профиль пользователя, загруженного из БД
+
+        generation — значение generation() до чтения строки; None означает,
+        что поколение неизвестно, и профиль не кэшируется.
+        """
+        fields = {field: getattr(user, field) for field in PROFILE_FIELDS}
+        if self.enabled and generation is not None:
+            items: Dict[CacheKey, Any] = {("id", user.id): fields}
+            for field in ALIAS_FIELDS:
+                if fields[field] is not None:
+                    items[(field, fields[field])] = user.id
+            try:
+                await self._backend.set_many(items, generation)
+            except Exception as e:
+                logger.error(f"User cache write failed: {e}")
+        return CachedUser(fields)
+
+    async def invalidate(self, user_id: int, aliases: Iterable[CacheKey] = ()) -> None:
+        """Сбросить профиль после изменения пользователя"""
+        try:
+            await self._backend.delete([("id", user_id), *(key for key in aliases if key[1] is not None)])
+        except Exception as e:
+            logger.error(f"User cache invalidation failed for user {user_id}: {e}")
+
+    async def close(self) -> None:
+        await self._backend.close()
+
+
+user_cache = UserProfileCache()
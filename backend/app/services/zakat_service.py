@@ -0,0 +1,191 @@
+import json
+import logging
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Any, Optional, Iterable
+
+import numpy as np
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class NisabPriceFeed:
+    """Локально кэшируемые цены золота и серебра для расчета нисаба
+
+    Цены читаются из файла (заглушка внешнего источника) и перечитываются не чаще,
+    чем раз в prices_refresh_seconds, и только если файл изменился.
+    """
+
+    def __init__(self, prices_file: Optional[str] = None, refresh_seconds: Optional[int] = None):
+        self.prices_file = prices_file or settings.ZAKAT["prices_file"]
+        self.refresh_seconds = refresh_seconds if refresh_seconds is not None else settings.ZAKAT["prices_refresh_seconds"]
+        self._prices: Optional[Dict[str, Any]] = None
+        self._loaded_mtime: Optional[float] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def get_prices(self) -> Dict[str, Any]:
+        """Текущие цены (из кэша, при необходимости обновляются из файла)"""
+        now = time.monotonic()
+        if self._prices is not None and now - self._checked_at < self.refresh_seconds:
+            return self._prices
+
+        with self._lock:
+            if self._prices is None or now - self._checked_at >= self.refresh_seconds:
+                self._refresh()
+                self._checked_at = now
+        return self._prices
+
+    def _refresh(self) -> None:
+        try:
+            mtime = os.path.getmtime(self.prices_file)
+            if self._prices is not None and mtime == self._loaded_mtime:
+                return
+            with open(self.prices_file, "r", encoding="utf-8") as f:
+                prices = json.load(f)
+            if prices["gold_price_per_gram"] <= 0 or prices["silver_price_per_gram"] <= 0:
+                raise ValueError("Nisab prices must be positive")
+            self._prices = prices
+            self._loaded_mtime = mtime
+        except (OSError, ValueError, KeyError) as e:
+            if self._prices is None:
+                raise
+            logger.error(f"Failed to refresh nisab prices, keeping cached values: {e}")
+
+    def nisab(self, standard: Optional[str] = None) -> float:
+        """Нисаб в тенге по золотому или серебряному стандарту"""
+        prices = self.get_prices()
+        standard = standard or settings.ZAKAT["nisab_standard"]
+        if standard == "gold":
+            return settings.ZAKAT["gold_nisab_grams"] * prices["gold_price_per_gram"]
+        return settings.ZAKAT["silver_nisab_grams"] * prices["silver_price_per_gram"]
+
+
+class ZakatService:
+    """Расчет закята с учетом хауля (лунного года) по истории транзакций"""
+
+    def __init__(self, price_feed: Optional[NisabPriceFeed] = None):
+        self.price_feed = price_feed or NisabPriceFeed()
+        self.rate = settings.ISLAMIC_FINANCE["zakat_percentage"]
+        self.hawl_days = settings.ZAKAT["hawl_days"]
+
+    @staticmethod
+    def _to_date(value: Any) -> date:
+        if isinstance(value, datetime):
+            return value.date()
+        if isinstance(value, date):
+            return value
+        return datetime.fromisoformat(str(value)).date()
+
+    @staticmethod
+    def _signed_amount(transaction: Dict[str, Any]) -> float:
+        amount = float(transaction.get("amount", 0))
+        return amount if transaction.get("transaction_type") == "income" else -amount
+
+    def compute_batch(
+        self,
+        transactions: Iterable[Dict[str, Any]],
+        liabilities: Optional[Dict[int, float]] = None,
+        opening_balances: Optional[Dict[int, Dict[str, float]]] = None,
+        as_of: Optional[date] = None,
+        nisab_standard: Optional[str] = None
+    ) -> Dict[int, Dict[str, Any]]:
+        """Закят к уплате для всех пользователей за один проход
+
+        Баланс активов (поле asset транзакции, по умолчанию cash) восстанавливается из
+        истории; хауль начинается в последний момент, когда чистое богатство
+        (активы минус обязательства) поднялось до нисаба и с тех пор не опускалось ниже.
+        """
+        transactions = list(transactions)
+        liabilities = liabilities or {}
+        opening_balances = opening_balances or {}
+        as_of = as_of or date.today()
+        nisab = self.price_feed.nisab(nisab_standard)
+
+        user_ids = sorted({t["user_id"] for t in transactions} | set(liabilities) | set(opening_balances))
+        user_index = {user_id: i for i, user_id in enumerate(user_ids)}
+        n_users = len(user_ids)
+
+        # Балансы по активам
+        asset_balances: List[Dict[str, float]] = [dict(opening_balances.get(user_id, {})) for user_id in user_ids]
+        for transaction in transactions:
+            balances = asset_balances[user_index[transaction["user_id"]]]
+            asset = transaction.get("asset") or "cash"
+            balances[asset] = balances.get(asset, 0.0) + self._signed_amount(transaction)
+
+        opening_total = np.array([sum(opening_balances.get(u, {}).values()) for u in user_ids], dtype=np.float64)
+        liability_total = np.array([liabilities.get(u, 0.0) for u in user_ids], dtype=np.float64)
+
+        hawl_start_ordinal = np.full(n_users, -1, dtype=np.int64)
+        if transactions:
+            users = np.array([user_index[t["user_id"]] for t in transactions], dtype=np.int64)
+            days = np.array([self._to_date(t.get("date") or as_of).toordinal() for t in transactions], dtype=np.int64)
+            signed = np.array([self._signed_amount(t) for t in transactions], dtype=np.float64)
+
+            order = np.lexsort((days, users))
+            users, days, signed = users[order], days[order], signed[order]
+
+            # Накопленное чистое богатство внутри каждой группы пользователя
+            group_start = np.concatenate(([0], np.flatnonzero(np.diff(users)) + 1))
+            group_size = np.diff(np.concatenate((group_start, [users.size])))
+            cumulative = np.cumsum(signed)
+            offsets = np.repeat(cumulative[group_start] - signed[group_start], group_size)
+            net_wealth = cumulative - offsets + opening_total[users] - liability_total[users]
+
+            positions = np.arange(users.size)
+            last_below = np.maximum.reduceat(np.where(net_wealth < nisab, positions, -1), group_start)
+            group_end = group_start + group_size - 1
+
+            has_hawl = last_below < group_end
+            start_position = np.where(last_below >= group_start, last_below + 1, group_start)
+            hawl_start_ordinal[users[group_start[has_hawl]]] = days[start_position[has_hawl]]
+
+        results = {}
+        for i, user_id in enumerate(user_ids):
+            assets = asset_balances[i]
+            net_wealth = sum(assets.values()) - liability_total[i]
+            hawl_start = date.fromordinal(int(hawl_start_ordinal[i])) if hawl_start_ordinal[i] > 0 else None
+            above_nisab = net_wealth >= nisab
+            hawl_complete = bool(
+                above_nisab and hawl_start is not None and (as_of - hawl_start).days >= self.hawl_days
+            )
+
+            results[user_id] = {
+                "user_id": user_id,
+                "nisab": nisab,
+                "assets": assets,
+                "liabilities": float(liability_total[i]),
+                "net_zakatable_wealth": float(net_wealth),
+                "above_nisab": bool(above_nisab),
+                "hawl_start": hawl_start,
+                "hawl_due_date": hawl_start + timedelta(days=self.hawl_days) if hawl_start and above_nisab else None,
+                "hawl_complete": hawl_complete,
+                "zakat_due": float(net_wealth * self.rate) if hawl_complete else 0.0,
+                "as_of": as_of
+            }
+        return results
+
+    def calculate_for_user(
+        self,
+        user_id: int,
+        transactions: Iterable[Dict[str, Any]],
+        liabilities: float = 0.0,
+        opening_balances: Optional[Dict[str, float]] = None,
+        as_of: Optional[date] = None
+    ) -> Dict[str, Any]:
+        """Закят одного пользователя по его истории транзакций"""
+        results = self.compute_batch(
+            [t for t in transactions if t["user_id"] == user_id],
+            liabilities={user_id: liabilities},
+            opening_balances={user_id: opening_balances or {}},
+            as_of=as_of
+        )
+        return results[user_id]
+
+
+nisab_price_feed = NisabPriceFeed()
+zakat_service = ZakatService(nisab_price_feed)
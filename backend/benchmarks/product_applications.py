@@ -0,0 +1,90 @@
+"""Пропускная способность /products/apply с ключами идемпотентности
+
+Запуск (из каталога backend, на отдельной БД):
+    DATABASE_URL=sqlite:////tmp/bench_apply.db python -m benchmarks.product_applications
+
+Через ASGI-приложение (без сети) отправляет пачки параллельных заявок:
+новые заявки без ключа, первые отправки с ключом, повторы тех же ключей и
+гонку повторов одного ключа. Печатает запросы в секунду и проверяет, что в
+таблице ровно одна заявка на ключ.
+"""
+import asyncio
+import itertools
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+from sqlalchemy import func, select
+
+from app.database.migrate import upgrade_database
+from app.database.session import AsyncSessionLocal, dispose_engines, warm_up_engines
+from app.main import app
+from app.models.financial import ProductApplicationRecord
+from benchmarks.timing import print_table
+
+APPLY_URL = "/api/v1/api/v1/products/apply"
+CONCURRENCY = 16
+_users = itertools.count(1_000_000)
+
+
+def payload(user_id: int) -> Dict[str, Any]:
+    return {"product_id": 1, "user_id": user_id, "amount": 100000, "timeline": "12 месяцев"}
+
+
+async def send(client: httpx.AsyncClient, requests: List[Dict[str, Any]]) -> float:
+    """Отправить запросы по CONCURRENCY одновременно; возвращает запросы в секунду"""
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def post(request: Dict[str, Any]) -> None:
+        async with semaphore:
+            response = await client.post(APPLY_URL, json=request["json"], headers=request["headers"])
+            response.raise_for_status()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(post(request) for request in requests))
+    return len(requests) / (time.perf_counter() - started)
+
+
+def requests_for(user_ids: List[int], key: Optional[str] = None) -> List[Dict[str, Any]]:
+    return [{"json": payload(user_id), "headers": {"Idempotency-Key": key} if key else {}} for user_id in user_ids]
+
+
+async def count_rows(user_ids: List[int]) -> int:
+    async with AsyncSessionLocal() as db:
+        return await db.scalar(
+            select(func.count()).select_from(ProductApplicationRecord).where(ProductApplicationRecord.user_id.in_(user_ids))
+        )
+
+
+async def run(count: int = 1000) -> None:
+    await warm_up_engines()
+    async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+        plain_users = [next(_users) for _ in range(count)]
+        keyed_users = [next(_users) for _ in range(count)]
+        race_user = next(_users)
+
+        rows = [
+            {"case": "new, no key", "requests": count, "req_per_s": await send(client, requests_for(plain_users))},
+            {"case": "new, with key", "requests": count, "req_per_s": await send(client, requests_for(keyed_users, "k"))},
+            {"case": "retry of a key", "requests": count, "req_per_s": await send(client, requests_for(keyed_users, "k"))},
+            {"case": "one key, racing", "requests": count, "req_per_s": await send(client, requests_for([race_user] * count, "k"))}
+        ]
+    print_table(f"/products/apply through ASGI, {CONCURRENCY} in flight", rows)
+
+    print_table("Stored applications", [{
+        "no_key": await count_rows(plain_users),
+        "keyed_users": await count_rows(keyed_users),
+        "racing_user": await count_rows([race_user])
+    }])
+    await dispose_engines()
+
+
+def main() -> None:
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    upgrade_database()
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Сравнение индексированного ProductCatalog с прежним перебором списка products_db
+
+Запуск (из каталога backend): python -m benchmarks.product_catalog
+
+На синтетическом каталоге из 10 000 продуктов (копии продуктов products.json
+с перемешанными полями) печатает время построения каталога, поиска по id и
+фильтрации по одному-трем полям против линейного прохода по списку.
+"""
+import json
+import os
+import random
+from typing import Any, Dict, List, Optional
+
+from app.services.product_catalog import ProductCatalog
+from benchmarks.timing import measure, print_table
+
+PRODUCTS_FILE = os.path.join(os.path.dirname(__file__), "..", "app", "data", "products.json")
+
+
+def load_products() -> List[Dict[str, Any]]:
+    with open(PRODUCTS_FILE, encoding="utf-8") as f:
+        return json.load(f)["products"]
+
+
+def synthetic_products(rng: random.Random, count: int) -> List[Dict[str, Any]]:
+    """count продуктов: поля берутся из случайных продуктов каталога, id уникальны"""
+    templates = load_products()
+    principles = sorted({value for product in templates for value in product["sharia_principles"]})
+    eligibility = sorted({value for product in templates for value in product["eligibility"]})
+    products = []
+    for i in range(count):
+        product = dict(rng.choice(templates))
+        product.update({
+            "id": i + 1,
+            "name": f"{product['name']} #{i + 1}",
+            "type": rng.choice(templates)["type"],
+            "risk_level": rng.choice(templates)["risk_level"],
+            "sharia_principles": rng.sample(principles, rng.randint(1, 3)),
+            "eligibility": rng.sample(eligibility, rng.randint(1, 3))
+        })
+        products.append(product)
+    return products
+
+
+def scan_get(products: List[Dict[str, Any]], product_id: int) -> Optional[Dict[str, Any]]:
+    """Прежний get_product_by_id"""
+    return next((product for product in products if product["id"] == product_id), None)
+
+
+def scan_filter(
+    products: List[Dict[str, Any]],
+    type: Optional[str] = None,
+    risk_level: Optional[str] = None,
+    principle: Optional[str] = None,
+    eligibility: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """Фильтрация последовательными проходами по списку, как в прежнем /products/"""
+    filtered = products
+    if type:
+        filtered = [p for p in filtered if p["type"] == type]
+    if risk_level:
+        filtered = [p for p in filtered if p["risk_level"] == risk_level]
+    if principle:
+        filtered = [p for p in filtered if principle in p["sharia_principles"]]
+    if eligibility:
+        filtered = [p for p in filtered if eligibility in p["eligibility"]]
+    return filtered
+
+
+def main() -> None:
+    rng = random.Random(42)
+    products = synthetic_products(rng, 10_000)
+    catalog = ProductCatalog(products)
+
+    print_table("Catalog of 10 000 products", [{
+        "build_ms": measure(lambda: ProductCatalog(products), repeat=5)["median_ms"],
+        "scan_get_ms": measure(lambda: scan_get(products, 9_999), number=100)["median_ms"],
+        "index_get_ms": measure(lambda: catalog.get(9_999), number=10_000)["median_ms"]
+    }])
+
+    sample = products[0]
+    queries = [
+        ("type", {"type": sample["type"]}),
+        ("type+risk", {"type": sample["type"], "risk_level": sample["risk_level"]}),
+        ("type+risk+principle", {
+            "type": sample["type"], "risk_level": sample["risk_level"], "principle": sample["sharia_principles"][0]
+        }),
+        ("principle+eligibility", {"principle": sample["sharia_principles"][0], "eligibility": sample["eligibility"][0]})
+    ]
+    rows = []
+    for name, criteria in queries:
+        assert catalog.filter(**criteria) == scan_filter(products, **criteria)
+        rows.append({
+            "filter": name,
+            "matches": len(catalog.filter(**criteria)),
+            "scan_ms": measure(lambda: scan_filter(products, **criteria), number=20)["median_ms"],
+            "index_ms": measure(lambda: catalog.filter(**criteria), number=20)["median_ms"]
+        })
+    print_table("Filter", rows)
+
+
+if __name__ == "__main__":
+    main()
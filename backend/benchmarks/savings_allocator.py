@@ -0,0 +1,109 @@
+"""Сравнение SavingsAllocator с прежним жадным optimize_savings_plan
+
+Запуск (из каталога backend): python -m benchmarks.savings_allocator
+
+Печатает время одного решения для 10/40/100 целей, время пакета на 10 000
+пользователей и долю задач, где жадный алгоритм недофинансирует цель фард,
+отдавая бюджет цели мубах.
+"""
+import random
+from typing import Any, Dict, List
+
+from app.services.savings_allocator import savings_allocator
+from benchmarks.timing import measure, print_table
+
+IMPORTANCE = ["fard", "sunnah", "mustahabb", "mubah"]
+PRIORITIES = ["high", "medium", "low"]
+
+
+def greedy_allocate(goals: List[Dict[str, Any]], available_savings: float) -> Dict[str, Any]:
+    """Прежний optimize_savings_plan: приоритеты сортируются как строки, цели финансируются по очереди"""
+    total_required = sum(goal["monthly_saving"] for goal in goals)
+    if available_savings >= total_required:
+        return {
+            "feasible": True,
+            "allocations": {goal["goal_name"]: goal["monthly_saving"] for goal in goals},
+            "remaining_savings": available_savings - total_required
+        }
+
+    prioritized_goals = sorted(goals, key=lambda x: x.get("priority", "medium"), reverse=True)
+    allocations = {}
+    remaining_budget = available_savings
+    for goal in prioritized_goals:
+        if remaining_budget >= goal["monthly_saving"]:
+            allocations[goal["goal_name"]] = goal["monthly_saving"]
+            remaining_budget -= goal["monthly_saving"]
+        else:
+            allocations[goal["goal_name"]] = remaining_budget
+            remaining_budget = 0
+            break
+    return {"feasible": False, "allocations": allocations, "remaining_savings": remaining_budget}
+
+
+def random_goals(rng: random.Random, count: int) -> List[Dict[str, Any]]:
+    goals = []
+    for i in range(count):
+        months = rng.randint(1, 120)
+        target = rng.uniform(10_000, 5_000_000)
+        goals.append({
+            "goal_name": f"goal-{i}",
+            "target_amount": target,
+            "timeline_months": months,
+            "monthly_saving": target / months,
+            "priority": rng.choice(PRIORITIES),
+            "islamic_importance": rng.choice(IMPORTANCE)
+        })
+    return goals
+
+
+def underfunds_fard(goals: List[Dict[str, Any]], allocations: Dict[str, float]) -> bool:
+    """Цель фард профинансирована не полностью, а цель мубах получила деньги"""
+    fard_short = any(
+        allocations.get(goal["goal_name"], 0) < goal["monthly_saving"] - 1e-6
+        for goal in goals if goal["islamic_importance"] == "fard"
+    )
+    mubah_funded = any(
+        allocations.get(goal["goal_name"], 0) > 1e-6
+        for goal in goals if goal["islamic_importance"] == "mubah"
+    )
+    return fard_short and mubah_funded
+
+
+def main() -> None:
+    rng = random.Random(42)
+
+    rows = []
+    for count in (10, 40, 100):
+        goals = random_goals(rng, count)
+        budget = sum(goal["monthly_saving"] for goal in goals) * 0.5
+        rows.append({
+            "goals": count,
+            "greedy_ms": measure(lambda: greedy_allocate(goals, budget), number=100)["median_ms"],
+            "allocator_ms": measure(lambda: savings_allocator.allocate(goals, budget), number=20)["median_ms"]
+        })
+    print_table("Single solve (budget = 50% of required)", rows)
+
+    problems = []
+    for _ in range(10_000):
+        goals = random_goals(rng, rng.randint(1, 8))
+        problems.append((goals, sum(goal["monthly_saving"] for goal in goals) * rng.uniform(0.2, 1.2)))
+    print_table("Batch of 10 000 users (1-8 goals)", [{
+        "greedy_ms": measure(lambda: [greedy_allocate(*problem) for problem in problems], repeat=3)["median_ms"],
+        "allocate_loop_ms": measure(lambda: [savings_allocator.allocate(*problem) for problem in problems], repeat=3)["median_ms"],
+        "allocate_batch_ms": measure(lambda: savings_allocator.allocate_batch(problems), repeat=3)["median_ms"]
+    }])
+
+    greedy_violations = sum(underfunds_fard(goals, greedy_allocate(goals, budget)["allocations"]) for goals, budget in problems)
+    allocator_violations = sum(
+        underfunds_fard(goals, plan["allocations"])
+        for (goals, _), plan in zip(problems, savings_allocator.allocate_batch(problems))
+    )
+    print_table("Problems where a fard goal is short while a mubah goal is funded", [{
+        "problems": len(problems),
+        "greedy": greedy_violations,
+        "allocator": allocator_violations
+    }])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""SQLite до и после WAL и разделения чтения/записи
+
+Запуск (из каталога backend): python -m benchmarks.sqlite_wal
+
+Для каждого режима готовится свой файл БД, затем PROCESSES процессов по
+CLIENTS асинхронных клиентов DURATION секунд читают страницы транзакций и
+вставляют транзакции с заданной долей записей:
+
+- before — журнал отката, без PRAGMA, один async-движок с пулом (как до WAL);
+- after — движки приложения: WAL, PRAGMA, один пишущий и пул читающих соединений.
+
+Печатает чтения и записи в секунду и число ошибок "database is locked".
+"""
+import asyncio
+import multiprocessing
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from benchmarks.timing import print_table
+
+PROCESSES = 4
+CLIENTS = 16
+DURATION = 6.0
+USERS = 50
+WRITE_SHARES = (0.0, 0.1, 0.3)
+
+
+def _use_database(path: str, mode: str) -> None:
+    """Настройки приложения читаются при импорте, поэтому окружение задается до него"""
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    os.environ["DATABASE_SEED_DEMO"] = "false"
+    os.environ["SQLITE_READ_WRITE_SPLIT"] = "true" if mode == "after" else "false"
+
+
+def prepare(path: str, mode: str) -> None:
+    """Схема и по 100 транзакций на пользователя (в отдельном процессе)"""
+    _use_database(path, mode)
+    from app.database.migrate import upgrade_database
+    from app.database.session import SessionLocal
+    from app.models.financial import Transaction
+
+    upgrade_database()
+    rng = random.Random(3)
+    with SessionLocal() as db:
+        db.add_all([
+            Transaction(user_id=user_id, amount=rng.uniform(100, 10000), category="food", description="", transaction_type="expense")
+            for user_id in range(1, USERS + 1)
+            for _ in range(100)
+        ])
+        db.commit()
+
+
+def worker(path: str, mode: str, write_share: float, seed: int, results: "multiprocessing.Queue") -> None:
+    _use_database(path, mode)
+    from sqlalchemy import select
+    from sqlalchemy.exc import OperationalError
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+    from sqlalchemy.pool import AsyncAdaptedQueuePool
+    from app.core.config import settings
+    from app.database import session as database
+    from app.models.financial import Transaction
+
+    if mode == "before":
+        engine = create_async_engine(
+            settings.async_database_url,
+            pool_size=settings.DATABASE_POOL_SIZE,
+            max_overflow=settings.DATABASE_MAX_OVERFLOW,
+            poolclass=AsyncAdaptedQueuePool
+        )
+        session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    else:
+        session_factory = database.AsyncSessionLocal
+
+    counts = {"reads": 0, "writes": 0, "errors": 0}
+
+    async def client(rng: random.Random, deadline: float) -> None:
+        while time.perf_counter() < deadline:
+            user_id = rng.randint(1, USERS)
+            try:
+                async with session_factory() as db:
+                    if rng.random() < write_share:
+                        db.add(Transaction(user_id=user_id, amount=rng.uniform(100, 10000), category="food", description="", transaction_type="expense"))
+                        await db.commit()
+                        counts["writes"] += 1
+                    else:
+                        await db.scalars(
+                            select(Transaction).where(Transaction.user_id == user_id)
+                            .order_by(Transaction.date.desc(), Transaction.id.desc()).limit(50)
+                        )
+                        counts["reads"] += 1
+            except OperationalError:
+                counts["errors"] += 1
+
+    async def run() -> None:
+        if mode == "after":
+            await database.warm_up_engines()
+        deadline = time.perf_counter() + DURATION
+        await asyncio.gather(*(client(random.Random(seed * 100 + i), deadline) for i in range(CLIENTS)))
+
+    asyncio.run(run())
+    results.put(counts)
+
+
+def measure_mode(mode: str, write_share: float) -> Dict[str, Any]:
+    context = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, f"{mode}.db")
+        setup = context.Process(target=prepare, args=(path, mode))
+        setup.start()
+        setup.join()
+        if mode == "before":
+            # Миграции приложения включают WAL; режим "до" работает с журналом отката
+            with sqlite3.connect(path) as connection:
+                connection.execute("PRAGMA journal_mode=DELETE")
+
+        results = context.Queue()
+        processes = [context.Process(target=worker, args=(path, mode, write_share, i, results)) for i in range(PROCESSES)]
+        for process in processes:
+            process.start()
+        totals: List[Dict[str, int]] = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+
+    return {
+        "mode": mode,
+        "write_share": write_share,
+        "reads_per_s": sum(t["reads"] for t in totals) / DURATION,
+        "writes_per_s": sum(t["writes"] for t in totals) / DURATION,
+        "locked_errors": sum(t["errors"] for t in totals)
+    }
+
+
+def main() -> None:
+    rows = [measure_mode(mode, share) for share in WRITE_SHARES for mode in ("before", "after")]
+    print_table(f"{PROCESSES} processes x {CLIENTS} clients, {DURATION:.0f} s per run", rows)
+
+
+if __name__ == "__main__":
+    main()
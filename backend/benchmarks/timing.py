@@ -0,0 +1,33 @@
+"""Общие средства замера времени для скриптов benchmarks/"""
+import statistics
+import time
+from typing import Any, Callable, Dict, List
+
+
+def measure(function: Callable[[], Any], repeat: int = 20, number: int = 1) -> Dict[str, float]:
+    """Медиана и минимум времени одного вызова (мс) по repeat замерам из number вызовов"""
+    function()  # прогрев: импорт, кэши, JIT numpy
+    samples: List[float] = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            function()
+        samples.append((time.perf_counter() - started) * 1000 / number)
+    return {"median_ms": statistics.median(samples), "min_ms": min(samples)}
+
+
+def print_table(title: str, rows: List[Dict[str, Any]]) -> None:
+    print(f"\n{title}")
+    if not rows:
+        return
+    columns = list(rows[0])
+    widths = {column: max(len(column), *(len(_format(row[column])) for row in rows)) for column in columns}
+    print("  ".join(column.ljust(widths[column]) for column in columns))
+    for row in rows:
+        print("  ".join(_format(row[column]).ljust(widths[column]) for column in columns))
+
+
+def _format(value: Any) -> str:
+    if isinstance(value, float):
+        return f"{value:.3f}"
+    return str(value)
@@ -0,0 +1,87 @@
+from logging.config import fileConfig
+
+from sqlalchemy import engine_from_config
+from sqlalchemy import pool
+
+from alembic import context
+
+from app.core.config import settings
+from app.database.session import Base
+from app.models import financial, user  # noqa: F401  (register tables on Base.metadata)
+
+# this is the Alembic Config object, which provides
+# access to the values within the .ini file in use.
+config = context.config
+
+# Interpret the config file for Python logging, unless the application
+# runs the migrations itself and already configured logging.
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+if not config.get_main_option("sqlalchemy.url"):
+    config.set_main_option("sqlalchemy.url", settings.DATABASE_URL.replace("%", "%%"))
+
+target_metadata = Base.metadata
+
+# Search structures maintained by raw SQL in migration 0003 (FTS5 table and its
+# shadow tables on SQLite, the generated tsvector column on PostgreSQL)
+UNMANAGED_PREFIX = "ai_conversations_fts"
+UNMANAGED_COLUMNS = {("ai_conversations", "search_vector")}
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    if type_ == "table" and name.startswith(UNMANAGED_PREFIX):
+        return False
+    if type_ == "column" and (object.table.name, name) in UNMANAGED_COLUMNS:
+        return False
+    if type_ == "index" and name == "ix_ai_conversations_search":
+        return False
+    return True
+
+
+# SQLite cannot ALTER most constraints in place; batch mode recreates the table
+render_as_batch = settings.database_type == "sqlite"
+
+
+def run_migrations_offline() -> None:
+    """Run migrations in 'offline' mode (emit SQL without a database connection)."""
+    url = config.get_main_option("sqlalchemy.url")
+    context.configure(
+        url=url,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        render_as_batch=render_as_batch,
+        include_object=include_object,
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    """Run migrations in 'online' mode against DATABASE_URL."""
+    connectable = config.attributes.get("connection")
+    if connectable is None:
+        connectable = engine_from_config(
+            config.get_section(config.config_ini_section, {}),
+            prefix="sqlalchemy.",
+            poolclass=pool.NullPool,
+        )
+
+    with connectable.connect() as connection:
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            render_as_batch=render_as_batch,
+            include_object=include_object,
+        )
+
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,132 @@
+"""initial schema
+
+Tables as previously created by create_tables() / Base.metadata.create_all().
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19 15:44:34.915710
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('users',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('email', sa.String(), nullable=True),
+    sa.Column('username', sa.String(), nullable=True),
+    sa.Column('hashed_password', sa.String(), nullable=True),
+    sa.Column('full_name', sa.String(), nullable=True),
+    sa.Column('age', sa.Integer(), nullable=True),
+    sa.Column('monthly_income', sa.Float(), nullable=True),
+    sa.Column('monthly_expenses', sa.Float(), nullable=True),
+    sa.Column('financial_goals', sa.JSON(), nullable=True),
+    sa.Column('risk_profile', sa.String(), nullable=True),
+    sa.Column('islamic_knowledge', sa.String(), nullable=True),
+    sa.Column('financial_values', sa.JSON(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('last_financial_update', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('currency', sa.String(), nullable=True),
+    sa.Column('occupation', sa.String(), nullable=True),
+    sa.Column('family_size', sa.Integer(), nullable=True),
+    sa.Column('financial_priorities', sa.JSON(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_users_email', 'users', ['email'], unique=True)
+    op.create_index('ix_users_id', 'users', ['id'], unique=False)
+    op.create_index('ix_users_username', 'users', ['username'], unique=True)
+
+    op.create_table('financial_goals',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('goal_name', sa.String(), nullable=True),
+    sa.Column('target_amount', sa.Float(), nullable=True),
+    sa.Column('current_amount', sa.Float(), nullable=True),
+    sa.Column('timeline_months', sa.Integer(), nullable=True),
+    sa.Column('category', sa.String(), nullable=True),
+    sa.Column('priority', sa.String(), nullable=True),
+    sa.Column('islamic_importance', sa.String(), nullable=True),
+    sa.Column('is_completed', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_financial_goals_id', 'financial_goals', ['id'], unique=False)
+    op.create_index('ix_financial_goals_user_id', 'financial_goals', ['user_id'], unique=False)
+
+    op.create_table('transactions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('amount', sa.Float(), nullable=True),
+    sa.Column('category', sa.String(), nullable=True),
+    sa.Column('description', sa.String(), nullable=True),
+    sa.Column('transaction_type', sa.String(), nullable=True),
+    sa.Column('is_halal', sa.Boolean(), nullable=True),
+    sa.Column('date', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_transactions_id', 'transactions', ['id'], unique=False)
+    op.create_index('ix_transactions_user_id', 'transactions', ['user_id'], unique=False)
+
+    op.create_table('ai_conversations',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('user_message', sa.Text(), nullable=True),
+    sa.Column('ai_response', sa.Text(), nullable=True),
+    sa.Column('context', sa.JSON(), nullable=True),
+    sa.Column('message_type', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_ai_conversations_id', 'ai_conversations', ['id'], unique=False)
+    op.create_index('ix_ai_conversations_user_id', 'ai_conversations', ['user_id'], unique=False)
+
+    op.create_table('financial_snapshots',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('metrics', sa.JSON(), nullable=True),
+    sa.Column('budget_recommendations', sa.JSON(), nullable=True),
+    sa.Column('zakat', sa.JSON(), nullable=True),
+    sa.Column('computed_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_financial_snapshots_id', 'financial_snapshots', ['id'], unique=False)
+    op.create_index('ix_financial_snapshots_user_id', 'financial_snapshots', ['user_id'], unique=True)
+
+    op.create_table('product_applications',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('product_name', sa.String(), nullable=True),
+    sa.Column('amount', sa.Integer(), nullable=True),
+    sa.Column('timeline', sa.String(), nullable=True),
+    sa.Column('additional_info', sa.Text(), nullable=True),
+    sa.Column('status', sa.String(), nullable=True),
+    sa.Column('idempotency_key', sa.String(length=255), nullable=True),
+    sa.Column('request_fingerprint', sa.String(length=64), nullable=True),
+    sa.Column('applied_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'idempotency_key', name='uq_product_applications_idempotency')
+    )
+    op.create_index('ix_product_applications_id', 'product_applications', ['id'], unique=False)
+    op.create_index('ix_product_applications_user_applied', 'product_applications', ['user_id', 'applied_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_table('product_applications')
+    op.drop_table('financial_snapshots')
+    op.drop_table('ai_conversations')
+    op.drop_table('transactions')
+    op.drop_table('financial_goals')
+    op.drop_table('users')
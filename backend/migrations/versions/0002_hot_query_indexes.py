@@ -0,0 +1,53 @@
+"""hot query indexes
+
+Every hot query filters by user and orders by date / created_at, so the
+single-column user_id indexes are replaced by composite access-path indexes
+(the id column makes (date, id) / (created_at, id) keyset pages index-only
+ranges). Incomplete goals get a partial index.
+
+On PostgreSQL the indexes are built CONCURRENTLY (outside the migration
+transaction) so writes to the tables are not blocked; new indexes are created
+before the ones they replace are dropped.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 15:45:04.903416
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INCOMPLETE_GOALS = {
+    "sqlite_where": sa.text("is_completed IS NOT 1"),
+    "postgresql_where": sa.text("is_completed IS NOT TRUE"),
+}
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index('ix_transactions_user_date', 'transactions', ['user_id', 'date', 'id'], postgresql_concurrently=True)
+        op.create_index('ix_ai_conversations_user_created', 'ai_conversations', ['user_id', 'created_at', 'id'], postgresql_concurrently=True)
+        op.create_index('ix_financial_goals_user_active', 'financial_goals', ['user_id', 'id'], postgresql_concurrently=True, **INCOMPLETE_GOALS)
+
+        # Left-prefix of the composite indexes above
+        op.drop_index('ix_transactions_user_id', table_name='transactions', postgresql_concurrently=True)
+        op.drop_index('ix_ai_conversations_user_id', table_name='ai_conversations', postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index('ix_ai_conversations_user_id', 'ai_conversations', ['user_id'], postgresql_concurrently=True)
+        op.create_index('ix_transactions_user_id', 'transactions', ['user_id'], postgresql_concurrently=True)
+
+        op.drop_index('ix_financial_goals_user_active', table_name='financial_goals', postgresql_concurrently=True)
+        op.drop_index('ix_ai_conversations_user_created', table_name='ai_conversations', postgresql_concurrently=True)
+        op.drop_index('ix_transactions_user_date', table_name='transactions', postgresql_concurrently=True)
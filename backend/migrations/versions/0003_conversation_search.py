@@ -0,0 +1,93 @@
+"""conversation full-text search
+
+SQLite: an external-content FTS5 table over ai_conversations (user_id,
+user_message, ai_response) kept in sync by triggers, so every insert, bulk
+delete or update maintains the index incrementally. user_id is indexed as a
+token so a per-user search is an index intersection, not a table scan.
+
+PostgreSQL: a stored generated tsvector column with a GIN index, built
+CONCURRENTLY.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 16:05:12.417230
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SQLITE_UPGRADE = [
+    """
+    CREATE VIRTUAL TABLE ai_conversations_fts USING fts5(
+        user_id, user_message, ai_response,
+        content='ai_conversations', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER ai_conversations_fts_insert AFTER INSERT ON ai_conversations BEGIN
+        INSERT INTO ai_conversations_fts(rowid, user_id, user_message, ai_response)
+        VALUES (new.id, new.user_id, new.user_message, new.ai_response);
+    END
+    """,
+    """
+    CREATE TRIGGER ai_conversations_fts_delete AFTER DELETE ON ai_conversations BEGIN
+        INSERT INTO ai_conversations_fts(ai_conversations_fts, rowid, user_id, user_message, ai_response)
+        VALUES ('delete', old.id, old.user_id, old.user_message, old.ai_response);
+    END
+    """,
+    """
+    CREATE TRIGGER ai_conversations_fts_update AFTER UPDATE OF user_id, user_message, ai_response ON ai_conversations BEGIN
+        INSERT INTO ai_conversations_fts(ai_conversations_fts, rowid, user_id, user_message, ai_response)
+        VALUES ('delete', old.id, old.user_id, old.user_message, old.ai_response);
+        INSERT INTO ai_conversations_fts(rowid, user_id, user_message, ai_response)
+        VALUES (new.id, new.user_id, new.user_message, new.ai_response);
+    END
+    """,
+    # Index the rows that already exist
+    "INSERT INTO ai_conversations_fts(ai_conversations_fts) VALUES ('rebuild')",
+]
+
+SQLITE_DOWNGRADE = [
+    "DROP TRIGGER IF EXISTS ai_conversations_fts_update",
+    "DROP TRIGGER IF EXISTS ai_conversations_fts_delete",
+    "DROP TRIGGER IF EXISTS ai_conversations_fts_insert",
+    "DROP TABLE IF EXISTS ai_conversations_fts",
+]
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        for statement in SQLITE_UPGRADE:
+            op.execute(statement)
+    elif dialect == "postgresql":
+        op.execute(
+            "ALTER TABLE ai_conversations ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+            "to_tsvector('simple', coalesce(user_message, '') || ' ' || coalesce(ai_response, ''))"
+            ") STORED"
+        )
+        with op.get_context().autocommit_block():
+            op.execute(
+                "CREATE INDEX CONCURRENTLY ix_ai_conversations_search "
+                "ON ai_conversations USING gin (search_vector)"
+            )
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        for statement in SQLITE_DOWNGRADE:
+            op.execute(statement)
+    elif dialect == "postgresql":
+        with op.get_context().autocommit_block():
+            op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_ai_conversations_search")
+        op.execute("ALTER TABLE ai_conversations DROP COLUMN search_vector")
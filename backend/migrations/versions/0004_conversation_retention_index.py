@@ -0,0 +1,31 @@
+"""conversation retention index
+
+The chat archive job repeatedly takes the oldest turns across all users
+(created_at < cutoff ORDER BY created_at, id); without this index every
+batch would scan ai_conversations.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 16:32:48.120577
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index('ix_ai_conversations_created', 'ai_conversations', ['created_at', 'id'], postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_ai_conversations_created', table_name='ai_conversations', postgresql_concurrently=True)
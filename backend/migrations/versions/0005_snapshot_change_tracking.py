@@ -0,0 +1,41 @@
+"""snapshot change tracking
+
+transactions.date is the client-set business date, so the snapshot job
+cannot use it to find changes: a backdated insert is older than the last
+snapshot. transactions.updated_at records when the row was written (UTC,
+set by the model), and financial_snapshots.transaction_count records how
+many rows a snapshot was computed from, so deletions are detected too.
+
+Existing rows are stamped with the migration time, so every user is
+recomputed once by the next incremental run.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 17:12:40.581903
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # SQLite cannot add a column with a CURRENT_TIMESTAMP default: backfill instead
+    op.add_column('transactions', sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True))
+    op.execute("UPDATE transactions SET updated_at = CURRENT_TIMESTAMP")
+    op.add_column('financial_snapshots', sa.Column('transaction_count', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('financial_snapshots') as batch_op:
+        batch_op.drop_column('transaction_count')
+    with op.batch_alter_table('transactions') as batch_op:
+        batch_op.drop_column('updated_at')
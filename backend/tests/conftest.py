@@ -0,0 +1,81 @@
+import asyncio
+import itertools
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Settings are read at import time: point the app at throwaway storage first
+_TEST_DIR = tempfile.mkdtemp(prefix="zaman-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_TEST_DIR, 'test.db')}")
+os.environ.setdefault("CHAT_ARCHIVE_DIR", os.path.join(_TEST_DIR, "chat_archive"))
+os.environ.setdefault("DATABASE_SEED_DEMO", "false")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def migrated_database():
+    from app.database.migrate import upgrade_database
+    upgrade_database()
+
+
+@pytest.fixture
+def run_async():
+    """Run a coroutine in a fresh event loop; pooled connections belong to that loop"""
+    from app.database.session import dispose_engines
+
+    def run(coroutine):
+        async def main():
+            try:
+                return await coroutine
+            finally:
+                await dispose_engines()
+        return asyncio.run(main())
+
+    return run
+
+
+@pytest.fixture
+def api(migrated_database, run_async):
+    """In-process API call: api("get", "/api/v1/...", params=...) -> httpx.Response"""
+    import httpx
+    from app.main import app
+
+    def request(method, url, **kwargs):
+        async def call():
+            async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+                return await client.request(method, url, **kwargs)
+        return run_async(call())
+
+    return request
+
+
+_user_numbers = itertools.count(1)
+
+
+@pytest.fixture
+def make_user(migrated_database):
+    """Insert a user with a unique email/username and return its id"""
+    from app.database.session import SessionLocal
+    from app.models.user import User
+
+    def create(**fields):
+        number = next(_user_numbers)
+        user = User(**{
+            "email": f"user{number}@test.kz",
+            "username": f"user{number}",
+            "hashed_password": "x",
+            "full_name": f"User {number}",
+            "monthly_income": 500000.0,
+            "monthly_expenses": 300000.0,
+            "is_active": True,
+            **fields
+        })
+        with SessionLocal() as db:
+            db.add(user)
+            db.commit()
+            return user.id
+
+    return create
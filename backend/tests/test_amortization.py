@@ -0,0 +1,89 @@
+import math
+
+import pytest
+
+from app.services.amortization import IslamicAmortizationEngine, amortization_engine
+
+MURABAHA = {"type": "financing", "sharia_principles": ["Мурабаха (продажа с наценкой)"]}
+IJARA = {"type": "financing", "sharia_principles": ["Иджара (аренда с выкупом)"]}
+DEPOSIT = {"type": "deposit", "sharia_principles": ["Мудараба"]}
+
+AMOUNTS = [1_000_000, 7_500_000, 25_000_000]
+TERMS = [1, 12, 61, 240]
+
+
+def test_contract_type_from_principles():
+    assert amortization_engine.contract_type(MURABAHA) == "murabaha"
+    assert amortization_engine.contract_type(IJARA) == "ijara"
+    assert amortization_engine.contract_type(DEPOSIT) is None
+
+
+@pytest.mark.parametrize("amount", AMOUNTS)
+@pytest.mark.parametrize("term", TERMS)
+def test_murabaha_schedule_adds_up(amount, term):
+    table = amortization_engine.murabaha_schedule(amount, term)
+    result = amortization_engine.schedule(MURABAHA, amount, term)
+
+    assert table["principal_share"].sum() == pytest.approx(amount)
+    assert table["remaining_balance"][-1] == pytest.approx(0, abs=1e-6 * amount)
+    assert table["payment"].sum() == pytest.approx(result["total_cost"], abs=0.01)
+    assert table["markup_share"].sum() == pytest.approx(result["total_markup"], abs=0.01)
+    assert sum(row["payment"] for row in result["schedule"]) == pytest.approx(result["total_cost"], abs=0.005 * term)
+    assert len(set(table["payment"])) == 1
+
+
+@pytest.mark.parametrize("amount", AMOUNTS)
+@pytest.mark.parametrize("term", TERMS)
+def test_ijara_schedule_adds_up(amount, term):
+    table = amortization_engine.ijara_schedule(amount, term)
+    result = amortization_engine.schedule(IJARA, amount, term)
+
+    assert table["purchase_share"].sum() == pytest.approx(amount)
+    assert table["remaining_balance"][-1] == pytest.approx(0, abs=1e-6 * amount)
+    assert table["payment"].sum() == pytest.approx(result["total_cost"], abs=0.01)
+    assert table["rental_share"].sum() == pytest.approx(result["total_markup"], abs=0.01)
+    assert sum(row["payment"] for row in result["schedule"]) == pytest.approx(result["total_cost"], abs=0.005 * term)
+
+
+def test_zero_profit_rate_murabaha_is_the_amount_split_evenly():
+    engine = IslamicAmortizationEngine({"murabaha_profit_rate": 0.0})
+    result = engine.schedule(MURABAHA, 1_200_000, 12)
+    assert result["monthly_payment"] == 100_000
+    assert result["total_markup"] == 0
+    assert result["schedule"][-1]["remaining_balance"] == 0
+
+
+@pytest.mark.parametrize("product", [MURABAHA, IJARA])
+def test_pricing_grid_matches_one_off_schedules(product):
+    grid = amortization_engine.pricing_grid(product, AMOUNTS, TERMS)
+    for i, amount in enumerate(AMOUNTS):
+        for j, term in enumerate(TERMS):
+            one_off = amortization_engine.schedule(product, amount, term)
+            assert grid["monthly_payment"][i][j] == pytest.approx(one_off["monthly_payment"], abs=0.01)
+            assert grid["total_cost"][i][j] == pytest.approx(one_off["total_cost"], abs=0.01)
+            assert grid["total_markup"][i][j] == pytest.approx(one_off["total_markup"], abs=0.01)
+
+
+def test_contract_terms_match_the_grid():
+    terms = amortization_engine.contract_terms(["murabaha", "ijara", None], 7_500_000, 61)
+    for position, product in enumerate([MURABAHA, IJARA]):
+        grid = amortization_engine.pricing_grid(product, [7_500_000], [61])
+        assert terms["monthly_payment"][position] == pytest.approx(grid["monthly_payment"][0][0], abs=0.01)
+        assert terms["total_cost"][position] == pytest.approx(grid["total_cost"][0][0], abs=0.01)
+    assert math.isnan(terms["monthly_payment"][2]) and math.isnan(terms["total_cost"][2])
+
+
+@pytest.mark.parametrize("amounts, terms", [([0], [12]), ([1_000_000], [0]), ([-5], [12])])
+def test_non_positive_inputs_are_rejected(amounts, terms):
+    with pytest.raises(ValueError):
+        amortization_engine.pricing_grid(MURABAHA, amounts, terms)
+    with pytest.raises(ValueError):
+        amortization_engine.schedule(IJARA, amounts[0], terms[0])
+
+
+def test_non_financing_products_and_oversized_grids_are_rejected():
+    with pytest.raises(ValueError):
+        amortization_engine.schedule(DEPOSIT, 1_000_000, 12)
+    engine = IslamicAmortizationEngine({"max_pricing_grid_cells": 4})
+    with pytest.raises(ValueError):
+        engine.pricing_grid(MURABAHA, AMOUNTS, TERMS)
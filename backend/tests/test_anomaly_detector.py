@@ -0,0 +1,69 @@
+import pytest
+
+from app.services.anomaly_detector import CategoryStats, SpendingAnomalyDetector
+
+CONFIG = {"ewma_alpha": 0.5, "z_threshold": 3.0, "min_observations": 3, "min_relative_increase": 0.5}
+
+
+def expense(amount, category="food", user_id=1, transaction_id=None):
+    return {"id": transaction_id, "user_id": user_id, "amount": amount, "category": category, "transaction_type": "expense"}
+
+
+def test_ewma_update_with_fixed_numbers():
+    stats = CategoryStats()
+    for amount in (100, 200, 100):
+        stats.update(amount, 0.5)
+
+    # 100 -> mean 100, var 0; 200 -> mean 150, var 2500; 100 -> mean 125, var 1875
+    assert stats.count == 3
+    assert stats.mean == pytest.approx(125.0)
+    assert stats.variance == pytest.approx(1875.0)
+    assert stats.std == pytest.approx(1875.0 ** 0.5)
+    assert stats.last_amount == 100
+
+
+def test_no_anomaly_before_min_observations():
+    detector = SpendingAnomalyDetector(CONFIG)
+    assert detector.observe(expense(100)) is None
+    assert detector.observe(expense(100)) is None
+    # Third observation: only two are known, still warming up
+    assert detector.observe(expense(10_000)) is None
+
+
+def test_threshold_and_relative_increase():
+    detector = SpendingAnomalyDetector(CONFIG)
+    for amount in (100, 110, 90, 100):
+        assert detector.observe(expense(amount)) is None
+
+    mean = detector.get_category_stats(1)["food"]["mean"]
+    # Above 3 sigma but not 50% above the mean
+    assert detector.observe(expense(mean * 1.4)) is None
+
+    anomaly = detector.observe(expense(1_000, transaction_id=42))
+    assert anomaly["transaction_id"] == 42
+    assert anomaly["z_score"] >= CONFIG["z_threshold"]
+    assert anomaly["detected_at"].tzinfo is not None
+    assert detector.get_anomalies(1) == [anomaly]
+
+
+def test_income_and_other_users_are_ignored():
+    detector = SpendingAnomalyDetector(CONFIG)
+    assert detector.observe({"user_id": 1, "amount": 10 ** 6, "transaction_type": "income"}) is None
+    for amount in (100, 100, 100):
+        detector.observe(expense(amount))
+    assert detector.observe(expense(1_000, user_id=2)) is None
+    assert detector.get_category_stats(2)["food"]["count"] == 1
+
+
+def test_warm_up_runs_once_per_user():
+    detector = SpendingAnomalyDetector(CONFIG)
+    history = [expense(amount) for amount in (100, 100, 100, 5_000)]
+
+    assert detector.warm_up(1, history) is True
+    assert detector.warm_up(1, history) is False
+    assert detector.is_warmed_up(1)
+    assert detector.get_category_stats(1)["food"]["count"] == 4
+    assert len(detector.get_anomalies(1)) == 1
+
+    detector.reset(1)
+    assert not detector.is_warmed_up(1) and detector.get_anomalies(1) == []
@@ -0,0 +1,178 @@
+import itertools
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.crud import financial_crud
+from app.database.session import AsyncSessionLocal, SessionLocal
+from app.models.financial import FinancialGoal, Transaction
+from app.models.user import User
+from app.routers import analysis
+
+AUTH = "/api/v1/auth"
+GOALS = "/api/v1/goals/"
+ANALYSIS = "/api/v1/analysis"
+
+_registrations = itertools.count(1)
+
+
+def registration(**fields):
+    number = next(_registrations)
+    return {
+        "email": f"register{number}@test.kz",
+        "username": f"register{number}",
+        "password": "secret-pass",
+        "full_name": "Айгерим",
+        "monthly_income": 600000,
+        "monthly_expenses": 350000,
+        **fields
+    }
+
+
+def goal(**fields):
+    return {"goal_name": "Хадж", "target_amount": 2_400_000, "timeline_months": 24, "category": "hajj", "priority": "high", "islamic_importance": "fard", **fields}
+
+
+# --- auth / profile ---
+
+def test_register_then_login(api):
+    data = registration()
+    response = api("post", f"{AUTH}/register", json=data)
+    assert response.status_code == 200
+    user = response.json()
+    assert user["email"] == data["email"] and user["monthly_income"] == 600000
+    assert "password" not in user and "hashed_password" not in user
+    with SessionLocal() as db:
+        assert db.get(User, user["id"]).hashed_password not in ("", data["password"])
+
+    token = api("post", f"{AUTH}/token", data={"username": data["username"], "password": data["password"]})
+    assert token.status_code == 200
+    assert token.json()["user_id"] == user["id"] and token.json()["access_token"]
+    assert api("post", f"{AUTH}/token", data={"username": data["email"], "password": data["password"]}).status_code == 200
+    assert api("post", f"{AUTH}/token", data={"username": data["username"], "password": "wrong"}).status_code == 401
+
+
+def test_register_rejects_duplicates(api):
+    data = registration()
+    assert api("post", f"{AUTH}/register", json=data).status_code == 200
+    assert api("post", f"{AUTH}/register", json={**registration(), "email": data["email"]}).status_code == 400
+    assert api("post", f"{AUTH}/register", json={**registration(), "username": data["username"]}).status_code == 400
+    assert api("post", f"{AUTH}/register", json=registration(risk_profile="reckless")).status_code == 422
+
+
+def test_profile_read_and_update(api, make_user):
+    user_id = make_user()
+    profile = api("get", f"{AUTH}/profile", params={"user_id": user_id}).json()
+    assert profile["id"] == user_id and profile["monthly_income"] == 500000
+
+    response = api("put", f"{AUTH}/profile", params={"user_id": user_id}, json={"age": 34, "risk_profile": "conservative"})
+    assert response.status_code == 200
+    assert response.json()["age"] == 34 and response.json()["risk_profile"] == "conservative"
+    assert response.json()["updated_at"] is not None
+    assert api("get", f"{AUTH}/profile", params={"user_id": user_id}).json()["risk_profile"] == "conservative"
+
+    assert api("put", f"{AUTH}/profile", params={"user_id": user_id}, json={"risk_profile": "reckless"}).status_code == 422
+    assert api("get", f"{AUTH}/profile", params={"user_id": 10**9}).status_code == 404
+    assert api("put", f"{AUTH}/profile", params={"user_id": 10**9}, json={"age": 30}).status_code == 404
+
+
+def test_financial_data_and_summary(api, make_user):
+    user_id = make_user()
+    response = api("put", f"{AUTH}/financial-data", params={"user_id": user_id}, json={"monthly_income": 400000, "monthly_expenses": 300000})
+    assert response.status_code == 200
+    summary = response.json()
+    assert summary["monthly_savings"] == 100000
+    assert summary["savings_rate"] == pytest.approx(0.25)
+    assert summary["financial_health"] == "excellent"
+    assert summary["zakat_amount"] == 0
+
+    assert api("get", f"{AUTH}/financial-summary", params={"user_id": user_id}).json()["monthly_income"] == 400000
+    with SessionLocal() as db:
+        assert db.get(User, user_id).last_financial_update is not None
+    assert api("get", f"{AUTH}/financial-summary", params={"user_id": 10**9}).status_code == 404
+
+
+# --- goals ---
+
+def test_goal_crud(api, make_user):
+    user_id, other_user = make_user(), make_user()
+    response = api("post", GOALS, params={"user_id": user_id}, json=goal())
+    assert response.status_code == 200
+    created = response.json()
+    assert created["monthly_saving"] == pytest.approx(100000)
+    assert created["progress_percentage"] == 0
+
+    api("post", GOALS, params={"user_id": user_id}, json=goal(goal_name="Квартира", target_amount=12_000_000, timeline_months=60))
+    listed = api("get", GOALS, params={"user_id": user_id}).json()
+    assert [item["goal_name"] for item in listed] == ["Хадж", "Квартира"]
+
+    assert api("get", f"{GOALS}{created['id']}", params={"user_id": user_id}).json()["goal_name"] == "Хадж"
+    assert api("get", f"{GOALS}{created['id']}", params={"user_id": other_user}).status_code == 404
+    assert api("get", GOALS, params={"user_id": other_user}).json() == []
+    assert api("post", GOALS, params={"user_id": 10**9}, json=goal()).status_code == 404
+    assert api("post", GOALS, params={"user_id": user_id}, json={"goal_name": "Без суммы"}).status_code == 422
+
+
+def test_goal_progress_uses_saved_amount(api, make_user):
+    user_id = make_user()
+    with SessionLocal() as db:
+        record = FinancialGoal(
+            user_id=user_id, goal_name="Образование", target_amount=1_000_000, current_amount=250_000,
+            timeline_months=10, category="education", priority="medium", islamic_importance="sunnah", is_completed=False
+        )
+        db.add(record)
+        db.commit()
+        goal_id = record.id
+    projected = api("get", f"{GOALS}{goal_id}", params={"user_id": user_id}).json()
+    assert projected["progress_percentage"] == pytest.approx(25)
+    assert projected["monthly_saving"] == pytest.approx(75000)
+
+
+# --- transactions and analysis ---
+
+def test_transactions_are_persisted_and_listed(api, make_user):
+    user_id = make_user()
+    response = api("post", f"{ANALYSIS}/transactions", json={"user_id": user_id, "amount": 12000, "category": "food", "description": "Магнум"})
+    assert response.status_code == 200
+    created = response.json()["transaction"]
+    assert created["id"] and created["is_halal"] is True
+    assert datetime.fromisoformat(created["date"]) <= datetime.now(timezone.utc).replace(tzinfo=None) + timedelta(seconds=5)
+
+    listed = api("get", f"{ANALYSIS}/transactions", params={"user_id": user_id}).json()["transactions"]
+    assert [item["id"] for item in listed] == [created["id"]]
+
+    assert api("post", f"{ANALYSIS}/transactions", json={"user_id": user_id, "amount": 0}).status_code == 422
+    assert api("post", f"{ANALYSIS}/transactions", json={"user_id": 10**9, "amount": 100}).status_code == 404
+
+
+def test_time_ranges_filter_on_dates(make_user, run_async):
+    user_id = make_user()
+    now = datetime.now(timezone.utc)
+    with SessionLocal() as db:
+        db.add_all([
+            Transaction(user_id=user_id, amount=amount, category="food", description="", transaction_type="expense", date=now - timedelta(days=days))
+            for amount, days in [(1000, 1), (2000, 20), (4000, 200), (8000, 500)]
+        ])
+        db.commit()
+
+    async def amounts(time_range):
+        async with AsyncSessionLocal() as db:
+            transactions = await financial_crud.get_transactions(db, user_id, since=analysis._time_range_start(time_range))
+        return sorted(transaction["amount"] for transaction in transactions)
+
+    assert run_async(amounts("week")) == [1000]
+    assert run_async(amounts("month")) == [1000, 2000]
+    assert run_async(amounts("year")) == [1000, 2000, 4000]
+    assert run_async(amounts("all")) == [1000, 2000, 4000, 8000]
+
+
+def test_financial_metrics_from_live_data(api, make_user):
+    user_id = make_user()
+    for amount, transaction_type in [(400000, "income"), (100000, "expense")]:
+        api("post", f"{ANALYSIS}/transactions", json={"user_id": user_id, "amount": amount, "transaction_type": transaction_type, "category": "salary"})
+    metrics = api("get", f"{ANALYSIS}/financial-metrics", params={"user_id": user_id}).json()
+    # income comes from the profile, expenses from the recorded transactions
+    assert metrics["monthly_income"] == 500000
+    assert metrics["monthly_expenses"] == 100000
+    assert metrics["monthly_savings"] == 400000
+    assert api("get", f"{ANALYSIS}/financial-metrics", params={"user_id": 10**9}).status_code == 404
@@ -0,0 +1,116 @@
+import json
+import os
+import random
+
+import pytest
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.models.product import BankProduct, ProductCatalogFile
+from app.services import catalog_store as catalog_store_module
+from app.services.catalog_store import LoadedCatalog, ProductCatalogStore
+from benchmarks.product_catalog import load_products, synthetic_products
+
+PRODUCTS_URL = "/api/v1/api/v1/products/"
+
+
+def response_body(content):
+    """What FastAPI sends for a route returning content through its response_model"""
+    return JSONResponse(content=jsonable_encoder(content)).body
+
+
+def write_catalog(path, version, products, mtime):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"version": version, "products": products}, f, ensure_ascii=False)
+    os.utime(path, (mtime, mtime))
+
+
+@pytest.fixture
+def catalog_file(tmp_path):
+    path = str(tmp_path / "products.json")
+    write_catalog(path, "v1", load_products(), mtime=1_000_000)
+    return path
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(catalog_store_module.time, "monotonic", lambda: now[0])
+    return now
+
+
+def renamed(products, product_id, name):
+    return [{**product, "name": name} if product["id"] == product_id else product for product in products]
+
+
+def test_pre_encoded_bytes_match_json_responses():
+    for products in (load_products(), synthetic_products(random.Random(1), 200)):
+        models = [BankProduct(**product) for product in products]
+        loaded = LoadedCatalog(ProductCatalogFile(version="v", products=models))
+
+        for model in models:
+            assert loaded.product_bytes[model.id] == response_body(model)
+        assert loaded.all_bytes == response_body(models)
+        for product_type, body in loaded.type_bytes.items():
+            assert body == response_body([model for model in models if model.type == product_type])
+        assert loaded.encode_products([]) == response_body([])
+
+
+def test_routes_send_the_pre_encoded_bytes(api):
+    models = [BankProduct(**product) for product in load_products()]
+    assert api("get", PRODUCTS_URL).content == response_body(models)
+    assert api("get", PRODUCTS_URL, params={"type": "financing"}).content == \
+        response_body([model for model in models if model.type == "financing"])
+    assert api("get", PRODUCTS_URL, params={"type": "no such type"}).content == b"[]"
+    assert api("get", f"{PRODUCTS_URL}2").content == response_body(models[1])
+
+
+def test_changed_mtime_triggers_a_reload(catalog_file, clock):
+    store = ProductCatalogStore(catalog_file, reload_seconds=30)
+    first = store.current
+    assert first.version == "v1"
+
+    write_catalog(catalog_file, "v2", renamed(load_products(), 2, "Мурабаха 2.0"), mtime=1_000_100)
+    clock[0] = 10.0
+    assert store.current is first  # checked at most once per reload_seconds
+
+    clock[0] = 31.0
+    second = store.current
+    assert second is not first and second.version == "v2"
+    assert store.catalog.get(2)["name"] == "Мурабаха 2.0"
+    assert json.loads(second.product_bytes[2])["name"] == "Мурабаха 2.0"
+    assert store.recommender.catalog is second.catalog
+
+
+def test_unchanged_mtime_keeps_the_loaded_version(catalog_file, clock):
+    store = ProductCatalogStore(catalog_file, reload_seconds=0)
+    first = store.current
+    write_catalog(catalog_file, "v2", load_products(), mtime=1_000_000)
+    clock[0] = 100.0
+    assert store.current is first
+    assert store.reload().version == "v2"  # forced reload ignores mtime
+
+
+def test_invalid_file_keeps_the_working_version(catalog_file, clock):
+    store = ProductCatalogStore(catalog_file, reload_seconds=0)
+    first = store.current
+
+    duplicate_ids = load_products() + [load_products()[0]]
+    write_catalog(catalog_file, "broken", duplicate_ids, mtime=1_000_100)
+    clock[0] = 1.0
+    assert store.current is first
+
+    with open(catalog_file, "w", encoding="utf-8") as f:
+        f.write("{not json")
+    os.utime(catalog_file, (1_000_200, 1_000_200))
+    clock[0] = 2.0
+    assert store.current is first
+
+    write_catalog(catalog_file, "v3", load_products(), mtime=1_000_300)
+    clock[0] = 3.0
+    assert store.current.version == "v3"
+
+
+def test_missing_file_on_first_load_raises(tmp_path):
+    with pytest.raises(OSError):
+        ProductCatalogStore(str(tmp_path / "missing.json"), reload_seconds=0).current
@@ -0,0 +1,123 @@
+import os
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func, insert, select
+
+from app.crud import financial_crud
+from app.database.session import AsyncSessionLocal, SessionLocal
+from app.jobs import chat_archive as archive_job
+from app.models.financial import AIConversation
+from app.services.chat_archive import ChatArchive
+
+
+def turns(user_id, count, start=datetime(2025, 1, 30), first_id=1, context=None):
+    return [
+        {
+            "id": first_id + i,
+            "user_id": user_id,
+            "user_message": f"q{first_id + i}",
+            "ai_response": f"a{first_id + i}",
+            "context": context,
+            "message_type": "text",
+            "created_at": start + timedelta(days=i)
+        }
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def archive(tmp_path):
+    return ChatArchive({"archive_dir": str(tmp_path)})
+
+
+def page_ids(archive, user_id, limit=100, before=None):
+    page, has_more = archive.read_page(user_id, limit, before)
+    return [turn["id"] for turn in page], has_more
+
+
+def test_append_and_read_newest_first(archive):
+    assert archive.append(turns(7, 5)) == 5
+    assert archive.months() == ["2025-02", "2025-01"]
+    assert archive.archived_count(7) == 5
+    assert page_ids(archive, 7) == ([5, 4, 3, 2, 1], False)
+    assert page_ids(archive, 7, limit=2) == ([5, 4], True)
+
+    before = (datetime(2025, 2, 1), 3)
+    assert page_ids(archive, 7, before=before) == ([2, 1], False)
+    assert page_ids(archive, 8) == ([], False)
+
+
+def test_context_is_stored_once_per_hash(archive):
+    archive.append(turns(7, 3, context={"page": "goals"}))
+    page, _ = archive.read_page(7, 10, include_context=True)
+    assert [turn["context"] for turn in page] == [{"page": "goals"}] * 3
+    assert "context" not in archive.read_page(7, 10)[0][0]
+
+
+def test_append_is_idempotent(archive):
+    rows = turns(7, 4)
+    assert archive.append(rows) == 4
+    assert archive.append(rows) == 0
+    assert archive.archived_count(7) == 4
+    assert page_ids(archive, 7)[0] == [4, 3, 2, 1]
+
+
+def test_rerun_repairs_index_lost_in_a_crash(archive):
+    rows = turns(7, 4)
+    archive.append(rows)
+    for month in archive.months():
+        os.remove(os.path.join(archive.archive_dir, month, "index.json"))  # crash before the index was written
+
+    assert page_ids(archive, 7)[0] == [4, 3, 2, 1]
+    assert archive.append(rows) == 0
+    assert archive.archived_count(7) == 4
+
+
+def test_delete_user_does_not_trust_the_index(archive):
+    archive.append(turns(7, 4) + turns(9, 2, first_id=100))
+    for month in archive.months():
+        os.remove(os.path.join(archive.archive_dir, month, "index.json"))
+
+    assert archive.delete_user(7) == 4
+    assert page_ids(archive, 7) == ([], False)
+    assert not any(os.path.exists(archive._user_file(month, 7)) for month in archive.months())
+    assert page_ids(archive, 9)[0] == [101, 100]
+
+
+def test_truncated_member_keeps_earlier_turns(archive):
+    archive.append(turns(7, 2, start=datetime(2025, 3, 1)))
+    with open(archive._user_file("2025-03", 7), "ab") as f:
+        f.write(b"\x1f\x8b\x08\x00partial")
+    assert page_ids(archive, 7)[0] == [2, 1]
+
+
+@pytest.mark.usefixtures("migrated_database")
+def test_job_moves_old_turns_and_history_reads_through(archive, run_async, monkeypatch):
+    user_id = 3001
+    now = datetime.now()
+    with SessionLocal() as db:
+        db.execute(insert(AIConversation), [
+            {"user_id": user_id, "user_message": f"m{days}", "ai_response": "a", "message_type": "text", "created_at": now - timedelta(days=days)}
+            for days in (100, 60, 40, 1)
+        ])
+        db.commit()
+
+    result = archive_job.run(retention_days=30, batch_size=2, archive=archive)
+    assert result["turns_moved"] == 3
+    assert archive.archived_count(user_id) == 3
+
+    async def history():
+        async with AsyncSessionLocal() as db:
+            pages, cursor = [], None
+            while True:
+                page, cursor = await financial_crud.get_conversation_history_page(db, user_id, 2, cursor)
+                pages.append([turn["user_message"] for turn in page])
+                if cursor is None:
+                    return pages
+
+    monkeypatch.setattr(financial_crud, "chat_archive", archive)
+    assert run_async(history()) == [["m1", "m40"], ["m60", "m100"]]
+
+    with SessionLocal() as db:
+        assert db.scalar(select(func.count()).select_from(AIConversation).where(AIConversation.user_id == user_id)) == 1
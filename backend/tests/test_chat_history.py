@@ -0,0 +1,115 @@
+import time
+
+import pytest
+from sqlalchemy import func, select
+
+from app.database.session import AsyncSessionLocal
+from app.models.financial import AIConversation
+from app.services.chat_history import ChatHistoryWriter
+
+pytestmark = pytest.mark.usefixtures("migrated_database")
+
+
+async def stored_messages(user_id):
+    async with AsyncSessionLocal() as db:
+        result = await db.scalars(
+            select(AIConversation.user_message)
+            .where(AIConversation.user_id == user_id)
+            .order_by(AIConversation.created_at, AIConversation.id)
+        )
+        return list(result)
+
+
+def test_queued_messages_are_written_in_batches(run_async):
+    writer = ChatHistoryWriter({"batch_size": 4, "flush_interval_seconds": 0.05})
+    batches = []
+    write_batch = writer._write_batch
+
+    async def tracked_write(batch):
+        batches.append(len(batch))
+        await write_batch(batch)
+
+    async def scenario():
+        writer._write_batch = tracked_write
+        writer.start()
+        for i in range(10):
+            await writer.record(1001, f"q{i}", f"a{i}")
+        await writer.flush_user(1001)
+        messages = await stored_messages(1001)
+        await writer.stop()
+        return messages
+
+    assert run_async(scenario()) == [f"q{i}" for i in range(10)]
+    assert sum(batches) == 10 and max(batches) <= 4
+
+
+def test_flush_does_not_wait_for_flush_interval(run_async):
+    writer = ChatHistoryWriter({"flush_interval_seconds": 30})
+
+    async def scenario():
+        writer.start()
+        await writer.record(1002, "q", "a")
+        started = time.monotonic()
+        await writer.flush()
+        elapsed = time.monotonic() - started
+        await writer.stop()
+        return elapsed, await stored_messages(1002)
+
+    elapsed, messages = run_async(scenario())
+    assert elapsed < 5
+    assert messages == ["q"]
+
+
+def test_failed_write_is_retried(run_async):
+    writer = ChatHistoryWriter({"flush_interval_seconds": 0.01, "retry_backoff_seconds": 0})
+    attempts = []
+    write_batch = writer._write_batch
+
+    async def flaky_write(batch):
+        attempts.append(len(batch))
+        if len(attempts) < 3:
+            raise OSError("database is locked")
+        await write_batch(batch)
+
+    async def scenario():
+        writer._write_batch = flaky_write
+        writer.start()
+        await writer.record(1003, "q", "a")
+        await writer.flush()
+        await writer.stop()
+        return await stored_messages(1003)
+
+    assert run_async(scenario()) == ["q"]
+    assert attempts == [1, 1, 1]
+
+
+def test_batch_is_dropped_after_last_attempt(run_async):
+    writer = ChatHistoryWriter({"flush_interval_seconds": 0.01, "retry_backoff_seconds": 0, "write_attempts": 2})
+    attempts = []
+
+    async def failing_write(batch):
+        attempts.append(len(batch))
+        raise OSError("disk full")
+
+    async def scenario():
+        writer._write_batch = failing_write
+        writer.start()
+        await writer.record(1004, "q", "a")
+        await writer.flush_user(1004)
+        pending = dict(writer._pending)
+        await writer.stop()
+        return pending
+
+    assert run_async(scenario()) == {}
+    assert attempts == [1, 1]
+
+
+def test_record_writes_directly_without_background_task(run_async):
+    writer = ChatHistoryWriter()
+
+    async def scenario():
+        await writer.record(1005, "q", "a", context={"page": "goals"})
+        async with AsyncSessionLocal() as db:
+            return await db.scalar(select(func.count()).select_from(AIConversation).where(AIConversation.user_id == 1005))
+
+    assert run_async(scenario()) == 1
@@ -0,0 +1,117 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import insert, update
+
+from app.crud import financial_crud
+from app.database.session import AsyncSessionLocal
+from app.models.financial import AIConversation
+
+pytestmark = pytest.mark.usefixtures("migrated_database")
+
+
+async def add_turns(user_id, turns):
+    created_at = datetime(2026, 1, 1)
+    async with AsyncSessionLocal() as db:
+        await db.execute(insert(AIConversation), [
+            {
+                "user_id": user_id,
+                "user_message": user_message,
+                "ai_response": ai_response,
+                "message_type": "text",
+                "created_at": created_at + timedelta(minutes=i)
+            }
+            for i, (user_message, ai_response) in enumerate(turns)
+        ])
+        await db.commit()
+
+
+async def search(user_id, query, limit=20, cursor=None):
+    async with AsyncSessionLocal() as db:
+        return await financial_crud.search_conversations(db, user_id, query, limit, cursor)
+
+
+def messages(results):
+    return [result["user_message"] for result in results]
+
+
+def test_search_terms_are_normalized():
+    assert financial_crud.search_terms("Накопления, НАКОПЛЕНИЯ и хадж 2026!") == ["накопления", "хадж", "2026"]
+    assert financial_crud.search_terms("? a") == []
+
+
+def test_better_matches_rank_first(run_async):
+    async def scenario():
+        await add_turns(2001, [
+            ("погода", "сегодня солнечно"),
+            ("ипотека", "иджара вместо ипотеки"),
+            ("иджара", "иджара и иджара: аренда с выкупом, иджара"),
+        ])
+        return await search(2001, "иджара")
+
+    results, cursor = run_async(scenario())
+    assert messages(results) == ["иджара", "ипотека"]
+    assert results[0]["score"] > results[1]["score"]
+    assert "иджара" in results[0]["snippet"].lower()
+    assert cursor is None
+
+
+def test_prefix_and_case_insensitive_match(run_async):
+    async def scenario():
+        await add_turns(2002, [("Как начать НАКОПЛЕНИЯ?", "Откладывайте 20% дохода")])
+        return await search(2002, "накоп")
+
+    results, _ = run_async(scenario())
+    assert messages(results) == ["Как начать НАКОПЛЕНИЯ?"]
+
+
+def test_search_is_limited_to_the_user(run_async):
+    async def scenario():
+        await add_turns(2003, [("zqxmarker первый", "ответ")])
+        await add_turns(2004, [("zqxmarker второй", "ответ")])
+        own, _ = await search(2003, "zqxmarker")
+        everyone, _ = await search(None, "zqxmarker")
+        return own, everyone
+
+    own, everyone = run_async(scenario())
+    assert [result["user_id"] for result in own] == [2003]
+    assert sorted(result["user_id"] for result in everyone) == [2003, 2004]
+
+
+def test_pages_cover_every_match_once(run_async):
+    async def scenario():
+        await add_turns(2005, [(f"вопрос {i} про закят", "закят " * (i % 3 + 1)) for i in range(7)])
+        expected, _ = await search(2005, "закят", limit=20)
+        pages, cursor = [], None
+        while True:
+            page, cursor = await search(2005, "закят", limit=3, cursor=cursor)
+            pages.append(page)
+            if cursor is None:
+                return expected, pages
+
+    expected, pages = run_async(scenario())
+    assert [len(page) for page in pages] == [3, 3, 1]
+    assert [result["conversation_id"] for page in pages for result in page] == [result["conversation_id"] for result in expected]
+
+
+def test_index_follows_updates_and_deletes(run_async):
+    async def scenario():
+        await add_turns(2006, [("садака", "ответ про садака")])
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(AIConversation).where(AIConversation.user_id == 2006).values(user_message="вакф", ai_response="ответ про вакф")
+            )
+            await db.commit()
+        after_update = (messages((await search(2006, "садака"))[0]), messages((await search(2006, "вакф"))[0]))
+        async with AsyncSessionLocal() as db:
+            await financial_crud.delete_conversations(db, 2006)
+        return after_update, (await search(2006, "вакф"))[0]
+
+    (old_term, new_term), after_delete = run_async(scenario())
+    assert old_term == [] and new_term == ["вакф"]
+    assert after_delete == []
+
+
+def test_invalid_cursor_is_rejected(run_async):
+    with pytest.raises(ValueError):
+        run_async(search(2007, "закят", cursor="not-a-cursor"))
@@ -0,0 +1,94 @@
+import pytest
+from sqlalchemy import delete, event, insert, select, text, update
+from sqlalchemy.exc import OperationalError
+
+from app.core.config import settings
+from app.database import session as database
+from app.models.financial import Transaction
+
+pytestmark = pytest.mark.skipif(
+    not database.sqlite_read_write_split, reason="read/write split applies to file-backed SQLite only"
+)
+
+
+@pytest.fixture
+def executed(migrated_database):
+    """Record (engine, statement) for every statement sent by the async writer and read engines"""
+    statements = []
+    listeners = []
+    for name, bind in (("writer", database.async_engine.sync_engine), ("reader", database.async_read_engine.sync_engine)):
+        def record(conn, cursor, statement, parameters, context, executemany, name=name):
+            statements.append((name, statement.split()[0].upper()))
+        event.listen(bind, "before_cursor_execute", record)
+        listeners.append((bind, record))
+    yield statements
+    for bind, record in listeners:
+        event.remove(bind, "before_cursor_execute", record)
+
+
+def test_get_bind_routes_selects_to_the_read_pool(migrated_database):
+    session = database.AsyncSessionLocal().sync_session
+    reader, writer = database.async_read_engine.sync_engine, database.async_engine.sync_engine
+    assert reader is not writer
+
+    assert session.get_bind(clause=select(Transaction)) is reader
+    assert session.get_bind(clause=text("SELECT 1")) is reader
+    assert session.get_bind(clause=insert(Transaction)) is writer
+    assert session.get_bind(clause=update(Transaction).values(amount=1)) is writer
+    assert session.get_bind(clause=delete(Transaction)) is writer
+    assert session.get_bind(mapper=Transaction.__mapper__) is writer  # bulk ORM insert asks by mapper only
+
+
+def test_flush_and_commit_use_the_writer_and_reads_use_the_pool(executed, make_user, run_async):
+    user_id = make_user()
+
+    async def write_then_read():
+        async with database.AsyncSessionLocal() as db:
+            db.add(Transaction(user_id=user_id, amount=10, category="food", description="", transaction_type="expense"))
+            await db.commit()
+            executed.append(("--", "COMMITTED"))
+            rows = (await db.scalars(select(Transaction).where(Transaction.user_id == user_id))).all()
+            await db.execute(update(Transaction).where(Transaction.user_id == user_id).values(amount=20))
+            await db.commit()
+            return rows
+
+    assert len(run_async(write_then_read())) == 1
+    boundary = executed.index(("--", "COMMITTED"))
+    assert ("writer", "INSERT") in executed[:boundary]
+    assert all(name == "writer" for name, _ in executed[:boundary])
+    assert ("reader", "SELECT") in executed[boundary:]
+    assert ("writer", "UPDATE") in executed[boundary:]
+    assert ("reader", "UPDATE") not in executed
+
+
+def test_file_database_runs_in_wal_mode(migrated_database, run_async):
+    assert settings.sqlite_file_database
+    with database.engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == settings.SQLITE["pragmas"]["busy_timeout"]
+
+    async def pragmas(bind):
+        async with bind.connect() as conn:
+            return {
+                name: (await conn.execute(text(f"PRAGMA {name}"))).scalar()
+                for name in ("journal_mode", "query_only", "foreign_keys")
+            }
+
+    assert run_async(pragmas(database.async_engine)) == {"journal_mode": "wal", "query_only": 0, "foreign_keys": 1}
+    assert run_async(pragmas(database.async_read_engine)) == {"journal_mode": "wal", "query_only": 1, "foreign_keys": 1}
+
+
+def test_read_pool_connections_cannot_write(migrated_database, run_async):
+    async def write_through_reader():
+        async with database.async_read_engine.connect() as conn:
+            await conn.execute(text("DELETE FROM transactions WHERE id = -1"))
+
+    with pytest.raises(OperationalError, match="readonly"):
+        run_async(write_through_reader())
+
+
+def test_writer_pool_is_a_single_connection(migrated_database):
+    pool = database.async_engine.sync_engine.pool
+    assert pool.size() == 1 and pool._max_overflow == 0
+    assert database.async_read_engine.sync_engine.pool.size() == settings.SQLITE["read_pool_size"]
@@ -0,0 +1,118 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.crud import financial_crud
+from app.database.session import AsyncSessionLocal, SessionLocal
+from app.jobs import financial_snapshots as job
+from app.models.financial import FinancialSnapshot, Transaction
+from app.models.user import User
+
+BUDGET_URL = "/api/v1/analysis/budget-recommendations"
+
+
+def stale_user_ids(*user_ids):
+    with SessionLocal() as db:
+        stale = set(job._stale_user_ids(db, full=False))
+    return [user_id for user_id in user_ids if user_id in stale]
+
+
+def add_transaction(user_id, amount=1000, days_ago=0):
+    with SessionLocal() as db:
+        db.add(Transaction(
+            user_id=user_id, amount=amount, category="food", description="",
+            transaction_type="expense", date=datetime.now(timezone.utc) - timedelta(days=days_ago)
+        ))
+        db.commit()
+
+
+def snapshot_row(user_id):
+    with SessionLocal() as db:
+        return db.query(FinancialSnapshot).filter(FinancialSnapshot.user_id == user_id).one_or_none()
+
+
+@pytest.fixture
+def users(make_user):
+    user_ids = [make_user() for _ in range(3)]
+    add_transaction(user_ids[0])
+    add_transaction(user_ids[0], days_ago=3)
+    job.run(full=True, max_workers=1)
+    return user_ids
+
+
+def test_full_run_leaves_nothing_stale(users):
+    assert stale_user_ids(*users) == []
+    assert snapshot_row(users[0]).transaction_count == 2
+    assert snapshot_row(users[1]).transaction_count == 0
+    assert job.run(max_workers=1)["users_recomputed"] == 0
+
+
+def test_incremental_run_recomputes_only_changed_users(users):
+    first, second, third = users
+    add_transaction(second, days_ago=400)  # backdated business date, fresh write time
+    with SessionLocal() as db:
+        db.query(Transaction).filter(Transaction.user_id == first).delete()
+        db.commit()
+    assert stale_user_ids(*users) == [first, second]
+
+    result = job.run(max_workers=1)
+    assert result["users_recomputed"] == 2
+    assert stale_user_ids(*users) == []
+    assert snapshot_row(first).transaction_count == 0
+    assert snapshot_row(second).transaction_count == 1
+
+
+def test_profile_change_marks_user_stale(users):
+    with SessionLocal() as db:
+        user = db.get(User, users[2])
+        user.last_financial_update = datetime.now(timezone.utc)
+        db.commit()
+    assert stale_user_ids(*users) == [users[2]]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 500])
+def test_chunks_cover_every_user_once(users, monkeypatch, chunk_size):
+    batches = []
+    write_snapshots = job._write_snapshots
+
+    def record(db, snapshots, computed_at):
+        batches.append([snapshot["user_id"] for snapshot in snapshots])
+        write_snapshots(db, snapshots, computed_at)
+
+    monkeypatch.setattr(job, "_write_snapshots", record)
+    result = job.run(full=True, chunk_size=chunk_size, max_workers=2)
+
+    written = [user_id for batch in batches for user_id in batch]
+    assert all(len(batch) <= chunk_size for batch in batches)
+    assert len(written) == len(set(written)) == result["users_recomputed"]
+    assert set(users) <= set(written)
+
+
+def test_stale_snapshot_is_not_served(users, api, run_async):
+    user_id = users[0]
+
+    async def get_snapshot():
+        async with AsyncSessionLocal() as db:
+            return await financial_crud.get_snapshot(db, user_id)
+
+    assert run_async(get_snapshot()) is not None
+    assert "computed_at" in api("get", BUDGET_URL, params={"user_id": user_id}).json()
+
+    response = api("post", "/api/v1/analysis/transactions", json={"user_id": user_id, "amount": 2500, "category": "food"})
+    assert response.status_code == 200
+    assert run_async(get_snapshot()) is None
+    assert "computed_at" not in api("get", BUDGET_URL, params={"user_id": user_id}).json()
+
+    job.run(max_workers=1)
+    assert run_async(get_snapshot()) is not None
+
+
+def test_profile_update_bypasses_snapshot(users, api):
+    user_id = users[1]
+    assert "computed_at" in api("get", BUDGET_URL, params={"user_id": user_id}).json()
+
+    response = api("put", "/api/v1/auth/financial-data", params={"user_id": user_id}, json={"monthly_income": 800000, "monthly_expenses": 350000})
+    assert response.status_code == 200
+    metrics = api("get", "/api/v1/analysis/financial-metrics", params={"user_id": user_id}).json()
+    assert "computed_at" not in api("get", BUDGET_URL, params={"user_id": user_id}).json()
+    assert metrics["monthly_income"] == 800000
@@ -0,0 +1,86 @@
+import math
+import random
+from datetime import date
+
+import numpy as np
+import pytest
+
+from app.services.financial_calculator import financial_calculator
+
+AS_OF = date(2026, 1, 15)
+
+
+def project(target, current, months, contribution=None):
+    result = financial_calculator.calculate_goals_batch(
+        [target], [current], [months],
+        monthly_contributions=None if contribution is None else [contribution],
+        as_of=AS_OF
+    )
+    completion = np.datetime_as_string(result["projected_completion_date"], unit="D")[0]
+    return float(result["months_to_complete"][0]), completion, float(result["shortfall"][0])
+
+
+def test_goal_funded_on_schedule_completes_on_time():
+    months, completion, shortfall = project(1_000_000, 0, 29, 1_000_000 / 29)
+    assert months == 29
+    assert completion == "2028-06-01"
+    assert shortfall == 0
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_remaining_over_months_is_never_late(seed):
+    rng = random.Random(seed)
+    targets = [rng.uniform(1_000, 50_000_000) for _ in range(200)]
+    currents = [rng.uniform(0, target) for target in targets]
+    timelines = [rng.randint(1, 600) for _ in targets]
+    contributions = [(target - current) / months for target, current, months in zip(targets, currents, timelines)]
+
+    result = financial_calculator.calculate_goals_batch(targets, currents, timelines, contributions, as_of=AS_OF)
+    assert result["months_to_complete"].tolist() == timelines
+    assert not result["shortfall"].any()
+
+
+def test_default_contribution_is_the_required_saving():
+    months, _, shortfall = project(1_000_000, 0, 29)
+    assert (months, shortfall) == (29, 0)
+
+
+@pytest.mark.parametrize("contribution", [0, -5_000])
+def test_zero_or_negative_contribution_never_completes(contribution):
+    months, completion, shortfall = project(120_000, 20_000, 10, contribution)
+    assert math.isinf(months)
+    assert completion == "NaT"
+    assert shortfall == 100_000
+
+
+def test_real_shortfall_is_kept():
+    months, completion, shortfall = project(120_000, 0, 10, 10_000)
+    assert months == 12
+    assert completion == "2027-01-01"
+    assert shortfall == pytest.approx(20_000)
+
+
+def test_zero_timeline_needs_the_whole_remainder_now():
+    result = financial_calculator.calculate_goals_batch([50_000], [10_000], [0], as_of=AS_OF)
+    assert result["monthly_saving"][0] == 40_000
+    assert result["months_to_complete"][0] == 1
+    assert result["shortfall"][0] == 40_000
+
+
+@pytest.mark.parametrize("current", [100_000, 150_000])
+def test_already_funded_goal(current):
+    months, completion, shortfall = project(100_000, current, 12, 0)
+    assert (months, completion, shortfall) == (0, "2026-01-01", 0)
+    goal = financial_calculator.project_goals(
+        [{"target_amount": 100_000, "current_amount": current, "timeline_months": 12}], as_of=AS_OF
+    )[0]
+    assert goal["progress_percentage"] == 100
+    assert goal["months_to_complete"] == 0
+
+
+def test_project_goals_reports_unreachable_goal_as_none():
+    goal = financial_calculator.project_goals(
+        [{"target_amount": 100_000, "current_amount": 0, "timeline_months": 12}], monthly_contributions=[0], as_of=AS_OF
+    )[0]
+    assert goal["months_to_complete"] is None
+    assert goal["projected_completion_date"] is None
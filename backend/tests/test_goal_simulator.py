@@ -0,0 +1,35 @@
+import pytest
+
+from app.core.config import settings
+from app.services.goal_simulator import GoalMonteCarloSimulator, goal_simulator
+
+
+def test_request_cannot_raise_path_cap():
+    params = goal_simulator._params({"n_paths": 10_000_000}, n_goals=1, horizon=12)
+    assert params["n_paths"] == settings.MONTE_CARLO["max_paths"]
+
+
+@pytest.mark.parametrize("key", ["max_paths", "max_cells", "max_timeline_months"])
+def test_limits_are_not_overridable(key):
+    with pytest.raises(ValueError):
+        goal_simulator._params({key: 10 ** 9}, n_goals=1, horizon=12)
+
+
+def test_paths_shrink_to_fit_cell_budget():
+    simulator = GoalMonteCarloSimulator({"max_cells": 1_000_000, "n_paths": 20_000})
+    params = simulator._params(None, n_goals=10, horizon=500)
+    assert params["n_paths"] * 10 * 500 <= 1_000_000
+
+
+def test_horizon_is_clamped():
+    simulator = GoalMonteCarloSimulator({"max_timeline_months": 24, "n_paths": 50})
+    result = simulator.simulate_goals([1e12], [0], [1000], [10 ** 6], seed=1)
+    assert result["probability"].shape == (1,)
+
+
+def test_simulation_is_reproducible_with_seed():
+    goals = [{"goal_name": "hajj", "target_amount": 100_000, "timeline_months": 24}]
+    first = goal_simulator.simulate(goals, [5_000], overrides={"n_paths": 200}, seed=42)
+    second = goal_simulator.simulate(goals, [5_000], overrides={"n_paths": 200}, seed=42)
+    assert first == second
+    assert 0.0 <= first[0]["probability"] <= 1.0
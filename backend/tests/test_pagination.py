@@ -0,0 +1,81 @@
+import base64
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.database.session import SessionLocal
+from app.models.financial import Transaction
+from app.routers import analysis
+from app.services.pagination import decode_cursor, encode_cursor, iter_ndjson
+
+TRANSACTIONS_URL = "/api/v1/analysis/transactions"
+
+
+def test_cursor_round_trip():
+    moment = datetime(2026, 10, 18, 16, 14, 28, 8140)
+    cursor = encode_cursor(moment.isoformat(), 42)
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == [moment.isoformat(), 42]
+    assert decode_cursor(encode_cursor(-1.5, 7)) == [-1.5, 7]
+
+
+@pytest.mark.parametrize("cursor", ["not a cursor!", "%%%", base64.urlsafe_b64encode(b'{"a": 1}').decode(), "bm90IGpzb24"])
+def test_bad_cursor_raises_value_error(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_ndjson_dates_match_json_responses():
+    row = {"id": 1, "date": datetime(2026, 10, 18, 16, 14, 28, 8140), "description": "Закят"}
+    line = b"".join(iter_ndjson([row])).decode("utf-8")
+    assert line.endswith("\n")
+    assert json.loads(line) == {"id": 1, "date": "2026-10-18T16:14:28.008140", "description": "Закят"}
+
+
+@pytest.fixture
+def user_with_transactions(make_user):
+    user_id = make_user()
+    start = datetime(2026, 1, 1)
+    with SessionLocal() as db:
+        db.add_all([
+            Transaction(
+                user_id=user_id, amount=100 + i, category="food", description=f"t{i}",
+                transaction_type="expense", date=start + timedelta(days=i // 2)  # equal dates: id breaks ties
+            )
+            for i in range(7)
+        ])
+        db.commit()
+    return user_id
+
+
+def test_json_pages_follow_the_cursor(api, user_with_transactions):
+    pages, cursor = [], None
+    while True:
+        params = {"user_id": user_with_transactions, "limit": 3, **({"cursor": cursor} if cursor else {})}
+        body = api("get", TRANSACTIONS_URL, params=params).json()
+        pages.append([transaction["description"] for transaction in body["transactions"]])
+        cursor = body["next_cursor"]
+        assert body["has_more"] == (cursor is not None)
+        if cursor is None:
+            break
+    assert pages == [["t6", "t5", "t4"], ["t3", "t2", "t1"], ["t0"]]
+
+
+def test_ndjson_export_streams_page_by_page(api, user_with_transactions, monkeypatch):
+    monkeypatch.setattr(analysis, "EXPORT_PAGE_SIZE", 2)
+    response = api("get", TRANSACTIONS_URL, params={"user_id": user_with_transactions, "format": "ndjson"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["description"] for row in rows] == [f"t{i}" for i in range(6, -1, -1)]
+
+    page = api("get", TRANSACTIONS_URL, params={"user_id": user_with_transactions, "limit": 7}).json()
+    assert rows == page["transactions"]
+
+
+@pytest.mark.parametrize("format", ["json", "ndjson"])
+def test_bad_cursor_is_a_400(api, user_with_transactions, format):
+    response = api("get", TRANSACTIONS_URL, params={"user_id": user_with_transactions, "cursor": "garbage!", "format": format})
+    assert response.status_code == 400
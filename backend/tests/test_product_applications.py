@@ -0,0 +1,81 @@
+import asyncio
+
+import httpx
+import pytest
+from sqlalchemy import func, select
+
+from app.database.session import SessionLocal, warm_up_engines
+from app.main import app
+from app.models.financial import ProductApplicationRecord
+
+APPLY_URL = "/api/v1/api/v1/products/apply"
+
+
+def application(user_id, **fields):
+    return {"product_id": 1, "user_id": user_id, "amount": 100000, "timeline": "12 месяцев", **fields}
+
+
+def stored_rows(user_id):
+    with SessionLocal() as db:
+        return db.scalar(select(func.count()).select_from(ProductApplicationRecord).where(ProductApplicationRecord.user_id == user_id))
+
+
+def submit_concurrently(run_async, requests):
+    """Send (payload, headers) pairs at once from one event loop, as the app does after startup"""
+    async def send_all():
+        await warm_up_engines()
+        async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+            return await asyncio.gather(*(
+                client.post(APPLY_URL, json=payload, headers=headers) for payload, headers in requests
+            ))
+    return run_async(send_all())
+
+
+@pytest.mark.parametrize("concurrency", [2, 8, 20])
+def test_concurrent_retries_create_one_application(make_user, run_async, concurrency):
+    user_id = make_user()
+    responses = submit_concurrently(run_async, [(application(user_id), {"Idempotency-Key": "retry-1"})] * concurrency)
+
+    assert [response.status_code for response in responses] == [200] * concurrency
+    bodies = [response.json() for response in responses]
+    assert len({body["application_id"] for body in bodies}) == 1
+    assert sum(body["message"] == "Application submitted successfully" for body in bodies) == 1
+    assert stored_rows(user_id) == 1
+
+
+def test_sequential_retry_replays_the_application(api, make_user):
+    user_id = make_user()
+    first = api("post", APPLY_URL, json=application(user_id), headers={"Idempotency-Key": "k"}).json()
+    second = api("post", APPLY_URL, json=application(user_id), headers={"Idempotency-Key": "k"}).json()
+    assert second["application_id"] == first["application_id"]
+    assert second["message"] == "Application already submitted"
+    assert stored_rows(user_id) == 1
+
+
+def test_reused_key_with_a_different_payload_conflicts(api, make_user):
+    user_id = make_user()
+    assert api("post", APPLY_URL, json=application(user_id), headers={"Idempotency-Key": "k"}).status_code == 200
+
+    response = api("post", APPLY_URL, json=application(user_id, amount=200000), headers={"Idempotency-Key": "k"})
+    assert response.status_code == 409
+    assert stored_rows(user_id) == 1
+
+
+def test_concurrent_conflicting_payloads_keep_one_application(make_user, run_async):
+    user_id = make_user()
+    requests = [(application(user_id, amount=100000 + i * 1000), {"Idempotency-Key": "race"}) for i in range(6)]
+    responses = submit_concurrently(run_async, requests)
+
+    assert sorted(response.status_code for response in responses) == [200] + [409] * 5
+    assert stored_rows(user_id) == 1
+
+
+def test_keys_are_scoped_per_user_and_optional(api, make_user):
+    first_user, second_user = make_user(), make_user()
+    a = api("post", APPLY_URL, json=application(first_user), headers={"Idempotency-Key": "shared"}).json()
+    b = api("post", APPLY_URL, json=application(second_user), headers={"Idempotency-Key": "shared"}).json()
+    assert a["application_id"] != b["application_id"]
+
+    without_key = [api("post", APPLY_URL, json=application(first_user)).json()["application_id"] for _ in range(2)]
+    assert len(set(without_key)) == 2
+    assert stored_rows(first_user) == 3
@@ -0,0 +1,67 @@
+import itertools
+import random
+
+import pytest
+
+from app.services.product_catalog import ProductCatalog
+from benchmarks.product_catalog import load_products, scan_filter, scan_get, synthetic_products
+
+
+@pytest.fixture(scope="module")
+def products():
+    return synthetic_products(random.Random(7), 300)
+
+
+@pytest.fixture(scope="module")
+def catalog(products):
+    return ProductCatalog(products)
+
+
+def test_get_by_id_matches_a_list_scan(catalog, products):
+    for product_id in [1, 150, 300, 0, 301, -1]:
+        assert catalog.get(product_id) is scan_get(products, product_id)
+
+
+def test_posting_lists_hold_exactly_the_matching_ids(catalog, products):
+    for principle in catalog.principles:
+        assert catalog.ids_for("principle", principle) == {p["id"] for p in products if principle in p["sharia_principles"]}
+    for risk_level in catalog.risk_levels:
+        assert catalog.ids_for("risk_level", risk_level) == {p["id"] for p in products if p["risk_level"] == risk_level}
+    assert catalog.ids_for("type", "no such type") == set()
+
+
+def test_filter_matches_a_list_scan_for_every_combination(catalog, products):
+    values = {
+        "type": [None, *catalog.types],
+        "risk_level": [None, *catalog.risk_levels],
+        "principle": [None, catalog.principles[0], catalog.principles[-1]],
+        "eligibility": [None, catalog.eligibility[0]]
+    }
+    for combination in itertools.product(*values.values()):
+        criteria = dict(zip(values, combination))
+        assert catalog.filter(**criteria) == scan_filter(products, **criteria), criteria
+
+
+def test_filter_with_unknown_value_is_empty(catalog):
+    assert catalog.filter(type=catalog.types[0], principle="no such principle") == []
+    assert catalog.filter() is catalog.products
+
+
+def test_facets_match_the_products(catalog, products):
+    assert sorted(catalog.types) == sorted({p["type"] for p in products})
+    assert catalog.type_counts == {t: sum(p["type"] == t for p in products) for t in catalog.types}
+    assert sorted(catalog.principles) == sorted({v for p in products for v in p["sharia_principles"]})
+    assert sorted(catalog.eligibility) == sorted({v for p in products for v in p["eligibility"]})
+
+
+def test_in_catalog_order_skips_unknown_ids(catalog):
+    assert [p["id"] for p in catalog.in_catalog_order({30, 2, 999, 17})] == [2, 17, 30]
+
+
+def test_real_catalog_indexes():
+    products = load_products()
+    catalog = ProductCatalog(products)
+    assert len(catalog) == len(products)
+    assert all(catalog.get(p["id"]) is p for p in products)
+    financing = catalog.filter(type="financing")
+    assert financing and all(p["type"] == "financing" for p in financing)
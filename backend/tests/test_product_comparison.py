@@ -0,0 +1,96 @@
+import pytest
+
+from app.services.amortization import amortization_engine
+from app.services.product_catalog import ProductCatalog
+from app.services.product_comparison import ATTRIBUTE_FIELDS, ProductComparator
+from benchmarks.product_catalog import load_products
+
+COMPARE_URL = "/api/v1/api/v1/products/compare"
+
+
+@pytest.fixture
+def products():
+    return load_products()
+
+
+@pytest.fixture
+def catalog(products):
+    return ProductCatalog(products, version="v1")
+
+
+@pytest.fixture
+def comparator():
+    return ProductComparator({"comparison_cache_size": 4})
+
+
+def test_matrix_rows_are_aligned_with_the_requested_products(comparator, catalog):
+    comparison = comparator.compare(catalog, [3, 1, 3, 2])
+    assert comparison["product_ids"] == [3, 1, 2]
+    assert comparison["product_names"] == [catalog.get(i)["name"] for i in (3, 1, 2)]
+    for field in ATTRIBUTE_FIELDS:
+        assert comparison["attributes"][field] == [catalog.get(i).get(field) for i in (3, 1, 2)]
+    for feature, flags in comparison["features"].items():
+        assert flags == [feature in catalog.get(i)["features"] for i in (3, 1, 2)]
+    all_features = {feature for i in (3, 1, 2) for feature in catalog.get(i)["features"]}
+    assert set(comparison["features"]) == all_features
+    assert "terms" not in comparison
+
+
+def test_computed_terms_follow_the_amortization_engine(comparator, catalog):
+    comparison = comparator.compare(catalog, [1, 2, 3], amount=5_000_000, term_months=36)
+    terms = comparison["terms"]
+    assert terms["contract_type"] == [None, "murabaha", "ijara"]
+    for position, product_id in enumerate([2, 3], start=1):
+        schedule = amortization_engine.schedule(catalog.get(product_id), 5_000_000, 36)
+        assert terms["monthly_payment"][position] == pytest.approx(schedule["monthly_payment"], abs=0.01)
+        assert terms["total_cost"][position] == pytest.approx(schedule["total_cost"], abs=0.01)
+    assert terms["monthly_payment"][0] is None
+    assert terms["expected_profit"][0] == pytest.approx(5_000_000 * 0.10 * 3)
+    assert terms["expected_profit"][1] is None
+    assert len(terms["within_amount_limits"]) == 3
+
+
+def test_unknown_ids_are_skipped(comparator, catalog):
+    assert comparator.compare(catalog, [999, 2, -1])["product_ids"] == [2]
+    assert comparator.compare(catalog, [999, 1000]) is None
+    assert comparator.compare(catalog, []) is None
+
+
+@pytest.mark.parametrize("amount, term_months", [(0, 12), (-100, 12), (1000, 0), (1000, -3)])
+def test_non_positive_arguments_are_rejected(comparator, catalog, amount, term_months):
+    with pytest.raises(ValueError):
+        comparator.compare(catalog, [1, 2], amount=amount, term_months=term_months)
+
+
+def test_repeated_comparisons_hit_the_cache(comparator, catalog, monkeypatch):
+    builds = []
+    build = comparator._build
+    monkeypatch.setattr(comparator, "_build", lambda *args: builds.append(args[1:]) or build(*args))
+
+    first = comparator.compare(catalog, [1, 2], amount=1_000_000, term_months=12)
+    assert comparator.compare(catalog, [1, 2, 1], amount=1_000_000, term_months=12) is first
+    assert comparator.compare(catalog, [2, 1], amount=1_000_000, term_months=12) is not first
+    assert comparator.compare(catalog, [1, 2], amount=2_000_000, term_months=12) is not first
+    assert len(builds) == 3
+
+    for extra in range(3, 7):
+        comparator.compare(catalog, [extra])
+    assert comparator.compare(catalog, [1, 2], amount=1_000_000, term_months=12) is not first  # evicted (LRU of 4)
+
+
+def test_reloaded_catalog_with_the_same_version_is_not_served_from_cache(comparator, products):
+    old = ProductCatalog(products, version="v1")
+    assert comparator.compare(old, [2])["product_names"] == [products[1]["name"]]
+
+    renamed = [{**product, "name": "Мурабаха 2.0"} if product["id"] == 2 else product for product in products]
+    reloaded = ProductCatalog(renamed, version="v1")
+    assert comparator.compare(reloaded, [2])["product_names"] == ["Мурабаха 2.0"]
+    assert comparator.compare(reloaded, [2]) is comparator.compare(reloaded, [2])
+
+
+def test_compare_endpoint(api):
+    response = api("post", COMPARE_URL, json={"product_ids": [2, 3], "amount": 5_000_000, "timeline_months": 36})
+    assert response.status_code == 200
+    assert response.json()["product_ids"] == [2, 3]
+    assert api("post", COMPARE_URL, json={"product_ids": [999]}).status_code == 404
+    assert api("post", COMPARE_URL, json={"product_ids": [2], "amount": 0, "timeline_months": 12}).status_code == 400
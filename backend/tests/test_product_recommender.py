@@ -0,0 +1,117 @@
+import itertools
+import random
+
+import numpy as np
+import pytest
+
+from app.services.product_catalog import ProductCatalog
+from app.services.product_recommender import ProductRecommender
+from benchmarks.product_catalog import load_products, synthetic_products
+
+GOALS = ["жилье", "сбережения", "Автомобиль", "образование", "инвест", "хадж", "лечение", "нет такой цели"]
+RISK_PROFILES = ["conservative", "moderate", "aggressive", "unknown"]
+INCOMES = [None, 0, 300000, 300001]
+
+RECOMMEND_URL = "/api/v1/api/v1/products/recommend"
+BATCH_URL = "/api/v1/api/v1/products/recommend/batch"
+
+
+def legacy_recommend(products, user_goals, risk_profile, monthly_income=None):
+    """recommend_products before the vectorised recommender"""
+    risk_mapping = {
+        "conservative": ["low"],
+        "moderate": ["low", "medium"],
+        "aggressive": ["low", "medium", "high"]
+    }
+    recommended = []
+    for product in products:
+        score = 0
+        for goal in user_goals:
+            if any(goal.lower() in rec.lower() for rec in product["recommended_for"]):
+                score += 2
+        if risk_profile in risk_mapping and product["risk_level"] in risk_mapping[risk_profile]:
+            score += 1
+        if monthly_income and product["type"] == "financing" and monthly_income > 300000:
+            score += 1
+        if score > 0:
+            recommended.append({**product, "match_score": score})
+    recommended.sort(key=lambda x: x["match_score"], reverse=True)
+    return recommended
+
+
+@pytest.fixture(scope="module")
+def products():
+    return load_products()
+
+
+@pytest.fixture(scope="module")
+def recommender(products):
+    return ProductRecommender(ProductCatalog(products))
+
+
+def test_matches_legacy_scoring_on_the_catalog(recommender, products):
+    for size in range(3):
+        for goals in itertools.combinations(GOALS, size):
+            for risk_profile, income in itertools.product(RISK_PROFILES, INCOMES):
+                assert recommender.recommend(list(goals), risk_profile, income) == \
+                    legacy_recommend(products, goals, risk_profile, income), (goals, risk_profile, income)
+
+
+def test_matches_legacy_scoring_on_a_large_catalog():
+    rng = random.Random(3)
+    products = synthetic_products(rng, 2000)
+    recommender = ProductRecommender(ProductCatalog(products))
+    for _ in range(50):
+        goals = rng.sample(GOALS, rng.randint(0, 3))
+        risk_profile, income = rng.choice(RISK_PROFILES), rng.choice(INCOMES)
+        assert recommender.recommend(goals, risk_profile, income) == legacy_recommend(products, goals, risk_profile, income)
+
+
+@pytest.mark.parametrize("top_k", [1, 2, 3, 5, 8, 20])
+def test_top_k_is_a_prefix_of_the_full_ranking(recommender, top_k):
+    for goals in (["жилье"], ["сбережения", "образование"], []):
+        for risk_profile in RISK_PROFILES:
+            full = recommender.recommend(goals, risk_profile, 500000)
+            assert recommender.recommend(goals, risk_profile, 500000, top_k=top_k) == full[:top_k]
+
+
+def test_ties_are_broken_by_catalog_order(recommender, products):
+    # "жилье" matches no recommended_for entry, so every moderate-risk product (deposit, Murabaha, ...) scores 1
+    ranked = recommender.recommend(["жилье"], "moderate")
+    assert {item["match_score"] for item in ranked} == {1}
+    assert [item["id"] for item in ranked] == [product["id"] for product in products]
+    for top_k in range(1, len(products)):
+        assert [item["id"] for item in recommender.recommend(["жилье"], "moderate", top_k=top_k)] == \
+            [product["id"] for product in products[:top_k]]
+
+
+def test_top_indices_selects_earliest_ties_at_the_boundary():
+    scores = np.array([
+        [1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 2],
+        [0, 3, 0, 3, 0, 3, 0, 3, 0, 3, 0, 3, 0, 3, 0, 3]
+    ])
+    assert ProductRecommender.top_indices(scores, 3).tolist() == [[15, 0, 1], [1, 3, 5]]
+    assert ProductRecommender.top_indices(scores, None)[0].tolist() == [15, *range(15)]
+
+
+def test_batch_matches_single_recommendations(recommender):
+    requests = [
+        {"user_goals": goals, "risk_profile": risk_profile, "monthly_income": 400000}
+        for goals in (["жилье"], ["хадж", "сбережения"], [])
+        for risk_profile in RISK_PROFILES
+    ]
+    for request, batch in zip(requests, recommender.recommend_batch(requests, top_k=2)):
+        single = recommender.recommend(request["user_goals"], request["risk_profile"], request["monthly_income"], top_k=2)
+        assert batch == [{"product_id": p["id"], "name": p["name"], "match_score": p["match_score"]} for p in single]
+    assert recommender.recommend_batch([], top_k=2) == []
+
+
+def test_recommend_endpoints(api, products):
+    response = api("post", RECOMMEND_URL, json={"user_goals": ["жилье"], "risk_profile": "moderate", "monthly_income": 400000})
+    assert response.status_code == 200
+    expected = legacy_recommend(products, ["жилье"], "moderate", 400000)
+    assert [item["id"] for item in response.json()] == [item["id"] for item in expected]
+
+    body = api("post", BATCH_URL, json={"requests": [{"user_goals": ["жилье"], "risk_profile": "moderate", "monthly_income": 400000}], "top_k": 1}).json()
+    assert body["results"][0]["recommendations"][0]["product_id"] == expected[0]["id"]
+    assert api("post", BATCH_URL, json={"requests": [], "top_k": 0}).status_code == 400
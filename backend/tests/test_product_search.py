@@ -0,0 +1,106 @@
+import math
+
+import pytest
+
+from app.services.product_search import ProductSearchIndex, normalize, stem
+from benchmarks.product_catalog import load_products
+
+PRODUCTS_URL = "/api/v1/api/v1/products/"
+SUGGEST_URL = "/api/v1/api/v1/products/suggest"
+
+
+@pytest.fixture(scope="module")
+def index():
+    return ProductSearchIndex(load_products())
+
+
+def product(product_id, name="", description="", features=(), recommended_for=()):
+    return {"id": product_id, "name": name, "description": description, "features": list(features), "recommended_for": list(recommended_for)}
+
+
+def test_word_forms_share_a_stem():
+    assert {stem(token) for token in normalize("Квартира квартиру КВАРТИРЫ квартирой")} == {"квартир"}
+    assert normalize("Ёлка, ёж!") == ["елка", "еж"]
+    assert stem("дом") == "дом"  # too short to strip an ending
+
+
+def test_inflected_query_finds_the_housing_product(index):
+    ranked = index.search("квартиру", prefix=False)
+    assert ranked and ranked[0][0] == 2
+
+
+def test_prefix_expands_only_the_last_word(index):
+    assert [product_id for product_id, _ in index.search("квар")][:1] == [2]
+    assert index.search("квар", prefix=False) == []
+    # a partial first word is not expanded
+    assert index.search("квар финансирование") == index.search("квар финансирование", prefix=False)
+    assert dict(index.search("финансирование квар"))[2] > dict(index.search("финансирование квар", prefix=False))[2]
+
+
+def test_bm25_scores_by_hand():
+    index = ProductSearchIndex([
+        product(1, description="хадж хадж"),
+        product(2, description="хадж умра"),
+        product(3, description="вклад")
+    ])
+    n_docs, doc_freq = 3, 2
+    idf = math.log(1 + (n_docs - doc_freq + 0.5) / (doc_freq + 0.5))
+    average_length = (2 + 2 + 1) / 3
+
+    def bm25(tf, length):
+        return idf * tf * (index.K1 + 1) / (tf + index.K1 * (1 - index.B + index.B * length / average_length))
+
+    ranked = index.search("хадж", prefix=False)
+    assert [product_id for product_id, _ in ranked] == [1, 2]
+    assert ranked[0][1] == pytest.approx(bm25(2, 2))
+    assert ranked[1][1] == pytest.approx(bm25(1, 2))
+
+
+def test_name_matches_outrank_description_matches():
+    index = ProductSearchIndex([product(1, description="ипотека"), product(2, name="ипотека")])
+    assert [product_id for product_id, _ in index.search("ипотека")] == [2, 1]
+
+
+def test_bm25_order_is_stable(index):
+    ranked = index.search("финансирование", prefix=False)
+    assert len(ranked) > 1
+    assert [score for _, score in ranked] == sorted((score for _, score in ranked), reverse=True)
+    assert index.search("финансирование", prefix=False) == ranked
+    assert ProductSearchIndex(load_products()).search("финансирование", prefix=False) == ranked
+
+    # equal scores keep catalog order
+    ties = ProductSearchIndex([product(product_id, name="сбережения") for product_id in (5, 3, 9)])
+    assert [product_id for product_id, _ in ties.search("сбережения")] == [5, 3, 9]
+
+
+def test_limit_and_candidates(index):
+    ranked = index.search("финансирование", prefix=False)
+    assert index.search("финансирование", prefix=False, limit=2) == ranked[:2]
+    candidates = {product_id for product_id, _ in ranked[1:]}
+    assert index.search("финансирование", prefix=False, candidate_ids=candidates) == ranked[1:]
+
+
+def test_search_endpoint_ranks_by_relevance(api):
+    response = api("get", PRODUCTS_URL, params={"search": "квартиру"})
+    assert response.status_code == 200
+    assert response.json()[0]["id"] == 2
+
+
+@pytest.mark.parametrize("search", ["", " ", "   \t"])
+def test_blank_search_returns_the_unfiltered_list(api, search):
+    unfiltered = api("get", PRODUCTS_URL).json()
+    assert api("get", PRODUCTS_URL, params={"search": search}).json() == unfiltered
+    assert api("get", PRODUCTS_URL, params={"search": search, "risk_level": "low"}).json() == \
+        api("get", PRODUCTS_URL, params={"risk_level": "low"}).json()
+
+
+def test_padded_search_matches_the_trimmed_query(api):
+    assert api("get", PRODUCTS_URL, params={"search": "  квартиру "}).json() == api("get", PRODUCTS_URL, params={"search": "квартиру"}).json()
+
+
+def test_suggest_matches_a_prefix(api):
+    response = api("get", SUGGEST_URL, params={"q": "квар"})
+    assert response.status_code == 200
+    suggestions = response.json()
+    assert suggestions[0] == {"id": 2, "name": "Мурабаха финансирование недвижимости", "type": "financing"}
+    assert len(api("get", SUGGEST_URL, params={"q": "ф", "limit": 2}).json()) <= 2
@@ -0,0 +1,121 @@
+import json
+import random
+import threading
+import time
+
+from app.services.product_views import ProductViewTracker
+
+BUCKET = 60
+
+
+def make_tracker(retention_buckets: int, windows, **config):
+    return ProductViewTracker({
+        "bucket_seconds": BUCKET,
+        "retention_buckets": retention_buckets,
+        "events_file": "",
+        "windows": {name: buckets * BUCKET for name, buckets in windows.items()},
+        **config
+    })
+
+
+def logged_events(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def window_counts(tracker, window):
+    return dict(tracker.popular(10, window))
+
+
+def test_window_as_long_as_retention_drops_expired_views(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr("app.services.product_views.time.time", lambda: clock[0])
+    tracker = make_tracker(4, {"week": 4, "hour": 1})
+
+    for minute in range(12):
+        clock[0] = minute * BUCKET
+        tracker.record(1)
+        assert window_counts(tracker, "week") == {1: min(minute + 1, 4)}
+        assert window_counts(tracker, "hour") == {1: 1}
+
+    assert window_counts(tracker, "all") == {1: 12}
+    assert len(tracker.time_buckets()) == 4
+
+
+def test_window_totals_match_buckets_after_idle_gap(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr("app.services.product_views.time.time", lambda: clock[0])
+    tracker = make_tracker(4, {"week": 4})
+
+    for minute in (0, 1, 2, 6, 7):
+        clock[0] = minute * BUCKET
+        tracker.record(minute % 2)
+
+    buckets = sum(bucket["views"] for bucket in tracker.time_buckets())
+    assert sum(window_counts(tracker, "week").values()) == buckets == 2
+
+    clock[0] = 20 * BUCKET
+    assert window_counts(tracker, "week") == {}
+
+
+def test_events_are_written_off_the_calling_thread(tmp_path, monkeypatch):
+    events_file = str(tmp_path / "views.ndjson")
+    tracker = make_tracker(4, {"hour": 1}, events_file=events_file, flush_batch_size=2)
+    release, writer_threads = threading.Event(), []
+    write_batch = tracker._write_batch
+
+    def slow_write(batch):
+        writer_threads.append(threading.current_thread())
+        release.wait(5)
+        write_batch(batch)
+
+    monkeypatch.setattr(tracker, "_write_batch", slow_write)
+    started = time.perf_counter()
+    for user_id in range(5):
+        tracker.record(1, user_id=user_id)
+    assert time.perf_counter() - started < 1  # the blocked writer does not hold up record()
+    assert tracker.popular(1) == [(1, 5)]
+
+    release.set()
+    tracker.flush()
+    assert [event["user_id"] for event in logged_events(events_file)] == list(range(5))
+    assert writer_threads and threading.current_thread() not in writer_threads
+
+
+def test_concurrent_batches_are_appended_in_event_order(tmp_path):
+    events_file = str(tmp_path / "views.ndjson")
+    tracker = make_tracker(4, {"hour": 1}, events_file=events_file, flush_batch_size=7, ring_buffer_size=10_000)
+
+    def view(offset):
+        for i in range(500):
+            tracker.record(i % 5, user_id=offset + i)
+
+    threads = [threading.Thread(target=view, args=(offset,)) for offset in range(0, 8000, 1000)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    tracker.flush()
+
+    logged = [event["user_id"] for event in logged_events(events_file)]
+    assert len(logged) == 4000
+    assert logged == [event["user_id"] for event in tracker._events]
+
+
+def test_popular_matches_a_full_count(monkeypatch):
+    monkeypatch.setattr("app.services.product_views.time.time", lambda: 10 * BUCKET)
+    tracker = make_tracker(4, {"hour": 1})
+    rng = random.Random(5)
+    views = [(rng.randint(1, 30), rng.choice(["conservative", "moderate", None])) for _ in range(2000)]
+    for product_id, risk_profile in views:
+        tracker.record(product_id, risk_profile=risk_profile)
+
+    allowed = set(range(1, 31, 3))
+    counts = {}
+    for product_id, risk_profile in views:
+        if risk_profile == "moderate" and product_id in allowed:
+            counts[product_id] = counts.get(product_id, 0) + 1
+    expected = sorted(counts.items(), key=lambda item: item[1], reverse=True)[:4]
+    popular = tracker.popular(4, window="hour", risk_profile="moderate", product_ids=allowed)
+    assert [count for _, count in popular] == [count for _, count in expected]
+    assert all(counts[product_id] == count for product_id, count in popular)
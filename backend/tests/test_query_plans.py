@@ -0,0 +1,72 @@
+"""EXPLAIN QUERY PLAN checks: hot queries must use the indexes from migration 0002"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from app.crud import financial_crud
+from app.database.session import AsyncSessionLocal, async_engine, async_read_engine, engine
+from app.services.pagination import encode_cursor
+
+pytestmark = pytest.mark.usefixtures("migrated_database")
+
+
+@pytest.fixture
+def captured_selects():
+    """SELECT statements (with parameters) sent by the async session"""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    engines = {async_engine.sync_engine, async_read_engine.sync_engine}
+    for target in engines:
+        event.listen(target, "before_cursor_execute", capture)
+    yield statements
+    for target in engines:
+        event.remove(target, "before_cursor_execute", capture)
+
+
+def query_plan(statement, parameters):
+    with engine.connect() as connection:
+        rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", tuple(parameters)).all()
+    return [row[-1] for row in rows]
+
+
+def assert_uses_index(statements, table, index):
+    assert statements
+    for statement, parameters in statements:
+        plan = query_plan(statement, parameters)
+        assert any(step.startswith(f"SEARCH {table} USING") and index in step for step in plan), plan
+        assert not any(step.startswith(f"SCAN {table}") for step in plan), plan
+        assert not any("TEMP B-TREE" in step for step in plan), plan
+
+
+def crud_call(function, *args, **kwargs):
+    async def call():
+        async with AsyncSessionLocal() as db:
+            return await function(db, *args, **kwargs)
+    return call()
+
+
+@pytest.mark.parametrize("cursor", [None, encode_cursor(datetime(2026, 1, 1).isoformat(), 10)])
+def test_transaction_page_uses_user_date_index(run_async, captured_selects, cursor):
+    run_async(crud_call(financial_crud.get_transactions_page, 1, 20, cursor))
+    assert_uses_index(captured_selects, "transactions", "ix_transactions_user_date")
+
+
+def test_transaction_date_range_uses_user_date_index(run_async, captured_selects):
+    run_async(crud_call(financial_crud.get_transactions, 1, since=datetime.now() - timedelta(days=30)))
+    assert_uses_index(captured_selects, "transactions", "ix_transactions_user_date (user_id=? AND date>?)")
+
+
+def test_active_goals_use_partial_index(run_async, captured_selects):
+    run_async(crud_call(financial_crud.get_goals, 1, include_completed=False))
+    assert_uses_index(captured_selects, "financial_goals", "ix_financial_goals_user_active")
+
+
+@pytest.mark.parametrize("cursor", [None, encode_cursor(datetime(2026, 1, 1).isoformat(), 10)])
+def test_conversation_page_uses_user_created_index(run_async, captured_selects, cursor):
+    run_async(crud_call(financial_crud.get_conversations_page, 1, 20, cursor))
+    assert_uses_index(captured_selects, "ai_conversations", "ix_ai_conversations_user_created")
@@ -0,0 +1,130 @@
+import random
+import time
+
+import pytest
+
+from app.services.savings_allocator import SavingsAllocator, savings_allocator
+from benchmarks.savings_allocator import greedy_allocate, random_goals as benchmark_goals
+
+TOLERANCE = 1e-6
+IMPORTANCE = list(SavingsAllocator.ISLAMIC_IMPORTANCE_RANK)
+PRIORITIES = list(SavingsAllocator.PRIORITY_WEIGHTS)
+
+
+def random_goals(rng: random.Random, count: int, with_minimums: bool = True):
+    return [
+        {
+            "goal_name": f"goal-{i}",
+            "target_amount": rng.uniform(10_000, 5_000_000),
+            "current_amount": rng.uniform(0, 10_000),
+            "timeline_months": rng.randint(1, 120),
+            "priority": rng.choice(PRIORITIES),
+            "islamic_importance": rng.choice(IMPORTANCE),
+            "min_contribution": rng.uniform(0, 20_000) if with_minimums and rng.random() < 0.3 else 0
+        }
+        for i in range(count)
+    ]
+
+
+def allocations(plan):
+    return [(item["allocated"], item["required"], item["minimum"]) for item in plan["goal_allocations"]]
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_allocation_is_between_zero_and_required(seed):
+    rng = random.Random(seed)
+    goals = random_goals(rng, rng.randint(1, 12))
+    plan = savings_allocator.allocate(goals, rng.uniform(-1_000, 500_000))
+
+    for allocated, required, _ in allocations(plan):
+        assert -TOLERANCE <= allocated <= required + TOLERANCE
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_total_is_min_of_budget_and_required(seed):
+    rng = random.Random(seed)
+    goals = random_goals(rng, rng.randint(1, 12))
+    budget = rng.uniform(0, 500_000)
+    plan = savings_allocator.allocate(goals, budget)
+
+    total = sum(allocated for allocated, _, _ in allocations(plan))
+    assert total == pytest.approx(min(budget, plan["total_required"]), rel=1e-9, abs=1e-6)
+    assert plan["remaining_savings"] == pytest.approx(max(budget - plan["total_required"], 0), rel=1e-9, abs=1e-6)
+    assert plan["feasible"] == (budget >= plan["total_required"] - TOLERANCE)
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_fard_goals_are_funded_before_mubah(seed):
+    rng = random.Random(seed)
+    goals = random_goals(rng, rng.randint(2, 12))
+    plan = savings_allocator.allocate(goals, rng.uniform(0, 300_000))
+
+    items = plan["goal_allocations"]
+    fard_fully_funded = all(
+        item["allocated"] >= item["required"] - TOLERANCE
+        for item in items if item["islamic_importance"] == "fard"
+    )
+    for item in items:
+        # Beyond its minimum contribution a mubah goal is funded only once every fard goal is
+        if item["islamic_importance"] == "mubah" and item["allocated"] > item["minimum"] + TOLERANCE:
+            assert fard_fully_funded
+
+
+@pytest.mark.parametrize("seed", range(100))
+def test_priority_weights_split_a_shared_tier(seed):
+    rng = random.Random(seed)
+    timeline = rng.randint(1, 60)
+    # Same tier and horizon, demand far above the budget: shares follow the priority weights
+    goals = [
+        {
+            "goal_name": priority,
+            "target_amount": 10_000_000 * timeline,
+            "timeline_months": timeline,
+            "priority": priority,
+            "islamic_importance": "mubah"
+        }
+        for priority in PRIORITIES
+    ]
+    budget = rng.uniform(1_000, 100_000)
+    plan = savings_allocator.allocate(goals, budget)
+
+    weights = SavingsAllocator.PRIORITY_WEIGHTS
+    total_weight = sum(weights.values())
+    for item in plan["goal_allocations"]:
+        assert item["allocated"] == pytest.approx(budget * weights[item["priority"]] / total_weight, rel=1e-9)
+
+
+def test_shorter_timeline_gets_larger_share():
+    goals = [
+        {"goal_name": "soon", "target_amount": 1e9, "timeline_months": 6, "priority": "medium"},
+        {"goal_name": "later", "target_amount": 1e9 * 4, "timeline_months": 24, "priority": "medium"}
+    ]
+    plan = savings_allocator.allocate(goals, 50_000)
+    assert plan["allocations"]["soon"] == pytest.approx(4 * plan["allocations"]["later"])
+
+
+def test_batch_matches_single_allocation():
+    rng = random.Random(7)
+    problems = [(random_goals(rng, rng.randint(0, 6)), rng.uniform(0, 200_000)) for _ in range(20)]
+    assert savings_allocator.allocate_batch(problems) == [savings_allocator.allocate(*problem) for problem in problems]
+
+
+def test_matches_greedy_plan_when_budget_covers_every_goal():
+    rng = random.Random(11)
+    for _ in range(50):
+        goals = benchmark_goals(rng, rng.randint(1, 20))
+        budget = sum(goal["monthly_saving"] for goal in goals) * rng.uniform(1.0, 2.0)
+        greedy, plan = greedy_allocate(goals, budget), savings_allocator.allocate(goals, budget)
+        assert plan["feasible"] and greedy["feasible"]
+        assert plan["allocations"] == pytest.approx(greedy["allocations"])
+        assert plan["remaining_savings"] == pytest.approx(greedy["remaining_savings"])
+
+
+def test_dozens_of_goals_solve_in_milliseconds():
+    goals = random_goals(random.Random(3), 40)
+    budget = sum(item["required"] for item in savings_allocator.allocate(goals, 0)["goal_allocations"]) * 0.5
+    savings_allocator.allocate(goals, budget)
+    started = time.perf_counter()
+    for _ in range(20):
+        savings_allocator.allocate(goals, budget)
+    assert (time.perf_counter() - started) / 20 < 0.01
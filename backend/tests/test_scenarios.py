@@ -0,0 +1,95 @@
+import pytest
+
+from app.database.session import SessionLocal
+from app.models.financial import FinancialGoal
+from app.routers import analysis
+
+SCENARIOS_URL = "/api/v1/analysis/scenarios"
+
+HAJJ = {"goal_name": "Хадж", "target_amount": 2_400_000, "timeline_months": 24, "islamic_importance": "fard"}
+
+
+@pytest.fixture
+def user_with_goal(make_user):
+    user_id = make_user()
+    with SessionLocal() as db:
+        db.add_all([
+            FinancialGoal(
+                user_id=user_id, goal_name="Квартира", target_amount=12_000_000, current_amount=0.0,
+                timeline_months=60, category="housing", priority="high", islamic_importance="mustahabb",
+                is_completed=False
+            ),
+            FinancialGoal(
+                user_id=user_id, goal_name="Старая цель", target_amount=100_000, current_amount=100_000,
+                timeline_months=1, category="other", priority="low", islamic_importance="mubah",
+                is_completed=True
+            ),
+        ])
+        db.commit()
+    return user_id
+
+
+def scenario(**fields):
+    return {"monthly_income": 500_000, "monthly_expenses": 300_000, **fields}
+
+
+def goal_names(result):
+    return [goal["goal_name"] for goal in result["goals"]]
+
+
+def test_omitted_goals_fall_back_to_active_db_goals(api, user_with_goal):
+    response = api("post", SCENARIOS_URL, params={"user_id": user_with_goal}, json={"scenarios": [scenario()]})
+    assert response.status_code == 200
+    assert goal_names(response.json()["scenarios"][0]) == ["Квартира"]
+
+
+def test_explicit_empty_shared_goals_mean_no_goals(api, user_with_goal):
+    response = api("post", SCENARIOS_URL, params={"user_id": user_with_goal}, json={"scenarios": [scenario(), scenario()], "goals": []})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["total_scenarios"] == 2
+    assert all(result["goals"] == [] and result["goals_feasible"] for result in body["scenarios"])
+
+
+def test_explicit_empty_scenario_goals_override_shared_and_db_goals(api, user_with_goal):
+    body = api("post", SCENARIOS_URL, params={"user_id": user_with_goal}, json={
+        "scenarios": [scenario(goals=[]), scenario(), scenario(goals=[HAJJ])]
+    }).json()
+    assert [goal_names(result) for result in body["scenarios"]] == [[], ["Квартира"], ["Хадж"]]
+
+    body = api("post", SCENARIOS_URL, params={"user_id": user_with_goal}, json={
+        "scenarios": [scenario(goals=[]), scenario()], "goals": [HAJJ]
+    }).json()
+    assert [goal_names(result) for result in body["scenarios"]] == [[], ["Хадж"]]
+
+
+def test_scenario_count_is_bounded(api, user_with_goal, monkeypatch):
+    monkeypatch.setattr(analysis, "MAX_SCENARIOS", 3)
+    params = {"user_id": user_with_goal}
+
+    response = api("post", SCENARIOS_URL, params=params, json={"scenarios": [scenario()] * 3, "goals": []})
+    assert response.status_code == 200
+    assert response.json()["total_scenarios"] == 3
+
+    response = api("post", SCENARIOS_URL, params=params, json={"scenarios": [scenario()] * 4, "goals": []})
+    assert response.status_code == 400
+    assert "3" in response.json()["detail"]
+
+
+def test_empty_scenario_list_is_rejected(api, user_with_goal):
+    response = api("post", SCENARIOS_URL, params={"user_id": user_with_goal}, json={"scenarios": []})
+    assert response.status_code == 400
+
+
+def test_malformed_goal_is_a_client_error(api, user_with_goal):
+    response = api("post", SCENARIOS_URL, params={"user_id": user_with_goal}, json={
+        "scenarios": [scenario(goals=[{"goal_name": "Без суммы", "timeline_months": 12}])]
+    })
+    assert response.status_code == 400
+
+
+def test_default_limit_accepts_max_scenarios(api, user_with_goal):
+    params = {"user_id": user_with_goal}
+    limit = analysis.MAX_SCENARIOS
+    assert api("post", SCENARIOS_URL, params=params, json={"scenarios": [scenario()] * limit, "goals": []}).status_code == 200
+    assert api("post", SCENARIOS_URL, params=params, json={"scenarios": [scenario()] * (limit + 1), "goals": []}).status_code == 400
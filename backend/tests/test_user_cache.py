@@ -0,0 +1,153 @@
+import pytest
+
+from app.crud import user_crud
+from app.database.session import AsyncSessionLocal, SessionLocal
+from app.models.user import User
+from app.services.user_cache import MemoryUserCacheBackend, UserProfileCache
+
+TTL = 60
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    """Fresh in-process cache wired into user_crud, isolated from other tests"""
+    profile_cache = UserProfileCache({"backend": "memory", "ttl_seconds": TTL, "max_size": 100})
+    monkeypatch.setattr(user_crud, "user_cache", profile_cache)
+    return profile_cache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("app.services.user_cache.time.monotonic", lambda: now[0])
+    return now
+
+
+def rename_in_database(user_id, full_name):
+    """Change the row behind the cache's back (no invalidation)"""
+    with SessionLocal() as db:
+        db.get(User, user_id).full_name = full_name
+        db.commit()
+
+
+async def read_user(user_id):
+    async with AsyncSessionLocal() as db:
+        return await user_crud.get_user(db, user_id)
+
+
+def test_profile_read_after_update_sees_new_values(api, make_user, cache):
+    user_id = make_user(full_name="Old Name")
+    assert api("get", "/api/v1/auth/profile", params={"user_id": user_id}).json()["full_name"] == "Old Name"
+
+    response = api("put", "/api/v1/auth/profile", params={"user_id": user_id}, json={"full_name": "New Name"})
+    assert response.status_code == 200
+
+    assert api("get", "/api/v1/auth/profile", params={"user_id": user_id}).json()["full_name"] == "New Name"
+
+
+def test_email_lookup_after_update_drops_old_alias(make_user, cache, run_async):
+    user_id = make_user()
+
+    async def scenario():
+        async with AsyncSessionLocal() as db:
+            old_email = (await user_crud.get_user(db, user_id)).email
+            assert (await user_crud.get_user_by_email(db, old_email)).id == user_id
+            user = await user_crud.get_user(db, user_id, use_cache=False)
+            await user_crud.update_user(db, user, {"email": f"renamed-{old_email}"})
+        async with AsyncSessionLocal() as db:
+            return (
+                await user_crud.get_user_by_email(db, old_email),
+                await user_crud.get_user_by_email(db, f"renamed-{old_email}"),
+            )
+
+    by_old_email, by_new_email = run_async(scenario())
+    assert by_old_email is None
+    assert by_new_email.id == user_id
+
+
+def test_reader_that_loaded_old_row_does_not_repopulate_cache(make_user, cache, run_async):
+    user_id = make_user(full_name="Old Name")
+
+    async def scenario():
+        async with AsyncSessionLocal() as reader, AsyncSessionLocal() as writer:
+            load = reader.scalar
+
+            async def load_then_update(statement):
+                # The reader has the old row; the update commits and invalidates before it caches it
+                row = await load(statement)
+                user = await user_crud.get_user(writer, user_id, use_cache=False)
+                await user_crud.update_user(writer, user, {"full_name": "New Name"})
+                return row
+
+            reader.scalar = load_then_update
+            stale = await user_crud.get_user(reader, user_id)
+        return stale.full_name, (await read_user(user_id)).full_name
+
+    assert run_async(scenario()) == ("Old Name", "New Name")
+
+
+def test_put_with_outdated_generation_is_not_cached(make_user, cache, run_async):
+    user_id = make_user()
+
+    async def scenario():
+        generation = await cache.generation()
+        async with AsyncSessionLocal() as db:
+            user = await user_crud.get_user(db, user_id, use_cache=False)
+        await cache.invalidate(user_id)
+        await cache.put(user, generation)
+        return await cache.get("id", user_id)
+
+    assert run_async(scenario()) is None
+
+
+def test_cached_profile_expires_after_ttl(make_user, cache, clock, run_async):
+    user_id = make_user(full_name="Old Name")
+    assert run_async(read_user(user_id)).full_name == "Old Name"
+
+    rename_in_database(user_id, "New Name")
+    clock[0] += TTL - 1
+    assert run_async(read_user(user_id)).full_name == "Old Name"
+
+    clock[0] += 1
+    assert run_async(read_user(user_id)).full_name == "New Name"
+
+
+def test_memory_backend_expires_entries_and_evicts_least_recent(clock, run_async):
+    backend = MemoryUserCacheBackend(max_size=2, ttl_seconds=TTL)
+
+    async def scenario():
+        generation = await backend.generation()
+        await backend.set_many({("id", 1): {"id": 1}, ("id", 2): {"id": 2}}, generation)
+        await backend.get(("id", 1))
+        await backend.set_many({("id", 3): {"id": 3}}, generation)
+        alive = [key for key in (1, 2, 3) if await backend.get(("id", key)) is not None]
+        clock[0] += TTL
+        expired = [key for key in (1, 2, 3) if await backend.get(("id", key)) is not None]
+        return alive, expired
+
+    assert run_async(scenario()) == ([1, 3], [])
+
+
+def test_memory_backend_returns_copies(run_async):
+    backend = MemoryUserCacheBackend(max_size=10, ttl_seconds=TTL)
+    profile = {"id": 1, "financial_goals": [{"name": "Hajj"}]}
+
+    async def scenario():
+        await backend.set_many({("id", 1): profile}, await backend.generation())
+        profile["financial_goals"].append({"name": "stored after set"})
+        first = await backend.get(("id", 1))
+        first["full_name"] = "changed"
+        first["financial_goals"].append({"name": "changed"})
+        return await backend.get(("id", 1))
+
+    assert run_async(scenario()) == {"id": 1, "financial_goals": [{"name": "Hajj"}]}
+
+
+def test_cached_user_goals_cannot_corrupt_cache(make_user, cache, run_async):
+    user_id = make_user(financial_goals=[{"name": "Hajj"}])
+
+    async def scenario():
+        (await read_user(user_id)).financial_goals.append({"name": "changed"})
+        return (await read_user(user_id)).financial_goals
+
+    assert run_async(scenario()) == [{"name": "Hajj"}]
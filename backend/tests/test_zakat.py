@@ -0,0 +1,117 @@
+import json
+import os
+from datetime import date, datetime
+
+import pytest
+
+from app.services.zakat_service import NisabPriceFeed, ZakatService
+
+# silver nisab: 595 g * 100 = 59 500
+PRICES = {"gold_price_per_gram": 30_000, "silver_price_per_gram": 100}
+
+
+def write_prices(path, prices, mtime=None):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(prices, f)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+
+
+@pytest.fixture
+def prices_file(tmp_path):
+    path = str(tmp_path / "nisab_prices.json")
+    write_prices(path, PRICES, mtime=1_000_000)
+    return path
+
+
+@pytest.fixture
+def service(prices_file):
+    return ZakatService(NisabPriceFeed(prices_file, refresh_seconds=0))
+
+
+def income(amount, day, user_id=1):
+    return {"user_id": user_id, "amount": amount, "transaction_type": "income", "date": datetime.fromisoformat(day)}
+
+
+def expense(amount, day, user_id=1):
+    return {"user_id": user_id, "amount": amount, "transaction_type": "expense", "date": datetime.fromisoformat(day)}
+
+
+def test_hawl_starts_when_wealth_reaches_nisab(service):
+    result = service.calculate_for_user(1, [income(30_000, "2025-01-01"), income(40_000, "2025-02-01")], as_of=date(2025, 6, 1))
+    assert result["nisab"] == 59_500
+    assert result["above_nisab"]
+    assert result["hawl_start"] == date(2025, 2, 1)
+    assert result["hawl_due_date"] == date(2026, 1, 21)
+    assert not result["hawl_complete"]
+    assert result["zakat_due"] == 0
+
+
+def test_zakat_is_due_after_a_full_hawl(service):
+    result = service.calculate_for_user(1, [income(100_000, "2025-01-01")], as_of=date(2025, 12, 21))
+    assert result["hawl_complete"]
+    assert result["zakat_due"] == pytest.approx(100_000 * service.rate)
+
+    day_before = service.calculate_for_user(1, [income(100_000, "2025-01-01")], as_of=date(2025, 12, 20))
+    assert not day_before["hawl_complete"] and day_before["zakat_due"] == 0
+
+
+def test_dropping_below_nisab_resets_the_hawl(service):
+    transactions = [income(100_000, "2025-01-01"), expense(60_000, "2025-03-01"), income(50_000, "2025-04-01")]
+    result = service.calculate_for_user(1, transactions, as_of=date(2026, 1, 1))
+    assert result["net_zakatable_wealth"] == 90_000
+    assert result["hawl_start"] == date(2025, 4, 1)
+    assert not result["hawl_complete"]
+
+
+def test_liabilities_reduce_zakatable_wealth(service):
+    result = service.calculate_for_user(1, [income(100_000, "2025-01-01")], liabilities=50_000, as_of=date(2026, 6, 1))
+    assert result["net_zakatable_wealth"] == 50_000
+    assert not result["above_nisab"] and result["hawl_start"] is None and result["zakat_due"] == 0
+
+
+def test_batch_keeps_users_apart(service):
+    results = service.compute_batch(
+        [income(100_000, "2025-01-01", user_id=1), income(10_000, "2025-01-01", user_id=2)], as_of=date(2026, 1, 1)
+    )
+    assert results[1]["hawl_complete"] and not results[2]["above_nisab"]
+
+
+def test_price_feed_reloads_only_when_mtime_changes(prices_file):
+    feed = NisabPriceFeed(prices_file, refresh_seconds=0)
+    assert feed.nisab("silver") == 59_500
+
+    # Same mtime: the cached prices are kept
+    write_prices(prices_file, {**PRICES, "silver_price_per_gram": 200}, mtime=1_000_000)
+    assert feed.nisab("silver") == 59_500
+
+    write_prices(prices_file, {**PRICES, "silver_price_per_gram": 200}, mtime=1_000_100)
+    assert feed.nisab("silver") == 119_000
+    assert feed.nisab("gold") == 85 * 30_000
+
+
+def test_price_feed_respects_refresh_interval(prices_file):
+    feed = NisabPriceFeed(prices_file, refresh_seconds=3600)
+    feed.get_prices()
+    write_prices(prices_file, {**PRICES, "silver_price_per_gram": 200}, mtime=1_000_100)
+    assert feed.nisab("silver") == 59_500
+
+
+def test_price_feed_keeps_cache_on_bad_file(prices_file):
+    feed = NisabPriceFeed(prices_file, refresh_seconds=0)
+    feed.get_prices()
+    write_prices(prices_file, {"gold_price_per_gram": 0, "silver_price_per_gram": 0}, mtime=1_000_200)
+    assert feed.nisab("silver") == 59_500
+
+    with pytest.raises(ValueError):
+        NisabPriceFeed(prices_file, refresh_seconds=0).get_prices()
+
+
+def test_zakat_endpoint_validates_input(api, make_user):
+    user_id = make_user()
+    assert api("get", "/api/v1/analysis/zakat", params={"user_id": user_id, "liabilities": -100}).status_code == 422
+    assert api("get", "/api/v1/analysis/zakat", params={"user_id": 999_999}).status_code == 404
+
+    response = api("get", "/api/v1/analysis/zakat", params={"user_id": user_id, "liabilities": 100})
+    assert response.status_code == 200
+    assert response.json()["liabilities"] == 100
@@ -109,7 +109,7 @@ export interface SpendingAnalysis {
     charity_suggestions: string[];
     stress_alternatives: string[];
   };
-  transactions: any[];
+  transactions?: any[];
 }
 
 export interface FinancialMetrics {